@@ -1,9 +1,17 @@
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, render_template, request, jsonify, session, Response, stream_with_context, g
 from openai import OpenAI
 from dotenv import load_dotenv
 import os
 import uuid
-from datetime import datetime
+import hmac
+import time
+import threading
+import queue
+import asyncio
+import contextvars
+import inspect
+from typing import NamedTuple, Optional
+from concurrent.futures import ThreadPoolExecutor
 import logging
 from logging.handlers import RotatingFileHandler
 import json
@@ -12,69 +20,101 @@ import requests
 import pandas as pd
 import re
 import database  # SQLite law search functions
+import session_store
+import request_trace
+import metrics
+import log_pipeline
+from response_cache import ResponseCache
+from faq_index import FaqNgramMatcher, FaqVectorIndex
+from faq_store import FaqStore
+from precompressed import PrecompressedPayload
+from law_tree_index import LawTreeIndex, StaleCursorError, TreeQueryError
+from data_reloader import DataReloader
+from dify_client import CircuitBreaker, CircuitOpenError, DifyClient
+from history_manager import HistoryManager, count_message_tokens
 
 # Load environment variables
 load_dotenv()
 
-# Configure logging
+# Logging (파일/콘솔 기록은 백그라운드 리스너 스레드에서, LOG_QUEUE=false면 요청 스레드에서 직접)
+LOG_DIR = os.getenv('LOG_DIR', 'logs')
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text').lower()  # 'text' or 'json' (한 줄 JSON 레코드)
+LOG_QUEUE = os.getenv('LOG_QUEUE', 'True').lower() == 'true'
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))  # 가득 차면 레코드를 버림 (/metrics에 건수)
+
 def setup_logging(app):
-    """Configure logging for both file and console output"""
-    # Create logs directory if it doesn't exist
-    if not os.path.exists('logs'):
-        os.makedirs('logs')
-    
+    """
+    Configure logging for both file and console output
+
+    Returns:
+        tuple: (api_calls 로거, 큐 핸들러 또는 None)
+    """
+    os.makedirs(LOG_DIR, exist_ok=True)
+
+    # 포맷에 쓰지 않는 레코드 필드 수집 생략 (레코드마다 호출 위치 스택 탐색, 스레드/프로세스 정보)
+    logging._srcfile = None
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+
     # Set up log format
-    log_format = logging.Formatter(
-        '%(asctime)s [%(levelname)s] %(name)s: %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-    
-    # File handler with rotation
+    if LOG_FORMAT == 'json':
+        log_format = log_pipeline.JsonFormatter()
+    else:
+        log_format = log_pipeline.CachingFormatter(
+            '%(asctime)s [%(levelname)s] %(name)s [%(request_id)s]: %(message)s',
+            datefmt='%Y-%m-%d %H:%M:%S'
+        )
+
+    # File handler with rotation (api_calls 로거는 api_calls.log에만 기록)
     file_handler = RotatingFileHandler(
-        'logs/app.log',
+        os.path.join(LOG_DIR, 'app.log'),
         maxBytes=10 * 1024 * 1024,  # 10MB
         backupCount=10
     )
     file_handler.setFormatter(log_format)
     file_handler.setLevel(logging.INFO)
-    
+    file_handler.addFilter(lambda record: record.name != 'api_calls')
+
+    api_file_handler = RotatingFileHandler(
+        os.path.join(LOG_DIR, 'api_calls.log'),
+        maxBytes=10 * 1024 * 1024,  # 10MB
+        backupCount=10
+    )
+    api_file_handler.setFormatter(log_format)
+    api_file_handler.addFilter(logging.Filter('api_calls'))
+
     # Console handler for development mode
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(log_format)
     console_handler.setLevel(logging.DEBUG if app.debug else logging.INFO)
-    
-    # Configure app logger
-    app.logger.handlers.clear()  # Clear default handlers
-    app.logger.addHandler(file_handler)
-    app.logger.addHandler(console_handler)
-    app.logger.setLevel(logging.DEBUG if app.debug else logging.INFO)
-    
-    # Configure werkzeug logger
+
     werkzeug_logger = logging.getLogger('werkzeug')
-    werkzeug_logger.handlers.clear()
-    werkzeug_logger.addHandler(file_handler)
-    werkzeug_logger.addHandler(console_handler)
+    api_logger = logging.getLogger('api_calls')  # Separate logger for API calls
+    app.logger.setLevel(logging.DEBUG if app.debug else logging.INFO)
     werkzeug_logger.setLevel(logging.INFO)
-    
-    # Create separate logger for API calls
-    api_logger = logging.getLogger('api_calls')
-    api_file_handler = RotatingFileHandler(
-        'logs/api_calls.log',
-        maxBytes=10 * 1024 * 1024,  # 10MB
-        backupCount=10
-    )
-    api_file_handler.setFormatter(log_format)
-    api_logger.addHandler(api_file_handler)
-    api_logger.addHandler(console_handler)
     api_logger.setLevel(logging.INFO)
-    
-    return api_logger
+
+    loggers = (app.logger, werkzeug_logger, api_logger)
+    handlers = (file_handler, api_file_handler, console_handler)
+    if LOG_QUEUE:
+        queue_handler, _ = log_pipeline.start_queue_logging(loggers, handlers, LOG_QUEUE_SIZE)
+        return api_logger, queue_handler
+
+    request_id_filter = log_pipeline.RequestIdFilter()
+    for handler in handlers:
+        handler.addFilter(request_id_filter)
+    for logger in loggers:
+        logger.handlers.clear()  # Clear default handlers
+        for handler in handlers:
+            logger.addHandler(handler)
+    return api_logger, None
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.getenv('FLASK_SECRET_KEY', 'dev-secret-key')
 
 # Setup logging
-api_logger = setup_logging(app)
+api_logger, log_queue_handler = setup_logging(app)
 
 # Initialize OpenAI client
 client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
@@ -90,15 +130,85 @@ FALLBACK_TO_OPENAI = os.getenv('FALLBACK_TO_OPENAI', 'True').lower() == 'true'
 app.logger.info(f"AI Mode: {AI_MODE}")
 app.logger.info(f"Dify API URL: {DIFY_API_URL}")
 app.logger.info(f"Dify Dataset ID: {DIFY_DATASET_ID}")
+
+# Dify 클라이언트 (keep-alive 연결 풀 + 재시도 + 서킷 브레이커, 모든 요청 스레드가 공유)
+DIFY_CONNECT_TIMEOUT = float(os.getenv('DIFY_CONNECT_TIMEOUT', '3'))
+DIFY_READ_TIMEOUT = float(os.getenv('DIFY_READ_TIMEOUT', '10'))
+DIFY_MAX_RETRIES = int(os.getenv('DIFY_MAX_RETRIES', '2'))
+DIFY_BREAKER_FAILURES = int(os.getenv('DIFY_BREAKER_FAILURES', '5'))      # 서킷을 여는 연속 실패 횟수
+DIFY_BREAKER_RECOVERY = float(os.getenv('DIFY_BREAKER_RECOVERY', '30'))   # 시험 호출까지 대기(초)
+DIFY_POOL_SIZE = int(os.getenv('DIFY_POOL_SIZE', os.getenv('RETRIEVAL_MAX_WORKERS', '8')))
+
+dify_client = DifyClient(
+    DIFY_API_URL, DIFY_API_KEY, DIFY_DATASET_ID,
+    connect_timeout=DIFY_CONNECT_TIMEOUT,
+    read_timeout=DIFY_READ_TIMEOUT,
+    max_retries=DIFY_MAX_RETRIES,
+    pool_size=DIFY_POOL_SIZE,
+    breaker=CircuitBreaker(DIFY_BREAKER_FAILURES, DIFY_BREAKER_RECOVERY)
+)
 app.logger.info(f"Fallback to OpenAI: {FALLBACK_TO_OPENAI}")
 
-# Store chat sessions in memory (in production, use a database)
-chat_sessions = {}
+# 요청 단계별 지연시간 추적 (/api/chat 요청마다 span 트리 → 단계별 히스토그램 누적, /api/trace/stats)
+CHAT_DEBUG_TIMINGS = os.getenv('CHAT_DEBUG_TIMINGS', 'False').lower() == 'true'  # 모든 응답에 metadata.timings 포함
+stage_histograms = request_trace.StageHistograms()
+
+# Prometheus 메트릭 (/metrics, 외부 서비스 없이 프로세스 메모리에 누적)
+http_requests_total = metrics.Counter(
+    'chatbot_http_requests_total', 'HTTP requests by route and status', ('method', 'route', 'status'))
+http_request_duration = metrics.Histogram(
+    'chatbot_http_request_duration_seconds', 'HTTP request latency by route', ('method', 'route'))
+openai_requests_total = metrics.Counter(
+    'chatbot_openai_requests_total', 'OpenAI chat completion calls by result', ('status',))
+openai_tokens_total = metrics.Counter(
+    'chatbot_openai_tokens_total', 'OpenAI tokens used by type', ('type',))
+dify_requests_total = metrics.Counter(
+    'chatbot_dify_requests_total', 'Dify retrieve calls by result (success, timeout, error, circuit_open)',
+    ('result',))
+answer_path_total = metrics.Counter(
+    'chatbot_answer_path_total',
+    'Chat answers by path (faq_high_match, dify_rag, local_faq_match, openai_fallback, openai_direct, response_cache)',
+    ('path',))
+retrieval_queue_wait = metrics.Histogram(
+    'chatbot_retrieval_queue_wait_seconds', 'Time retrieval branches waited for a free worker thread', ('branch',))
+metrics.CallbackHistogram(
+    'chatbot_chat_stage_duration_seconds', '/api/chat latency by stage (span name)', stage_histograms.buckets,
+    lambda: [({'stage': name}, counts, total, count) for name, counts, total, count in stage_histograms.raw()])
+
+if log_queue_handler is not None:
+    metrics.CallbackMetric(
+        'chatbot_log_records_dropped_total', 'Log records dropped because the logging queue was full', 'counter',
+        lambda: [({}, log_queue_handler.dropped)])
+
+def record_openai_usage(usage):
+    """OpenAI 호출 성공 1건과 토큰 사용량 집계"""
+    openai_requests_total.inc(status='success')
+    openai_tokens_total.inc(usage['prompt_tokens'], type='prompt')
+    openai_tokens_total.inc(usage['completion_tokens'], type='completion')
+
+# Chat session store (LRU + idle TTL, SESSION_BACKEND=memory|sqlite)
+chat_sessions = session_store.create_session_store()
+app.logger.info(f"Session store backend: {chat_sessions.backend}")
+metrics.CallbackMetric(
+    'chatbot_live_sessions', 'Chat sessions currently held by the session store', 'gauge',
+    lambda: [({'backend': chat_sessions.backend}, chat_sessions.stats()['live_sessions'])])
 
 # ========================================
-# [1단계] 마스터 트리 데이터 로드 (서버 시작 시 1회)
+# [1단계] 마스터 트리 데이터 로드 (서버 시작 시 + 데이터 재적재 시)
 # ========================================
-LAW_MASTER_TREE = {}
+MASTER_TREE_MAX_AGE = int(os.getenv('MASTER_TREE_MAX_AGE', '31536000'))  # ?v=<버전> 요청의 캐시 시간(초)
+
+def build_master_tree_payload(tree):
+    """마스터 트리 응답 본문을 1회 직렬화 + gzip/brotli 압축"""
+    payload = PrecompressedPayload({
+        'success': True,
+        'data': tree,
+        'sheet_count': len(tree),
+        'article_count': sum(len(v) for v in tree.values())
+    })
+    sizes = ', '.join(f'{encoding}={size:,}B' for encoding, size in payload.sizes().items())
+    print(f"[Server] 마스터 트리 응답 본문 준비: version={payload.version} ({sizes})")
+    return payload
 
 def build_law_master_tree():
     """
@@ -108,116 +218,306 @@ def build_law_master_tree():
     [수정사항]
     1. Get or Create 패턴: 조(Article) 중복 생성 방지
     2. 딕셔너리 기반 항(Paragraph) 관리: law_id를 Unique Key로 사용하여 중복 제거
-    3. Natural Sort: 제1조, 제2조, ... 제10조 순서로 정렬
+    3. Natural Sort: DB의 article_sort/paragraph_sort 인덱스 순서로 읽음 (제1조, 제2조, ... 제10조)
+
+    Returns:
+        dict: 마스터 트리 (DB를 읽지 못하면 예외 발생 → 재적재 시 기존 스냅샷 유지)
     """
-    import sqlite3
-    global LAW_MASTER_TREE
+    # 지침은 원본 시트 순서, 지침 안에서는 조 → 항 순서로 정렬된 행
+    rows = database.get_law_tree_rows()
+
+    # 1단계: 딕셔너리 기반 계층 구조 생성 (중복 제거)
+    tree = {}
+    for row in rows:
+        sheet_name = row['sheet_name']
+        article_num = row['article_num']
+        article_title = row['article_title'] or ''
+        paragraph_num = row['paragraph_num']
+        paragraph_content = row['paragraph_content'] or row['full_text'] or ''
+        law_id = row['law_id']
+
+        # 지침 (Get or Create)
+        if sheet_name not in tree:
+            tree[sheet_name] = {}
+
+        # 조 (Get or Create) - 이미 존재하면 기존 객체 사용
+        article_key = f"제{article_num}조"
+        if article_key not in tree[sheet_name]:
+            tree[sheet_name][article_key] = {
+                'title': article_title,
+                'paragraphs': {}  # 딕셔너리로 변경! (Unique Key 기반 중복 제거)
+            }
+
+        # 항 (Unique Key로 중복 제거)
+        if paragraph_content:
+            # law_id를 Unique Key로 사용 (더 안정적)
+            para_key = law_id or f"{paragraph_num}_{hash(paragraph_content)}"
+            if para_key not in tree[sheet_name][article_key]['paragraphs']:
+                if paragraph_num:
+                    try:
+                        para_text = f"제{int(float(paragraph_num))}항: {paragraph_content}"
+                    except (ValueError, TypeError):
+                        para_text = f"{paragraph_num}: {paragraph_content}"
+                else:
+                    para_text = paragraph_content
+                tree[sheet_name][article_key]['paragraphs'][para_key] = para_text
+
+    # 2단계: 딕셔너리 → 리스트 변환 (행이 이미 정렬되어 있으므로 삽입 순서 유지)
+    sorted_tree = {}
+    for sheet_name, articles in tree.items():
+        sorted_tree[sheet_name] = {}
+        for article_key, article_data in articles.items():
+            sorted_tree[sheet_name][article_key] = {
+                'title': article_data['title'],
+                'paragraphs': list(article_data['paragraphs'].values())  # 리스트로 변환
+            }
 
-    def extract_article_number(article_key):
-        """'제123조' → 123 추출 (Natural Sort용)"""
-        match = re.search(r'제(\d+)조', article_key)
-        return int(match.group(1)) if match else float('inf')
+    print(f"[Server] 마스터 트리 로드 완료: {len(sorted_tree)}개 지침, 총 {sum(len(v) for v in sorted_tree.values())}개 조항")
+    return sorted_tree
 
-    try:
-        conn = sqlite3.connect('data/chatbot.db')
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-
-        # 모든 법령 데이터 조회 (정렬 제거 - Python에서 Natural Sort 적용)
-        cursor.execute('''
-            SELECT sheet_name, article_num, article_title, paragraph_num, paragraph_content, full_text, law_id
-            FROM laws
-            WHERE sheet_name IS NOT NULL AND article_num IS NOT NULL
-        ''')
-
-        rows = cursor.fetchall()
-        conn.close()
-
-        # 1단계: 딕셔너리 기반 계층 구조 생성 (중복 제거)
-        tree = {}
-        for row in rows:
-            sheet_name = row['sheet_name']
-            article_num = row['article_num']
-            article_title = row['article_title'] or ''
-            paragraph_num = row['paragraph_num']
-            paragraph_content = row['paragraph_content'] or row['full_text'] or ''
-            law_id = row['law_id']
-
-            # 지침 (Get or Create)
-            if sheet_name not in tree:
-                tree[sheet_name] = {}
-
-            # 조 (Get or Create) - 이미 존재하면 기존 객체 사용
-            article_key = f"제{article_num}조"
-            if article_key not in tree[sheet_name]:
-                tree[sheet_name][article_key] = {
-                    'title': article_title,
-                    'paragraphs': {}  # 딕셔너리로 변경! (Unique Key 기반 중복 제거)
-                }
+# Load FAQ records from faq_topic.xlsx (없으면 faqs 테이블) - 요청 처리 중에는 pandas를 쓰지 않음
+FAQ_DIRECT_THRESHOLD = float(os.getenv('FAQ_DIRECT_THRESHOLD', '0.85'))  # FAQ 직접 사용 임계값
 
-            # 항 (Unique Key로 중복 제거)
-            if paragraph_content:
-                # law_id를 Unique Key로 사용 (더 안정적)
-                para_key = law_id or f"{paragraph_num}_{hash(paragraph_content)}"
-                if para_key not in tree[sheet_name][article_key]['paragraphs']:
-                    if paragraph_num:
-                        try:
-                            para_text = f"제{int(float(paragraph_num))}항: {paragraph_content}"
-                        except (ValueError, TypeError):
-                            para_text = f"{paragraph_num}: {paragraph_content}"
-                    else:
-                        para_text = paragraph_content
-                    tree[sheet_name][article_key]['paragraphs'][para_key] = para_text
-
-        # 2단계: Natural Sort 적용 + 딕셔너리 → 리스트 변환
-        sorted_tree = {}
-        for sheet_name, articles in tree.items():
-            # 조항 정렬 (제1조, 제2조, ... 제10조 순)
-            sorted_articles = sorted(articles.items(), key=lambda x: extract_article_number(x[0]))
-
-            sorted_tree[sheet_name] = {}
-            for article_key, article_data in sorted_articles:
-                sorted_tree[sheet_name][article_key] = {
-                    'title': article_data['title'],
-                    'paragraphs': list(article_data['paragraphs'].values())  # 리스트로 변환
-                }
+def load_faq_store():
+    """FAQ 레코드 저장소 생성 (faq_topic.xlsx 우선, 없으면 faqs 테이블, 읽기 실패 시 예외)"""
+    faq_file_path = os.path.join(os.path.dirname(__file__), 'data', 'faq_topic.xlsx')
+    if os.path.exists(faq_file_path):
+        store = FaqStore(pd.read_excel(faq_file_path).to_dict('records'))
+        app.logger.info(f"Loaded {len(store)} FAQ records from {faq_file_path}")
+    else:
+        app.logger.warning(f"FAQ file not found: {faq_file_path}, loading faqs table")
+        store = FaqStore(database.get_all_faqs())
+        app.logger.info(f"Loaded {len(store)} FAQ records from faqs table")
+    app.logger.info(f"FAQ direct match threshold: {FAQ_DIRECT_THRESHOLD}")
+    return store
+
+def load_faq_law_links():
+    """미리 계산된 FAQ policy_anchor → 법령 연결 적재 (없으면 요청 시 직접 검색, 읽기 실패 시 예외)"""
+    links = database.load_faq_law_links()
+    app.logger.info(f"Loaded policy_anchor law links for {len(links)} FAQs")
+    return links
 
-        LAW_MASTER_TREE = sorted_tree
-        print(f"[Server] 마스터 트리 로드 완료: {len(sorted_tree)}개 지침, 총 {sum(len(v) for v in sorted_tree.values())}개 조항")
+# ========================================
+# 로컬 FAQ 벡터 인덱스 (FAQ_RETRIEVER=local이면 Dify 대신 사용, dify면 Dify 실패 시 폴백)
+# ========================================
+FAQ_RETRIEVER = os.getenv('FAQ_RETRIEVER', 'dify').lower()  # 'dify' or 'local'
+FAQ_INDEX_PATH = os.getenv('FAQ_INDEX_PATH', os.path.join(os.path.dirname(__file__), 'data', 'faq_index.npz'))
+FAQ_INDEX_MIN_SCORE = float(os.getenv('FAQ_INDEX_MIN_SCORE', '0.2'))
 
+def build_faq_ngram_matcher(faq_store):
+    """로컬 FAQ 매칭용 n-gram 역색인 생성 (search_faq_local)"""
+    try:
+        matcher = FaqNgramMatcher(faq_store.rows())
+        app.logger.info(f"FAQ n-gram matcher ready: {len(matcher)} FAQs")
+        return matcher
     except Exception as e:
-        print(f"[Server] 마스터 트리 로드 실패: {e}")
-        import traceback
-        traceback.print_exc()
-        LAW_MASTER_TREE = {}
+        app.logger.error(f"Failed to build FAQ n-gram matcher: {e}")
+        return None
 
-# 서버 시작 시 마스터 트리 로드
-build_law_master_tree()
+def build_faq_vector_index(faq_store):
+    """FAQ 레코드로 벡터 인덱스 생성 (캐시 파일이 유효하면 재사용)"""
+    try:
+        index = FaqVectorIndex(faq_store.rows(), cache_path=FAQ_INDEX_PATH)
+        app.logger.info(f"FAQ vector index ready: {len(index)} FAQs "
+                        f"({'loaded from cache' if index.loaded_from_cache else 'built'})")
+        return index
+    except Exception as e:
+        app.logger.error(f"Failed to build FAQ vector index: {e}")
+        app.logger.error(traceback.format_exc())
+        return None
 
-# Load FAQ policy mapping from faq_topic.xlsx
-faq_policy_map = {}
-faq_df_global = None  # FAQ 전체 데이터 보관 (직접 매칭용)
-FAQ_DIRECT_THRESHOLD = float(os.getenv('FAQ_DIRECT_THRESHOLD', '0.85'))  # FAQ 직접 사용 임계값
+app.logger.info(f"FAQ retriever: {FAQ_RETRIEVER}")
 
-try:
-    faq_file_path = os.path.join(os.path.dirname(__file__), 'data', 'faq_topic.xlsx')
-    if os.path.exists(faq_file_path):
-        faq_df_global = pd.read_excel(faq_file_path)  # 전체 데이터프레임 보관
-        faq_policy_map = dict(zip(faq_df_global['faq_id'], faq_df_global['policy_anchor']))
-        app.logger.info(f"Loaded {len(faq_policy_map)} FAQ policy mappings from {faq_file_path}")
-        app.logger.info(f"FAQ direct match threshold: {FAQ_DIRECT_THRESHOLD}")
-    else:
-        app.logger.warning(f"FAQ file not found: {faq_file_path}")
-except Exception as e:
-    app.logger.error(f"Failed to load FAQ policy mapping: {e}")
-    app.logger.error(traceback.format_exc())
+def search_faq_vector(user_message, top_k=3):
+    """
+    로컬 FAQ 벡터 인덱스 검색 (call_dify_knowledge_async()와 같은 반환 형식)
+
+    Returns:
+        dict: {'success', 'records', 'query', 'elapsed_time', 'source'}
+    """
+    faq_vector_index = current_data().faq_vector_index
+    if faq_vector_index is None:
+        return {'success': False, 'error': 'FAQ vector index unavailable', 'records': []}
+
+    start = time.perf_counter()
+    records = faq_vector_index.search(user_message, top_k=top_k, min_score=FAQ_INDEX_MIN_SCORE)
+    elapsed_time = time.perf_counter() - start
+
+    app.logger.info(f"[FAQ Index] Retrieved {len(records)} FAQs in {elapsed_time * 1000:.2f}ms")
+    if app.logger.isEnabledFor(logging.DEBUG):
+        for idx, record in enumerate(records):
+            app.logger.debug(f"FAQ {idx+1} - {record['faq_id']} - Score: {record['score']:.3f} {record['scores']}")
+
+    return {
+        'success': True,
+        'records': records,
+        'query': user_message,
+        'elapsed_time': elapsed_time,
+        'source': 'local_index'
+    }
+
+# ========================================
+# 응답 캐시 (반복 질문은 OpenAI/Dify 호출 없이 응답)
+# ========================================
+RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'True').lower() == 'true'
+response_cache = ResponseCache(
+    max_entries=int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '500')),
+    ttl=float(os.getenv('RESPONSE_CACHE_TTL', '21600')),
+    similarity_threshold=float(os.getenv('RESPONSE_CACHE_SIMILARITY', '0.85')),
+    source_paths=[
+        os.path.join(os.path.dirname(__file__), database.DB_PATH),
+        os.path.join(os.path.dirname(__file__), 'data', 'faq_topic.xlsx')
+    ]
+)
+app.logger.info(f"Response cache enabled: {RESPONSE_CACHE_ENABLED}")
+metrics.CallbackMetric(
+    'chatbot_response_cache_lookups_total', 'Response cache lookups by result', 'counter',
+    lambda: [({'result': key[len('hits_'):] if key.startswith('hits_') else 'miss'}, value)
+             for key, value in response_cache.stats().items() if key.startswith('hits_') or key == 'misses'])
+metrics.CallbackMetric(
+    'chatbot_response_cache_hit_ratio', 'Response cache hit rate since start', 'gauge',
+    lambda: [({}, response_cache.stats()['hit_rate'])])
+metrics.CallbackMetric(
+    'chatbot_response_cache_entries', 'Response cache entries', 'gauge',
+    lambda: [({}, response_cache.stats()['entries'])])
+
+def build_faq_cache_key(faq_id, policy_anchor):
+    """FAQ 높은 매칭 응답의 캐시 보조 키 (faq_id + policy_anchor)"""
+    return f"faq:{faq_id}|{policy_anchor or ''}"
+
+def lookup_cached_response(user_message, prompt_template=None):
+    """
+    질문으로 응답 캐시 조회 (검색/LLM 호출 전에 실행)
+
+    사용자 지정 prompt_template 요청은 답변이 달라질 수 있으므로 캐시하지 않습니다.
+    """
+    if not RESPONSE_CACHE_ENABLED or prompt_template:
+        return None
+    # 실패는 FAQ 보조 키 조회까지 끝난 뒤 lookup_faq_cached_response()에서 1건만 집계
+    hit = response_cache.get(user_message, count_miss=False)
+    if hit:
+        app.logger.info(f"[Response Cache] {hit['match']} hit (similarity {hit['similarity']}, age {hit['age']}s)")
+    return hit
+
+def store_cached_response(user_message, context, assistant_message, suggested_answer, prompt_template=None):
+    """
+    생성된 응답을 캐시에 저장
+
+    대화 기록에 따라 답이 달라지는 OpenAI 직접 모드 응답과 오류 응답은 저장하지 않습니다.
+    """
+    if not RESPONSE_CACHE_ENABLED or prompt_template:
+        return
+    if context['answer_prompt']['kind'] == 'openai' or suggested_answer == SUGGESTED_ANSWER_ERROR_HTML:
+        return
+    response_cache.put(user_message, {
+        'message': assistant_message,
+        'suggested_answer': suggested_answer,
+        'related_laws': context['related_laws'],
+        'matched_faq_id': context['matched_faq_id']
+    }, alt_key=context['faq_cache_key'])
+
+def build_cache_metadata(hit):
+    """캐시 적중 응답의 metadata"""
+    return {
+        'ai_mode': AI_MODE,
+        'matched_faq_id': hit['value'].get('matched_faq_id'),
+        'cache': {
+            'hit': True,
+            'match': hit['match'],
+            'similarity': hit['similarity'],
+            'cached_question': hit['cached_question'],
+            'age': hit['age']
+        }
+    }
+
+# ========================================
+# 참조 데이터 스냅샷 (법령 트리 + FAQ 인덱스) 및 핫 리로드
+# ========================================
+DATA_RELOAD_INTERVAL = float(os.getenv('DATA_RELOAD_INTERVAL', '10'))  # 파일 확인 주기(초), 0이면 수동만
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')  # 설정 시 관리자 API에 X-Admin-Token 헤더 필요 (미설정이면 POST는 로컬 요청만)
+_LOCAL_ADDRESSES = ('127.0.0.1', '::1')
+
+class ReferenceData(NamedTuple):
+    """요청 처리에 쓰는 읽기 전용 데이터 묶음 (재적재 시 통째로 교체)"""
+    version: int
+    law_master_tree: dict
+    master_tree_payload: PrecompressedPayload
+    law_tree_index: LawTreeIndex  # 지연 로딩 트리 API용 페이지 인덱스
+    faq_store: FaqStore
+    faq_law_links: dict          # {faq_id: {anchor: [law, ...]}}
+    faq_ngram_matcher: Optional[FaqNgramMatcher]
+    faq_vector_index: Optional[FaqVectorIndex]
+
+def build_reference_data(version):
+    """
+    DB/FAQ 원본에서 새 스냅샷 생성 (기존 스냅샷은 교체 전까지 계속 사용)
+
+    원본을 읽지 못하면 예외를 그대로 올려 DataReloader가 기존 스냅샷을 유지하게 합니다.
+    교체할 스냅샷이 없는 첫 적재만 빈 데이터로 시작합니다 (DB가 준비되면 재적재로 교체).
+    """
+    # DB 파일이 새로 만들어졌을 수 있으므로 풀 연결을 새로 열도록 함
+    database.reset_connection_pool()
+
+    try:
+        tree = build_law_master_tree()
+        store = load_faq_store()
+        faq_law_links = load_faq_law_links()
+    except Exception:
+        if data_reloader.current is not None:
+            raise
+        app.logger.exception('[Reload] Failed to load reference data, starting with empty data')
+        tree, store, faq_law_links = {}, FaqStore([]), {}
+
+    payload = build_master_tree_payload(tree)
+    return ReferenceData(
+        version=version,
+        law_master_tree=tree,
+        master_tree_payload=payload,
+        law_tree_index=LawTreeIndex(tree, payload.version),
+        faq_store=store,
+        faq_law_links=faq_law_links,
+        faq_ngram_matcher=build_faq_ngram_matcher(store),
+        faq_vector_index=build_faq_vector_index(store)
+    )
+
+def on_reference_data_swap(data):
+    """스냅샷 교체 후 이전 데이터로 만든 응답 캐시 무효화 (시작 시 첫 적재 제외)"""
+    if data.version > 1:
+        response_cache.invalidate()
+
+data_reloader = DataReloader(
+    build_reference_data,
+    watch_paths=[
+        os.path.join(os.path.dirname(__file__), database.DB_PATH),
+        os.path.join(os.path.dirname(__file__), database.DB_PATH + '-wal'),
+        os.path.join(os.path.dirname(__file__), 'data', 'faq_topic.xlsx')
+    ],
+    interval=DATA_RELOAD_INTERVAL,
+    on_swap=on_reference_data_swap,
+    logger=app.logger
+)
+data_reloader.reload(reason='startup')  # 서버 시작 시 1회 (동기)
+data_reloader.start()
+
+def current_data() -> ReferenceData:
+    """현재 참조 데이터 스냅샷 (한 요청 안에서는 한 번 받아 재사용 권장)"""
+    return data_reloader.current
 
 # Request/Response logging middleware
+@app.before_request
+def assign_request_id():
+    """요청 ID 설정 (X-Request-ID 헤더가 있으면 사용), 이 요청의 모든 로그에 request_id로 기록"""
+    g.request_id = request.headers.get('X-Request-ID') or log_pipeline.new_request_id()
+    g.request_id_token = log_pipeline.set_request_id(g.request_id)
+
 @app.before_request
 def log_request_info():
     """Log information about incoming requests"""
-    app.logger.debug('Request Headers: %s', dict(request.headers))
     app.logger.info('Request: %s %s', request.method, request.path)
+    # 헤더 dict 변환과 본문 JSON 직렬화는 DEBUG 레벨일 때만 수행
+    if not app.logger.isEnabledFor(logging.DEBUG):
+        return
+    app.logger.debug('Request Headers: %s', dict(request.headers))
     if request.method in ['POST', 'PUT', 'PATCH']:
         if request.is_json:
             # Don't log sensitive data
@@ -229,15 +529,38 @@ def log_request_info():
 @app.after_request
 def log_response_info(response):
     """Log information about outgoing responses"""
-    app.logger.info('Response: %s %s - Status: %s', 
+    app.logger.info('Response: %s %s - Status: %s',
                     request.method, request.path, response.status)
+    if 'request_id' in g:
+        response.headers['X-Request-ID'] = g.request_id
+    return response
+
+@app.teardown_request
+def clear_request_id(exc):
+    token = g.pop('request_id_token', None)
+    if token is not None:
+        log_pipeline.reset_request_id(token)
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    """라우트별 요청 수/지연시간 집계 (스트리밍 응답은 본문 전송 전까지의 시간)"""
+    start = g.get('request_start')
+    if start is not None:
+        # 경로 대신 라우트 규칙을 레이블로 사용 (레이블 수가 URL 수만큼 늘지 않도록)
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        http_request_duration.observe(time.perf_counter() - start, method=request.method, route=route)
+        http_requests_total.inc(method=request.method, route=route, status=response.status_code)
     return response
 
 @app.route('/')
 def index():
     """Render the main chat interface"""
     app.logger.info('Main page accessed from IP: %s', request.remote_addr)
-    return render_template('index.html')
+    return render_template('index.html', master_tree_version=current_data().master_tree_payload.version)
 
 def extract_keywords_from_question(question: str) -> list:
     """
@@ -301,334 +624,784 @@ def search_laws_by_keywords(keywords: list, limit: int = 5) -> list:
 
     return all_results[:limit]
 
-@app.route('/api/chat', methods=['POST'])
-def chat():
-    """Handle chat messages and generate responses"""
-    session_id = None
+# ========================================
+# 채팅 처리 흐름의 외부 I/O (Flask/ASGI 공통 흐름은 async 함수로 한 번만 작성)
+# - 처리 흐름(run_chat_async 등)은 io 인자로 받은 ChatIO로만 외부 I/O를 실행
+# - Flask: ChatIO (동기 클라이언트, 요청 스레드에서 run_flow()로 실행)
+# - ASGI: asgi_app.AsyncChatIO (AsyncOpenAI, AsyncDifyClient, 스레드 풀)
+# ========================================
+# 흐름 안의 동기 헬퍼가 다시 run_flow()를 부를 때 사용 (예: 대화 요약의 complete_chat)
+_nested_flow_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='flow')
+
+def run_flow(coro_func, *args, **kwargs):
+    """
+    처리 흐름 코루틴을 현재 스레드의 새 이벤트 루프에서 끝까지 실행 (Flask 요청/작업 스레드용)
+
+    이미 이벤트 루프가 도는 스레드(ChatIO.call로 실행한 동기 헬퍼)에서 호출되면
+    루프 없는 스레드에서 실행하고 결과를 기다립니다.
+    """
+    coro = coro_func(*args, **kwargs)
     try:
-        data = request.get_json()
-        user_message = data.get('message', '')
-        session_id = data.get('session_id', str(uuid.uuid4()))
-        prompt_template = data.get('prompt_template', None)  # 선택적 프롬프트 템플릿
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    return _nested_flow_executor.submit(contextvars.copy_context().run, asyncio.run, coro).result()
 
-        app.logger.info(f'Chat request from session {session_id}: {user_message[:100]}...')
-        api_logger.info(f'Session {session_id} - User message: {user_message}')
+class ChatIO:
+    """
+    Flask용 외부 I/O (동기 OpenAI/Dify 클라이언트)
 
-        # Initialize session if new
-        if session_id not in chat_sessions:
-            chat_sessions[session_id] = {
-                'messages': [],
-                'created_at': datetime.now()
-            }
+    블로킹 호출은 이벤트 루프를 돌리는 요청 스레드에서 그대로 실행하고(루프는 요청마다 따로),
+    동시에 실행할 작업(검색 브랜치, parallel 생성)만 start()로 스레드 풀에서 실행합니다.
+    """
 
-        # Add user message to session
-        chat_sessions[session_id]['messages'].append({
-            'role': 'user',
-            'content': user_message
-        })
+    # call_dify_knowledge_async()가 구분하는 예외 (클라이언트 라이브러리별)
+    timeout_errors = (requests.exceptions.Timeout,)
+    http_errors = (requests.exceptions.RequestException,)
+
+    async def call(self, func, *args):
+        """SQLite/CPU/세션 저장 등 블로킹 함수 실행"""
+        return func(*args)
+
+    async def chat_completion(self, **kwargs):
+        return client.chat.completions.create(**kwargs)
+
+    async def chat_completion_stream(self, **kwargs):
+        """스트리밍 Chat Completion 청크를 async iterator로 반환"""
+        for chunk in client.chat.completions.create(stream=True, **kwargs):
+            yield chunk
+
+    async def dify_retrieve(self, payload):
+        return dify_client.retrieve(payload)
 
-        assistant_message = None
-        retrieved_docs = []
-        matched_faq_id = None
-        related_laws = []
+    def start(self, executor, coro_func, *args):
+        """
+        coro_func(*args)를 다른 작업과 동시에 실행 (await 가능한 future 반환)
 
-        # ===== [Action A] 키워드 추출 & SQLite 법령 검색 (즉시 실행) =====
-        app.logger.info('[Action A] Extracting keywords and searching SQLite DB')
+        executor 스레드에서 별도 이벤트 루프로 실행하며 현재 컨텍스트(trace, 요청 ID)를 복사합니다.
+        반환된 future를 취소하면 아직 시작하지 않은 작업은 실행되지 않습니다.
+        """
+        future = executor.submit(contextvars.copy_context().run, run_flow, coro_func, *args)
+        return asyncio.wrap_future(future)
+
+chat_io = ChatIO()
+
+# ========================================
+# 검색 단계 병렬 실행 (SQLite 키워드 검색 / Dify 검색 / 로컬 FAQ 매칭)
+# ========================================
+RETRIEVAL_MAX_WORKERS = int(os.getenv('RETRIEVAL_MAX_WORKERS', '8'))
+RETRIEVAL_TIMEOUTS = {
+    'sqlite': float(os.getenv('RETRIEVAL_SQLITE_TIMEOUT', '2')),
+    'dify': float(os.getenv('RETRIEVAL_DIFY_TIMEOUT', '30')),
+    'local_faq': float(os.getenv('RETRIEVAL_LOCAL_FAQ_TIMEOUT', '2'))
+}
+# 풀이 모두 사용 중일 때 브랜치가 작업 스레드를 기다리는 최대 시간(초), 넘으면 시간 초과로 처리
+RETRIEVAL_QUEUE_TIMEOUT = float(os.getenv('RETRIEVAL_QUEUE_TIMEOUT', '5'))
+LOCAL_FAQ_THRESHOLD = 0.5
+
+# 워커 스레드는 재사용되므로 스레드별 SQLite 풀 연결도 요청 간에 재사용됨
+retrieval_executor = ThreadPoolExecutor(
+    max_workers=RETRIEVAL_MAX_WORKERS,
+    thread_name_prefix='retrieval'
+)
+
+def _retrieve_sqlite_laws(user_message):
+    """[Branch] 키워드 추출 + SQLite 법령 검색"""
+    with request_trace.span('keywords'):
         keywords = extract_keywords_from_question(user_message)
-        app.logger.info(f'Extracted keywords: {keywords}')
+    return {'keywords': keywords, 'laws': search_laws_by_keywords(keywords, limit=5)}
+
+async def _retrieve_dify_faq(io, user_message):
+    """[Branch] FAQ 검색 (Dify Knowledge 또는 로컬 벡터 인덱스)"""
+    if FAQ_RETRIEVER == 'local':
+        return await io.call(search_faq_vector, user_message, 3)
+
+    result = await call_dify_knowledge_async(io, user_message, top_k=3)
+    if not result['success'] and current_data().faq_vector_index is not None:
+        app.logger.warning('[Retrieval] Dify FAQ search failed, using local FAQ index')
+        return await io.call(search_faq_vector, user_message, 3)
+    return result
+
+def _retrieve_local_faq(user_message):
+    """[Branch] 로컬 FAQ 매칭 (Dify 실패 시 폴백용으로 미리 계산)"""
+    return search_faq_local(user_message, threshold=LOCAL_FAQ_THRESHOLD)
+
+class _BranchStart:
+    """브랜치 제출/시작 시각 (브랜치가 실행을 시작하면 started 설정, 작업 스레드에서 호출 가능)"""
+
+    __slots__ = ('submitted', 'started_at', 'started', '_loop')
+
+    def __init__(self):
+        self.submitted = time.perf_counter()
+        self.started_at = None
+        self.started = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+
+    def mark(self):
+        self.started_at = time.perf_counter()
+        try:
+            self._loop.call_soon_threadsafe(self.started.set)
+        except RuntimeError:
+            pass  # 요청이 이미 끝나 루프가 닫힘 (결과는 버려짐)
+
+    @property
+    def queue_wait(self):
+        return (self.started_at if self.started_at is not None else time.perf_counter()) - self.submitted
+
+async def _timed_branch(io, name, func, user_message, branch_start):
+    """브랜치 함수를 실행하고 (결과, 소요시간) 반환 (동기 함수는 io.call로 실행)"""
+    branch_start.mark()
+    with request_trace.span(f'retrieval.{name}', queue_ms=round(branch_start.queue_wait * 1000, 1)):
+        start = time.perf_counter()
+        if inspect.iscoroutinefunction(func):
+            result = await func(io, user_message)
+        else:
+            result = await io.call(func, user_message)
+        return result, time.perf_counter() - start
 
-        sqlite_laws = search_laws_by_keywords(keywords, limit=5)
-        app.logger.info(f'Found {len(sqlite_laws)} laws from SQLite')
+async def run_retrieval_async(io, user_message, use_dify=True):
+    """
+    검색 단계를 동시에 실행하고 결과를 병합
 
-        # SQLite 검색 결과를 related_laws에 즉시 저장
-        for law in sqlite_laws:
-            related_laws.append({
-                'title': f"{law['sheet_name']} - {law['title']}",
-                'content': law['content'][:300] + ('...' if len(law['content']) > 300 else ''),
-                'article_num': law['article_num'],
-                'source': 'SQLite DB',
-                'matched_keyword': law.get('matched_keyword', '')
-            })
+    각 브랜치는 실행을 시작한 시점부터 RETRIEVAL_TIMEOUTS의 시간 제한을 가지며
+    (Flask에서 풀 대기 시간은 RETRIEVAL_QUEUE_TIMEOUT으로 따로 제한), 시간 초과나 오류가 나면
+    해당 브랜치만 빈 결과로 대체합니다. 전체 소요 시간은 브랜치 합이 아닌 최댓값입니다.
 
-        # ===== [Action B] Dify API 호출 (Hybrid RAG Mode) =====
-        if AI_MODE == 'dify':
-            try:
-                app.logger.info('Using Hybrid RAG mode (Dify FAQ + Local Policy Mapping)')
-
-                # STEP 1: Search FAQ in Dify Knowledge
-                app.logger.info('Step 1: Searching FAQ in Dify Knowledge')
-                faq_result = call_dify_knowledge(user_message, top_k=3)
-
-                if faq_result['success'] and faq_result['records']:
-                    retrieved_docs = faq_result['records']
-                    app.logger.info(f'Retrieved {len(retrieved_docs)} FAQ records')
-
-                    # STEP 2: Extract faq_id and score from best match
-                    app.logger.info('Step 2: Extracting faq_id from best match')
-                    best_faq = retrieved_docs[0]
-                    faq_score = best_faq.get('score', 0)
-                    faq_id = extract_faq_id_from_content(best_faq)
-
-                    app.logger.info(f'Best FAQ score: {faq_score}, threshold: {FAQ_DIRECT_THRESHOLD}')
-
-                    if faq_id:
-                        app.logger.info(f'Extracted faq_id: {faq_id}')
-                        matched_faq_id = faq_id
-
-                        # ★★★ FAQ 높은 매칭 체크 (score >= threshold) ★★★
-                        if faq_score >= FAQ_DIRECT_THRESHOLD:
-                            app.logger.info(f'[FAQ High Match] Score {faq_score} >= {FAQ_DIRECT_THRESHOLD}')
-
-                            # FAQ 답변 조회
-                            faq_data = get_faq_direct_answer(faq_id)
-
-                            if faq_data and faq_data.get('answer_text'):
-                                # ★ policy_anchor 기반 법령만 사용 (키워드 검색 결과 초기화)
-                                related_laws = []
-                                policy_docs = []
-
-                                if faq_data.get('policy_anchor'):
-                                    policy_anchors = [p.strip() for p in faq_data['policy_anchor'].split(';')]
-                                    for anchor in policy_anchors:
-                                        if anchor:
-                                            # ★ 새로운 policy_anchor 전용 검색 함수 사용
-                                            laws = database.search_laws_by_policy_anchor(anchor, limit=1)
-                                            for law in laws:
-                                                related_laws.append({
-                                                    'title': f"{law.get('sheet_name', '')} - {law.get('article_title', '')}",
-                                                    'content': (law.get('full_text') or law.get('paragraph_content') or '')[:500],
-                                                    'article_num': law.get('article_num', ''),
-                                                    'sheet_name': law.get('sheet_name', ''),
-                                                    'source': 'FAQ High Match',
-                                                    'matched_keyword': anchor
-                                                })
-                                                policy_docs.append({
-                                                    'segment': {
-                                                        'content': law.get('full_text') or law.get('paragraph_content') or '',
-                                                        'document': {'name': law.get('sheet_name', '')}
-                                                    },
-                                                    'score': 0.9
-                                                })
-
-                                # ★ GPT로 답변 생성 (FAQ + 법령 컨텍스트) - 포맷에 맞게
-                                app.logger.info('[FAQ High Match] Generating answer with GPT context')
-                                assistant_message = generate_answer_with_context(
-                                    user_message,
-                                    retrieved_docs,  # Dify에서 받은 FAQ 레코드
-                                    policy_docs if policy_docs else None
-                                )
-
-                                app.logger.info(f'[FAQ High Match] Completed - found {len(related_laws)} laws from policy_anchor')
-
-                                # 이후 정상 흐름 따라감 (suggested_answer 등)
-
-                            else:
-                                app.logger.warning(f'[FAQ High Match] Failed to get FAQ data, falling back to normal flow')
-
-                        # ★★★ 기존 로직: score가 낮으면 GPT 생성 ★★★
-                        app.logger.info(f'Using GPT generation (score {faq_score} < {FAQ_DIRECT_THRESHOLD} or FAQ data unavailable)')
-
-                        # STEP 3: Get policy_anchor from local mapping
-                        app.logger.info('Step 3: Getting policy_anchor from local mapping')
-                        policy_anchor = get_policy_anchor(faq_id)
-
-                        if policy_anchor:
-                            app.logger.info(f'Mapped policy_anchor: {policy_anchor[:100]}...')
-
-                            # STEP 4: Search policy documents in SQLite DB
-                            app.logger.info('Step 4: Searching policy documents in SQLite DB')
-                            policy_docs = []
-                            policy_anchors = [p.strip() for p in policy_anchor.split(';')]
+    Args:
+        io: ChatIO (Flask는 retrieval_executor 스레드, ASGI는 asyncio 태스크로 브랜치 실행)
+        user_message: 사용자 질문
+        use_dify: Dify/로컬 FAQ 브랜치 실행 여부 (AI_MODE == 'dify')
 
-                            for idx, anchor in enumerate(policy_anchors[:2], 1):  # Max 2 anchors
-                                app.logger.debug(f'Searching laws in SQLite {idx}: {anchor[:50]}...')
-                                laws = database.search_laws_by_policy_anchor(anchor, limit=2)
+    Returns:
+        dict: {'keywords', 'sqlite_laws', 'faq_result', 'local_faq_match', 'timings', 'queue_waits'}
+    """
+    branches = {'sqlite': _retrieve_sqlite_laws}
+    defaults = {
+        'sqlite': {'keywords': [], 'laws': []},
+        'dify': {'success': False, 'error': 'Dify retrieval skipped', 'records': []},
+        'local_faq': None
+    }
+    if use_dify:
+        branches['dify'] = _retrieve_dify_faq
+        branches['local_faq'] = _retrieve_local_faq
+
+    with request_trace.span('retrieval'):
+        return await _run_retrieval_branches(io, branches, defaults, user_message)
+
+def run_retrieval(user_message, use_dify=True):
+    """run_retrieval_async()를 현재 스레드에서 실행 (prepare_chat_context 등 동기 코드용)"""
+    return run_flow(run_retrieval_async, chat_io, user_message, use_dify)
+
+async def _run_retrieval_branches(io, branches, defaults, user_message):
+    """run_retrieval_async() 본문 (브랜치를 동시에 시작하고 시간 제한 안에서 결과 수집)"""
+    start = time.perf_counter()
+    starts = {name: _BranchStart() for name in branches}
+    tasks = {
+        name: io.start(retrieval_executor, _timed_branch, io, name, func, user_message, starts[name])
+        for name, func in branches.items()
+    }
 
-                                # Convert SQLite format to Dify-compatible format
-                                for law in laws:
-                                    policy_docs.append({
-                                        'segment': {
-                                            'content': law['paragraph_content'] or law['full_text'],
-                                            'document': {'name': law['sheet_name']}
-                                        },
-                                        'score': 0.85  # SQLite doesn't provide scores
-                                    })
-                                    app.logger.debug(f'Found law: {law["article_title"] or law["law_title"]}')
+    results = dict(defaults)
+    timings = {}
+    for name, task in tasks.items():
+        branch_start = starts[name]
+        try:
+            if not branch_start.started.is_set():
+                # 풀이 밀려 아직 시작하지 못한 브랜치는 시작할 때까지 기다림 (시간 안에 시작하지 못하면 취소)
+                queue_remaining = RETRIEVAL_QUEUE_TIMEOUT - branch_start.queue_wait
+                try:
+                    await asyncio.wait_for(branch_start.started.wait(), max(queue_remaining, 0))
+                except asyncio.TimeoutError:
+                    if branch_start.started_at is None:
+                        task.cancel()
+                        raise
+            # 시간 제한은 브랜치가 실제로 실행을 시작한 시점부터
+            remaining = RETRIEVAL_TIMEOUTS[name] - (time.perf_counter() - branch_start.started_at)
+            results[name], timings[name] = await asyncio.wait_for(task, timeout=max(remaining, 0))
+        except asyncio.TimeoutError:
+            if branch_start.started_at is None:
+                app.logger.warning(f'[Retrieval] {name} branch not started after {RETRIEVAL_QUEUE_TIMEOUT}s '
+                                   f'in queue (pool busy)')
+            else:
+                app.logger.warning(f'[Retrieval] {name} branch timed out after {RETRIEVAL_TIMEOUTS[name]}s')
+            timings[name] = None
+            if name == 'dify':
+                results[name] = {'success': False, 'error': 'Dify retrieval timeout', 'records': []}
+        except Exception as e:
+            app.logger.error(f'[Retrieval] {name} branch failed: {e}')
+            app.logger.error(traceback.format_exc())
+            timings[name] = None
+            if name == 'dify':
+                results[name] = {'success': False, 'error': str(e), 'records': []}
+
+    timings['total'] = time.perf_counter() - start
+    queue_waits = {name: branch_start.queue_wait for name, branch_start in starts.items()}
+    for name, wait in queue_waits.items():
+        retrieval_queue_wait.observe(wait, branch=name)
+    app.logger.info('[Retrieval] ' + ', '.join(
+        f'{name}={elapsed:.3f}s' if elapsed is not None else f'{name}=timeout/error'
+        for name, elapsed in timings.items()
+    ) + ' | queue ' + ', '.join(f'{name}={wait:.3f}s' for name, wait in queue_waits.items()))
+
+    return {
+        'keywords': results['sqlite']['keywords'],
+        'sqlite_laws': results['sqlite']['laws'],
+        'faq_result': results['dify'],
+        'local_faq_match': results['local_faq'],
+        'timings': timings,
+        'queue_waits': queue_waits
+    }
 
-                            app.logger.info(f'Total policy docs retrieved from SQLite: {len(policy_docs)}')
+def search_policy_anchor_laws(data, policy_anchors, limit, faq_id=None):
+    """
+    여러 policy_anchor의 법령 조회
 
-                            # STEP 5: Generate answer with FAQ + Policy context
-                            app.logger.info('Step 5: Generating answer with FAQ + Policy context')
-                            assistant_message = generate_answer_with_context(
-                                user_message,
-                                retrieved_docs,
-                                policy_docs
-                            )
+    faq_id의 미리 계산된 연결(faq_law_links)이 있으면 dict 조회로 끝내고,
+    연결에 없는 anchor만 SQLite 검색을 동시에 실행합니다.
 
-                            # STEP 6: Build related_laws from policy_anchor (NOT LLM generated!)
-                            related_laws = []
-                            for anchor in policy_anchors:
-                                related_laws.append({
-                                    'title': anchor.strip(),
-                                    'source': 'FAQ Database',
-                                    'faq_id': faq_id
-                                })
+    Args:
+        data: 요청 시작 시 잡은 참조 데이터 스냅샷 (current_data())
 
-                            app.logger.info(f'Hybrid RAG completed successfully for faq_id: {faq_id}')
+    Returns:
+        list: [(anchor, laws), ...] (입력 순서 유지, 빈 anchor 제외)
+    """
+    anchors = [anchor for anchor in policy_anchors if anchor]
+    linked = data.faq_law_links.get(faq_id, {})
+
+    resolved = {anchor: linked[anchor][:limit] for anchor in anchors if anchor in linked}
+    missing = [anchor for anchor in anchors if anchor not in resolved]
+    if len(missing) == 1:
+        resolved[missing[0]] = database.search_laws_by_policy_anchor(missing[0], limit=limit)
+    elif missing:
+        laws_per_anchor = retrieval_executor.map(
+            request_trace.bind(lambda anchor: database.search_laws_by_policy_anchor(anchor, limit=limit)),
+            missing
+        )
+        resolved.update(zip(missing, laws_per_anchor))
 
-                        else:
-                            # No policy_anchor found, use FAQ only
-                            app.logger.warning(f'No policy_anchor found for {faq_id}, using FAQ only')
-                            assistant_message = generate_answer_with_context(
-                                user_message,
-                                retrieved_docs,
-                                None
-                            )
+    return [(anchor, resolved[anchor]) for anchor in anchors]
 
-                    else:
-                        # Could not extract faq_id, use basic RAG
-                        app.logger.warning('Could not extract faq_id, using basic Dify RAG')
-                        assistant_message = generate_answer_with_dify_rag(
-                            user_message,
-                            retrieved_docs,
-                            prompt_template
-                        )
+def prepare_chat_context(session_id, user_message, prompt_template=None, retrieval=None):
+    """
+    채팅 요청의 검색 단계 실행 및 답변 프롬프트 구성 (/api/chat, /api/chat/stream 공통)
+
+    세션에 사용자 메시지를 추가하고, 검색(SQLite/Dify/로컬 FAQ)을 거쳐
+    related_laws와 LLM에 보낼 답변 프롬프트를 만듭니다. LLM 호출은 하지 않습니다.
+
+    Args:
+        session_id: 채팅 세션 ID
+        user_message: 사용자 질문
+        prompt_template: 선택적 프롬프트 템플릿 (Dify 기본 RAG 모드에서 사용)
+        retrieval: 이미 실행한 검색 결과 (run_chat_async는 검색을 먼저 실행, 없으면 여기서 run_retrieval() 실행)
+
+    Returns:
+        dict: {'answer_prompt', 'answer_path', 'related_laws', 'matched_faq_id', 'faq_cache_key',
+               'retrieved_docs', 'keywords', 'sqlite_laws', 'retrieval'}
+    """
+    # 요청 처리 중 참조 데이터가 교체되어도 FAQ/정책 매핑/법령 연결을 같은 버전에서 조회
+    data = current_data()
 
-                    app.logger.info(f'Answer generated for session {session_id}')
+    # Add user message to session (created if new)
+    chat_sessions.append_message(session_id, 'user', user_message)
 
-                # Fallback: Dify 실패 시 로컬 FAQ 검색 시도
-                elif FALLBACK_TO_OPENAI:
-                    app.logger.warning('Dify FAQ search failed or no results, trying local FAQ search')
+    answer_prompt = None
+    retrieved_docs = []
+    matched_faq_id = None
+    faq_cache_key = None  # FAQ 높은 매칭 시 응답 캐시 보조 키
+    related_laws = []
+    answer_path = None  # 답변 경로 (/metrics chatbot_answer_path_total, metadata.answer_path)
 
-                    # ★ 로컬 FAQ 검색 시도
-                    local_faq_match = search_faq_local(user_message, threshold=0.5)
+    # ===== 검색 단계 병렬 실행: [Action A] SQLite 키워드 검색 + [Action B] Dify/로컬 FAQ =====
+    if retrieval is None:
+        app.logger.info('[Retrieval] Running SQLite, Dify and local FAQ searches concurrently')
+        retrieval = run_retrieval(user_message, use_dify=(AI_MODE == 'dify'))
 
-                    if local_faq_match and local_faq_match.get('score', 0) >= FAQ_DIRECT_THRESHOLD:
-                        # 로컬 FAQ에서 높은 매칭 발견
-                        faq_id = local_faq_match['faq_id']
-                        faq_score = local_faq_match['score']
-                        matched_faq_id = faq_id
-                        app.logger.info(f'[Local FAQ Match] Score {faq_score:.2f} >= {FAQ_DIRECT_THRESHOLD}')
+    # ===== [Action A] 키워드 추출 & SQLite 법령 검색 결과 =====
+    keywords = retrieval['keywords']
+    app.logger.info(f'Extracted keywords: {keywords}')
 
-                        faq_data = get_faq_direct_answer(faq_id)
+    sqlite_laws = retrieval['sqlite_laws']
+    app.logger.info(f'Found {len(sqlite_laws)} laws from SQLite')
+
+    # SQLite 검색 결과를 related_laws에 즉시 저장
+    for law in sqlite_laws:
+        related_laws.append({
+            'title': f"{law['sheet_name']} - {law['title']}",
+            'content': law['content'][:300] + ('...' if len(law['content']) > 300 else ''),
+            'article_num': law['article_num'],
+            'source': 'SQLite DB',
+            'matched_keyword': law.get('matched_keyword', '')
+        })
+
+    # ===== [Action B] Dify API 호출 (Hybrid RAG Mode) =====
+    if AI_MODE == 'dify':
+        try:
+            app.logger.info('Using Hybrid RAG mode (Dify FAQ + Local Policy Mapping)')
+
+            # STEP 1: Search FAQ in Dify Knowledge
+            app.logger.info('Step 1: Searching FAQ in Dify Knowledge')
+            faq_result = retrieval['faq_result']
+
+            if faq_result['success'] and faq_result['records']:
+                retrieved_docs = faq_result['records']
+                answer_path = 'dify_rag'
+                app.logger.info(f'Retrieved {len(retrieved_docs)} FAQ records')
+
+                # STEP 2: Extract faq_id and score from best match
+                app.logger.info('Step 2: Extracting faq_id from best match')
+                best_faq = retrieved_docs[0]
+                faq_score = best_faq.get('score', 0)
+                faq_id = extract_faq_id_from_content(best_faq)
+
+                app.logger.info(f'Best FAQ score: {faq_score}, threshold: {FAQ_DIRECT_THRESHOLD}')
+
+                if faq_id:
+                    app.logger.info(f'Extracted faq_id: {faq_id}')
+                    matched_faq_id = faq_id
+
+                    # ★★★ FAQ 높은 매칭 체크 (score >= threshold) ★★★
+                    if faq_score >= FAQ_DIRECT_THRESHOLD:
+                        app.logger.info(f'[FAQ High Match] Score {faq_score} >= {FAQ_DIRECT_THRESHOLD}')
+
+                        # FAQ 답변 조회
+                        faq_data = get_faq_direct_answer(data, faq_id)
 
                         if faq_data and faq_data.get('answer_text'):
-                            # policy_anchor 기반 법령 검색
-                            related_laws = []  # 키워드 검색 결과 초기화
+                            faq_cache_key = build_faq_cache_key(faq_id, faq_data.get('policy_anchor'))
+                            answer_path = 'faq_high_match'
+
+                            # ★ policy_anchor 기반 법령만 사용 (키워드 검색 결과 초기화)
+                            related_laws = []
                             policy_docs = []
 
                             if faq_data.get('policy_anchor'):
-                                policy_anchors = [p.strip() for p in faq_data['policy_anchor'].split(';')]
-                                for anchor in policy_anchors:
-                                    if anchor:
-                                        laws = database.search_laws_by_policy_anchor(anchor, limit=2)
-                                        for law in laws:
-                                            related_laws.append({
-                                                'title': f"{law.get('sheet_name', '')} - {law.get('article_title', '')}",
-                                                'content': (law.get('full_text') or law.get('paragraph_content') or '')[:500],
-                                                'article_num': law.get('article_num', ''),
-                                                'sheet_name': law.get('sheet_name', ''),
-                                                'source': 'Local FAQ Match',
-                                                'matched_keyword': anchor
-                                            })
-                                            # GPT 컨텍스트용 policy_docs
-                                            policy_docs.append({
-                                                'segment': {
-                                                    'content': law.get('full_text') or law.get('paragraph_content') or '',
-                                                    'document': {'name': law.get('sheet_name', '')}
-                                                },
-                                                'score': 0.9
-                                            })
-
-                            # FAQ를 Dify 포맷으로 변환해서 GPT에 전달
-                            faq_records = [{
-                                'segment': {
-                                    'content': f'faq_id":"{faq_id}";"question":"{faq_data["question"]}";"answer_text":"{faq_data["answer_text"]}"',
-                                    'document': {'name': 'Local FAQ'}
-                                },
-                                'score': faq_score
-                            }]
-
-                            # ★ GPT로 답변 생성 (FAQ + 법령 컨텍스트)
-                            app.logger.info('[Local FAQ Match] Generating answer with GPT context')
-                            assistant_message = generate_answer_with_context(
+                                policy_anchors = faq_data['policy_anchors']
+                                # ★ policy_anchor 전용 검색 함수를 anchor별로 동시에 실행
+                                for anchor, laws in search_policy_anchor_laws(data, policy_anchors, limit=1, faq_id=faq_id):
+                                    for law in laws:
+                                        related_laws.append({
+                                            'title': f"{law.get('sheet_name', '')} - {law.get('article_title', '')}",
+                                            'content': (law.get('full_text') or law.get('paragraph_content') or '')[:500],
+                                            'article_num': law.get('article_num', ''),
+                                            'sheet_name': law.get('sheet_name', ''),
+                                            'source': 'FAQ High Match',
+                                            'matched_keyword': anchor
+                                        })
+                                        policy_docs.append({
+                                            'segment': {
+                                                'content': law.get('full_text') or law.get('paragraph_content') or '',
+                                                'document': {'name': law.get('sheet_name', '')}
+                                            },
+                                            'score': 0.9
+                                        })
+
+                            # ★ GPT 답변 프롬프트 구성 (FAQ + 법령 컨텍스트) - 포맷에 맞게
+                            app.logger.info('[FAQ High Match] Building answer prompt with GPT context')
+                            answer_prompt = build_context_prompt(
                                 user_message,
-                                faq_records,
+                                retrieved_docs,  # Dify에서 받은 FAQ 레코드
                                 policy_docs if policy_docs else None
                             )
 
-                            app.logger.info(f'[Local FAQ Match] Completed - found {len(related_laws)} laws')
+                            app.logger.info(f'[FAQ High Match] Completed - found {len(related_laws)} laws from policy_anchor')
+
+                            # 이후 정상 흐름 따라감 (suggested_answer 등)
+
+                        else:
+                            app.logger.warning(f'[FAQ High Match] Failed to get FAQ data, falling back to normal flow')
+
+                    # ★★★ 기존 로직: score가 낮으면 GPT 생성 ★★★
+                    app.logger.info(f'Using GPT generation (score {faq_score} < {FAQ_DIRECT_THRESHOLD} or FAQ data unavailable)')
+
+                    # STEP 3: Get policy_anchor from local mapping
+                    app.logger.info('Step 3: Getting policy_anchor from local mapping')
+                    policy_anchor = get_policy_anchor(data, faq_id)
+
+                    if policy_anchor:
+                        app.logger.info(f'Mapped policy_anchor: {policy_anchor[:100]}...')
+
+                        # STEP 4: Search policy documents in SQLite DB
+                        app.logger.info('Step 4: Searching policy documents in SQLite DB')
+                        policy_docs = []
+                        policy_anchors = data.faq_store.get(faq_id).policy_anchors
+
+                        anchor_results = search_policy_anchor_laws(data, policy_anchors[:2], limit=2, faq_id=faq_id)  # Max 2 anchors
+                        for idx, (anchor, laws) in enumerate(anchor_results, 1):
+                            app.logger.debug('Searched laws in SQLite %d: %s...', idx, anchor[:50])
+
+                            # Convert SQLite format to Dify-compatible format
+                            for law in laws:
+                                policy_docs.append({
+                                    'segment': {
+                                        'content': law['paragraph_content'] or law['full_text'],
+                                        'document': {'name': law['sheet_name']}
+                                    },
+                                    'score': 0.85  # SQLite doesn't provide scores
+                                })
+                                app.logger.debug('Found law: %s', law['article_title'] or law['law_title'])
+
+                        app.logger.info(f'Total policy docs retrieved from SQLite: {len(policy_docs)}')
+
+                        # STEP 5: Build answer prompt with FAQ + Policy context
+                        app.logger.info('Step 5: Building answer prompt with FAQ + Policy context')
+                        answer_prompt = build_context_prompt(
+                            user_message,
+                            retrieved_docs,
+                            policy_docs
+                        )
+
+                        # STEP 6: Build related_laws from policy_anchor (NOT LLM generated!)
+                        related_laws = []
+                        for anchor in policy_anchors:
+                            related_laws.append({
+                                'title': anchor.strip(),
+                                'source': 'FAQ Database',
+                                'faq_id': faq_id
+                            })
 
-                            # 이후 로직은 정상 흐름 따라감 (suggested_answer 생성 등)
+                        app.logger.info(f'Hybrid RAG completed successfully for faq_id: {faq_id}')
 
                     else:
-                        # 로컬 FAQ도 매칭 안 되면 OpenAI 폴백
-                        app.logger.warning('Local FAQ search also failed, falling back to OpenAI')
-                        assistant_message = generate_openai_response(session_id, user_message)
+                        # No policy_anchor found, use FAQ only
+                        app.logger.warning(f'No policy_anchor found for {faq_id}, using FAQ only')
+                        answer_prompt = build_context_prompt(
+                            user_message,
+                            retrieved_docs,
+                            None
+                        )
+
                 else:
-                    # No fallback, return error
-                    raise Exception('Dify FAQ search failed and fallback is disabled')
-
-            except Exception as e:
-                app.logger.error(f'Error in Hybrid RAG mode: {str(e)}')
-                app.logger.error(traceback.format_exc())
-                if FALLBACK_TO_OPENAI:
-                    app.logger.warning('Falling back to OpenAI due to error')
-                    assistant_message = generate_openai_response(session_id, user_message)
+                    # Could not extract faq_id, use basic RAG
+                    app.logger.warning('Could not extract faq_id, using basic Dify RAG')
+                    answer_prompt = build_dify_rag_prompt(
+                        user_message,
+                        retrieved_docs,
+                        prompt_template
+                    )
+
+                app.logger.info(f'Answer prompt built for session {session_id}')
+
+            # Fallback: Dify 실패 시 로컬 FAQ 검색 시도
+            elif FALLBACK_TO_OPENAI:
+                app.logger.warning('Dify FAQ search failed or no results, trying local FAQ search')
+
+                # ★ 로컬 FAQ 검색 시도
+                local_faq_match = retrieval['local_faq_match']
+
+                if local_faq_match and local_faq_match.get('score', 0) >= FAQ_DIRECT_THRESHOLD:
+                    # 로컬 FAQ에서 높은 매칭 발견
+                    faq_id = local_faq_match['faq_id']
+                    faq_score = local_faq_match['score']
+                    matched_faq_id = faq_id
+                    app.logger.info(f'[Local FAQ Match] Score {faq_score:.2f} >= {FAQ_DIRECT_THRESHOLD}')
+
+                    faq_data = get_faq_direct_answer(data, faq_id)
+
+                    if faq_data and faq_data.get('answer_text'):
+                        faq_cache_key = build_faq_cache_key(faq_id, faq_data.get('policy_anchor'))
+                        answer_path = 'local_faq_match'
+
+                        # policy_anchor 기반 법령 검색
+                        related_laws = []  # 키워드 검색 결과 초기화
+                        policy_docs = []
+
+                        if faq_data.get('policy_anchor'):
+                            policy_anchors = faq_data['policy_anchors']
+                            for anchor, laws in search_policy_anchor_laws(data, policy_anchors, limit=2, faq_id=faq_id):
+                                for law in laws:
+                                    related_laws.append({
+                                        'title': f"{law.get('sheet_name', '')} - {law.get('article_title', '')}",
+                                        'content': (law.get('full_text') or law.get('paragraph_content') or '')[:500],
+                                        'article_num': law.get('article_num', ''),
+                                        'sheet_name': law.get('sheet_name', ''),
+                                        'source': 'Local FAQ Match',
+                                        'matched_keyword': anchor
+                                    })
+                                    # GPT 컨텍스트용 policy_docs
+                                    policy_docs.append({
+                                        'segment': {
+                                            'content': law.get('full_text') or law.get('paragraph_content') or '',
+                                            'document': {'name': law.get('sheet_name', '')}
+                                        },
+                                        'score': 0.9
+                                    })
+
+                        # FAQ를 Dify 포맷으로 변환해서 GPT에 전달
+                        faq_records = [{
+                            'segment': {
+                                'content': f'faq_id":"{faq_id}";"question":"{faq_data["question"]}";"answer_text":"{faq_data["answer_text"]}"',
+                                'document': {'name': 'Local FAQ'}
+                            },
+                            'score': faq_score
+                        }]
+
+                        # ★ GPT 답변 프롬프트 구성 (FAQ + 법령 컨텍스트)
+                        app.logger.info('[Local FAQ Match] Building answer prompt with GPT context')
+                        answer_prompt = build_context_prompt(
+                            user_message,
+                            faq_records,
+                            policy_docs if policy_docs else None
+                        )
+
+                        app.logger.info(f'[Local FAQ Match] Completed - found {len(related_laws)} laws')
+
+                        # 이후 로직은 정상 흐름 따라감 (suggested_answer 생성 등)
+
                 else:
-                    raise
+                    # 로컬 FAQ도 매칭 안 되면 OpenAI 폴백
+                    app.logger.warning('Local FAQ search also failed, falling back to OpenAI')
+                    answer_prompt = build_openai_prompt(session_id)
+                    answer_path = 'openai_fallback'
+            else:
+                # No fallback, return error
+                raise Exception('Dify FAQ search failed and fallback is disabled')
+
+        except Exception as e:
+            app.logger.error(f'Error in Hybrid RAG mode: {str(e)}')
+            app.logger.error(traceback.format_exc())
+            if FALLBACK_TO_OPENAI:
+                app.logger.warning('Falling back to OpenAI due to error')
+                answer_prompt = build_openai_prompt(session_id)
+                answer_path = 'openai_fallback'
+            else:
+                raise
+
+    # ===== OpenAI Direct Mode =====
+    else:
+        app.logger.info('Using OpenAI direct mode')
+        answer_prompt = build_openai_prompt(session_id)
+        answer_path = 'openai_direct'
+
+    if answer_prompt is None:
+        app.logger.warning('No answer prompt built from retrieval results, using OpenAI direct prompt')
+        answer_prompt = build_openai_prompt(session_id)
+        answer_path = 'openai_fallback'
+
+    return {
+        'answer_prompt': answer_prompt,
+        'answer_path': answer_path,
+        'related_laws': related_laws,
+        'matched_faq_id': matched_faq_id,
+        'faq_cache_key': faq_cache_key,
+        'retrieved_docs': retrieved_docs,
+        'keywords': keywords,
+        'sqlite_laws': sqlite_laws,
+        'retrieval': retrieval
+    }
 
-        # ===== OpenAI Direct Mode =====
-        else:
-            app.logger.info('Using OpenAI direct mode')
-            assistant_message = generate_openai_response(session_id, user_message)
+def build_chat_metadata(context):
+    """prepare_chat_context() 결과로 응답 metadata 구성"""
+    retrieved_docs = context['retrieved_docs']
+    metadata = {
+        'ai_mode': AI_MODE,
+        'answer_path': context['answer_path'],
+        'retrieval_count': len(retrieved_docs) if retrieved_docs else 0,
+        'matched_faq_id': context['matched_faq_id'],
+        'extracted_keywords': context['keywords'],
+        'sqlite_laws_count': len(context['sqlite_laws']),
+        'retrieval_elapsed': round(context['retrieval']['timings']['total'], 3),
+        'estimated_prompt_tokens': count_message_tokens(context['answer_prompt']['messages'])
+    }
 
-        # Add assistant message to session
-        chat_sessions[session_id]['messages'].append({
-            'role': 'assistant',
-            'content': assistant_message
-        })
+    # Conversation history window (OpenAI direct mode only)
+    if context['answer_prompt'].get('history'):
+        metadata['history'] = context['answer_prompt']['history']
+
+    # Add retrieved documents info if available
+    if retrieved_docs:
+        metadata['retrieved_docs'] = [
+            {
+                'document_name': doc.get('segment', {}).get('document', {}).get('name', '알 수 없음'),
+                'score': doc.get('score', 0),
+                'content_preview': doc.get('segment', {}).get('content', '')[:100] + '...'
+            }
+            for doc in retrieved_docs
+        ]
 
-        # Generate suggested answer
-        suggested_answer = generate_suggested_answer(
-            user_message,
-            assistant_message,
-            matched_faq_id=matched_faq_id,
-            related_laws=related_laws
+    return metadata
+
+
+def cached_chat_response(session_id, user_message, cached):
+    """응답 캐시 적중 시 세션 기록 후 응답 본문 구성 (검색/LLM 호출 없음)"""
+    chat_sessions.append_message(session_id, 'user', user_message)
+    chat_sessions.append_message(session_id, 'assistant', cached['value']['message'])
+    answer_path_total.inc(path='response_cache')
+    return {
+        'success': True,
+        'message': cached['value']['message'],
+        'suggested_answer': cached['value']['suggested_answer'],
+        'related_laws': cached['value']['related_laws'],
+        'session_id': session_id,
+        'metadata': build_cache_metadata(cached)
+    }
+
+def lookup_faq_cached_response(context, prompt_template=None):
+    """
+    FAQ 높은 매칭(faq_cache_key)의 캐시된 응답 조회
+
+    질문 조회(lookup_cached_response)에 실패한 요청마다 한 번 호출되므로,
+    여기서도 적중하지 않으면 요청당 캐시 실패 1건을 집계합니다.
+    """
+    if not RESPONSE_CACHE_ENABLED or prompt_template:
+        return None
+    hit = None
+    if context['faq_cache_key']:
+        hit = response_cache.get_by_key(context['faq_cache_key'], count_miss=False)
+    if hit is None:
+        response_cache.record_miss()
+    return hit
+
+def faq_cached_generation(faq_cached):
+    """FAQ 캐시 적중 응답을 generate_chat_outputs_async() 결과 형식으로 변환"""
+    return {
+        'message': faq_cached['value']['message'],
+        'suggested_answer': faq_cached['value']['suggested_answer'],
+        'stats': {'mode': 'cache', 'llm_calls': 0}
+    }
+
+def finish_chat_response(session_id, user_message, context, generation, faq_cached=None, prompt_template=None):
+    """
+    생성된 답변을 세션/응답 캐시에 저장하고 /api/chat 응답 본문 구성 (Flask/ASGI 공통)
+
+    Returns:
+        dict: {'success', 'message', 'suggested_answer', 'related_laws', 'session_id', 'metadata'}
+    """
+    assistant_message = generation['message']
+    suggested_answer = generation['suggested_answer']
+    related_laws = context['related_laws']
+
+    # Add assistant message to session
+    chat_sessions.append_message(session_id, 'assistant', assistant_message)
+    store_cached_response(user_message, context, assistant_message, suggested_answer, prompt_template)
+    answer_path_total.inc(path=context['answer_path'])
+
+    # related_laws는 이미 [Action A]에서 SQLite 검색 결과로 채워져 있음
+    # Dify에서 추가 법령 정보가 있으면 병합
+    app.logger.info(f'[Final] Total related_laws from SQLite: {len(related_laws)}')
+
+    app.logger.info(f'Successfully processed chat request for session {session_id}')
+
+    # Build response with metadata
+    metadata = build_chat_metadata(context)
+    metadata['generation'] = generation['stats']
+    if faq_cached:
+        metadata['cache'] = build_cache_metadata(faq_cached)['cache']
+    return {
+        'success': True,
+        'message': assistant_message,
+        'suggested_answer': suggested_answer,
+        'related_laws': related_laws,
+        'session_id': session_id,
+        'metadata': metadata
+    }
+
+def stream_metadata_event(session_id, related_laws, matched_faq_id, keywords, metadata):
+    """/api/chat/stream metadata 이벤트 본문"""
+    return {
+        'session_id': session_id,
+        'related_laws': related_laws,
+        'matched_faq_id': matched_faq_id,
+        'extracted_keywords': keywords,
+        'metadata': metadata
+    }
+
+async def run_chat_async(io, session_id, user_message, prompt_template=None, emit=None):
+    """
+    /api/chat 처리 본문 (캐시 조회 → 검색/프롬프트 구성 → 답변 생성 → 저장, Flask/ASGI 공통)
+
+    emit(event, data)를 넘기면 /api/chat/stream용으로 metadata, delta, suggested_answer
+    이벤트를 보내며, 캐시에 없는 답변은 토큰 단위로 스트리밍 생성합니다.
+
+    Returns:
+        dict: /api/chat 응답 본문
+    """
+    # 같은(유사한) 질문의 캐시된 응답이 있으면 검색/LLM 호출 없이 반환
+    with request_trace.span('cache_lookup'):
+        cached = await io.call(lookup_cached_response, user_message, prompt_template)
+    if cached:
+        response_data = await io.call(cached_chat_response, session_id, user_message, cached)
+        if emit:
+            emit('metadata', stream_metadata_event(session_id, response_data['related_laws'],
+                                                   cached['value'].get('matched_faq_id'), [],
+                                                   response_data['metadata']))
+            emit('delta', {'content': response_data['message']})
+            emit('suggested_answer', {'suggested_answer': response_data['suggested_answer']})
+        return response_data
+
+    with request_trace.span('prepare_context'):
+        app.logger.info('[Retrieval] Running SQLite, Dify and local FAQ searches concurrently')
+        retrieval = await run_retrieval_async(io, user_message, use_dify=(AI_MODE == 'dify'))
+        context = await io.call(prepare_chat_context, session_id, user_message, prompt_template, retrieval)
+    answer_prompt = context['answer_prompt']
+    if emit:
+        emit('metadata', stream_metadata_event(session_id, context['related_laws'], context['matched_faq_id'],
+                                               context['keywords'], build_chat_metadata(context)))
+
+    # FAQ 높은 매칭이면 같은 FAQ에 대한 캐시된 응답 재사용 (LLM 호출 생략)
+    faq_cached = lookup_faq_cached_response(context, prompt_template)
+
+    streamed = []
+    on_delta = None
+    if emit:
+        def on_delta(content):
+            streamed.append(content)
+            emit('delta', {'content': content})
+
+    # Generate chat answer + suggested answer (GENERATION_MODE)
+    if faq_cached:
+        app.logger.info(f"[Response Cache] FAQ key hit: {context['faq_cache_key']}")
+        generation = faq_cached_generation(faq_cached)
+        if emit:
+            emit('delta', {'content': generation['message']})
+    else:
+        try:
+            generation = await generate_chat_outputs_async(io, answer_prompt, user_message, on_delta=on_delta)
+        except Exception as e:
+            # 답변 일부를 이미 스트리밍했으면 폴백 답변으로 바꿀 수 없음
+            if (AI_MODE == 'dify' and FALLBACK_TO_OPENAI and answer_prompt['kind'] != 'openai'
+                    and not streamed):
+                app.logger.error(f'Error generating answer with retrieval context: {str(e)}')
+                app.logger.warning('Falling back to OpenAI due to error')
+                context['answer_prompt'] = await io.call(build_openai_prompt, session_id)
+                context['answer_path'] = 'openai_fallback'
+                generation = await generate_chat_outputs_async(
+                    io, context['answer_prompt'], user_message, on_delta=on_delta
+                )
+            else:
+                raise
+    if emit:
+        emit('suggested_answer', {'suggested_answer': generation['suggested_answer']})
+
+    with request_trace.span('finish'):
+        return await io.call(
+            finish_chat_response, session_id, user_message, context, generation, faq_cached, prompt_template
         )
 
-        # related_laws는 이미 [Action A]에서 SQLite 검색 결과로 채워져 있음
-        # Dify에서 추가 법령 정보가 있으면 병합
-        app.logger.info(f'[Final] Total related_laws from SQLite: {len(related_laws)}')
-
-        app.logger.info(f'Successfully processed chat request for session {session_id}')
-
-        # Build response with metadata
-        response_data = {
-            'success': True,
-            'message': assistant_message,
-            'suggested_answer': suggested_answer,
-            'related_laws': related_laws,
-            'session_id': session_id,
-            'metadata': {
-                'ai_mode': AI_MODE,
-                'retrieval_count': len(retrieved_docs) if retrieved_docs else 0,
-                'matched_faq_id': matched_faq_id,
-                'extracted_keywords': keywords,
-                'sqlite_laws_count': len(sqlite_laws)
-            }
-        }
+def run_chat(session_id, user_message, prompt_template=None, emit=None):
+    """run_chat_async()를 Flask 요청 스레드에서 실행"""
+    return run_flow(run_chat_async, chat_io, session_id, user_message, prompt_template, emit)
 
-        # Add retrieved documents info if available
-        if retrieved_docs:
-            response_data['metadata']['retrieved_docs'] = [
-                {
-                    'document_name': doc.get('segment', {}).get('document', {}).get('name', '알 수 없음'),
-                    'score': doc.get('score', 0),
-                    'content_preview': doc.get('segment', {}).get('content', '')[:100] + '...'
-                }
-                for doc in retrieved_docs
-            ]
+def wants_timings(debug_flag):
+    """응답 metadata.timings 포함 여부 (요청 본문 debug 또는 CHAT_DEBUG_TIMINGS)"""
+    return CHAT_DEBUG_TIMINGS or debug_flag in (True, 1, '1', 'true')
+
+@app.route('/api/chat', methods=['POST'])
+def chat():
+    """Handle chat messages and generate responses"""
+    session_id = None
+    try:
+        data = request.get_json()
+        user_message = data.get('message', '')
+        session_id = data.get('session_id', str(uuid.uuid4()))
+        prompt_template = data.get('prompt_template', None)  # 선택적 프롬프트 템플릿
+
+        app.logger.info(f'Chat request from session {session_id}: {user_message[:100]}...')
+        api_logger.info(f'Session {session_id} - User message: {user_message}')
+
+        with request_trace.trace('chat', stage_histograms) as trace:
+            response_data = run_chat(session_id, user_message, prompt_template)
+        if wants_timings(data.get('debug')):
+            response_data['metadata']['timings'] = trace.to_dict()
 
         return jsonify(response_data)
 
@@ -642,37 +1415,246 @@ def chat():
             'ai_mode': AI_MODE
         }), 500
 
-def generate_openai_response(session_id, user_message):
-    """Generate response using OpenAI directly (without RAG)"""
-    app.logger.debug('Calling OpenAI API for session %s', session_id)
-    start_time = datetime.now()
+def format_sse(event, data):
+    """Server-Sent Events 메시지 포맷 (data는 JSON 직렬화)"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """
+    Stream chat responses as Server-Sent Events
+
+    이벤트 순서:
+        start            - session_id (즉시 전송)
+        metadata         - related_laws, matched_faq_id, extracted_keywords 등 검색 결과
+        delta            - 챗봇 답변 토큰 조각 {'content': str} (캐시 적중 시 전체 답변 1회)
+        suggested_answer - HTML 민원처리 답변
+        done             - 생성 통계 (토큰, 소요시간, 첫 토큰까지 시간)
+        error            - 오류 발생 시
+
+    /api/chat과 같은 처리 흐름(run_chat_async)을 작업 스레드에서 실행하고 흐름이 보내는
+    이벤트를 큐로 받아 전송하므로 응답 캐시, 요청 추적, 생성 통계가 /api/chat과 같습니다.
+    """
+    data = request.get_json()
+    user_message = data.get('message', '')
+    session_id = data.get('session_id') or str(uuid.uuid4())
+    prompt_template = data.get('prompt_template', None)
+    debug_flag = data.get('debug')
+
+    app.logger.info(f'Chat stream request from session {session_id}: {user_message[:100]}...')
+    api_logger.info(f'Session {session_id} - User message (stream): {user_message}')
+
+    events = queue.Queue()
+
+    def run_stream():
+        """처리 흐름 실행 (작업 스레드), 끝나면 None으로 종료 표시"""
+        start_time = time.perf_counter()
+        first_token_time = None
+
+        def emit(event, payload):
+            nonlocal first_token_time
+            if event == 'delta' and first_token_time is None:
+                first_token_time = time.perf_counter() - start_time
+            events.put(format_sse(event, payload))
+
+        try:
+            with request_trace.trace('chat', stage_histograms) as trace:
+                response_data = run_chat(session_id, user_message, prompt_template, emit)
+            generation = response_data['metadata'].get('generation', {'mode': 'cache', 'llm_calls': 0})
+            done = {
+                'session_id': session_id,
+                'generation': {
+                    **generation,
+                    'time_to_first_token': round(first_token_time, 3) if first_token_time is not None else None,
+                    'total_elapsed': round(time.perf_counter() - start_time, 3)
+                }
+            }
+            if wants_timings(debug_flag):
+                done['timings'] = trace.to_dict()
+            events.put(format_sse('done', done))
+            app.logger.info(f'Successfully streamed chat response for session {session_id}')
+
+        except Exception as e:
+            app.logger.error(f'Error in chat stream for session {session_id}: {str(e)}')
+            app.logger.error(f'Traceback: {traceback.format_exc()}')
+            events.put(format_sse('error', {'success': False, 'error': str(e), 'ai_mode': AI_MODE}))
+        finally:
+            events.put(None)
+
+    def generate_events():
+        yield format_sse('start', {'session_id': session_id})
+        # 클라이언트가 연결을 끊어도 흐름은 끝까지 실행 (세션/캐시 저장)
+        threading.Thread(target=contextvars.copy_context().run, args=(run_stream,),
+                         name='chat-stream', daemon=True).start()
+        yield from iter(events.get, None)
+
+    events_iter = log_pipeline.iter_with_request_id(generate_events(), log_pipeline.current_request_id())
+
+    return Response(
+        stream_with_context(events_iter),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
-    # Prepare messages for OpenAI API
-    messages = [
-        {'role': 'system', 'content': '''당신은 대한민국 공무원이 민원인의 문의에 전문적으로 답변하기 위한 기금 민원처리 전문가 도우미입니다.
+# ========================================
+# 답변 생성 (OpenAI Chat Completion)
+# ========================================
+OPENAI_SYSTEM_PROMPT = '''당신은 대한민국 공무원이 민원인의 문의에 전문적으로 답변하기 위한 기금 민원처리 전문가 도우미입니다.
 
 다음 지침을 따라주세요:
 1. 항상 정중하고 공손한 어투를 사용하세요
 2. 관련 법령이나 규정을 인용할 때는 정확한 조항을 명시하세요
 3. 필요한 서류나 절차를 구체적으로 안내하세요
-4. 추가 문의사항이 있는지 확인하세요'''}
-    ]
-    messages.extend(chat_sessions[session_id]['messages'])
+4. 추가 문의사항이 있는지 확인하세요'''
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=messages,
-        temperature=0.7,
-        max_tokens=1000
+async def complete_chat_async(io, messages, temperature=0.7, max_tokens=1000, **kwargs):
+    """
+    OpenAI Chat Completion 공통 호출
+
+    Args:
+        io: ChatIO
+        messages: Chat messages
+        temperature: Sampling temperature
+        max_tokens: Max completion tokens
+        **kwargs: Extra create() options (e.g. response_format)
+
+    Returns:
+        dict: {'content': str, 'usage': {'prompt_tokens', 'completion_tokens', 'total_tokens'}, 'elapsed': float}
+    """
+    with request_trace.span('openai.chat') as span:
+        start_time = time.perf_counter()
+        try:
+            response = await io.chat_completion(
+                model="gpt-4o-mini",
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                **kwargs
+            )
+        except Exception:
+            openai_requests_total.inc(status='error')
+            raise
+        return completion_result(response, time.perf_counter() - start_time, span)
+
+def complete_chat(messages, temperature=0.7, max_tokens=1000, **kwargs):
+    """complete_chat_async()를 현재 스레드에서 실행 (대화 요약 등 동기 코드용)"""
+    return run_flow(complete_chat_async, chat_io, messages, temperature, max_tokens, **kwargs)
+
+def completion_result(response, elapsed_time, span=None):
+    """Chat Completion 응답 → complete_chat_async() 결과 형식"""
+    if span is not None:
+        span.attrs['total_tokens'] = response.usage.total_tokens
+    usage = {
+        'prompt_tokens': response.usage.prompt_tokens,
+        'completion_tokens': response.usage.completion_tokens,
+        'total_tokens': response.usage.total_tokens
+    }
+    record_openai_usage(usage)
+    return {
+        'content': response.choices[0].message.content,
+        'usage': usage,
+        'elapsed': elapsed_time
+    }
+
+async def stream_chat_async(io, messages, on_delta, temperature=0.7, max_tokens=1000):
+    """
+    OpenAI Chat Completion 스트리밍 호출 (텍스트 조각마다 on_delta(str) 호출)
+
+    Returns:
+        dict: complete_chat_async()와 같은 형식 (content는 전체 답변)
+    """
+    with request_trace.span('openai.chat', stream=True) as span:
+        start_time = time.perf_counter()
+        parts = []
+        usage = {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}
+        try:
+            async for chunk in io.chat_completion_stream(
+                model="gpt-4o-mini",
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream_options={'include_usage': True}
+            ):
+                if chunk.usage:
+                    usage = {
+                        'prompt_tokens': chunk.usage.prompt_tokens,
+                        'completion_tokens': chunk.usage.completion_tokens,
+                        'total_tokens': chunk.usage.total_tokens
+                    }
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                    on_delta(chunk.choices[0].delta.content)
+        except Exception:
+            openai_requests_total.inc(status='error')
+            raise
+
+        elapsed_time = time.perf_counter() - start_time
+        if span is not None:
+            span.attrs['total_tokens'] = usage['total_tokens']
+        record_openai_usage(usage)
+
+        api_logger.info(f'Streamed answer completed in {elapsed_time:.2f}s - Tokens: {usage["total_tokens"]}')
+        return {
+            'content': ''.join(parts),
+            'usage': usage,
+            'elapsed': elapsed_time
+        }
+
+def summarize_history(previous_summary, messages):
+    """
+    윈도우 밖으로 밀려난 대화 요약 (HistoryManager summarizer)
+
+    Args:
+        previous_summary: 이전에 캐시된 요약 (없으면 빈 문자열)
+        messages: 새로 요약할 메시지 목록
+
+    Returns:
+        str: 이전 요약과 새 메시지를 합친 요약
+    """
+    conversation = "\n".join(
+        f"{'사용자' if m['role'] == 'user' else '상담원'}: {m['content']}" for m in messages
     )
+    prompt = f"""다음은 민원 상담 대화의 이전 요약과 이어지는 대화입니다.
+이후 답변에 필요한 핵심(문의 주제, 확인된 사실, 안내한 규정/절차)만 5문장 이내로 요약하세요.
+
+이전 요약:
+{previous_summary or '(없음)'}
 
-    elapsed_time = (datetime.now() - start_time).total_seconds()
-    api_logger.info(f'OpenAI API call completed in {elapsed_time:.2f}s - Tokens used: {response.usage.total_tokens}')
+대화:
+{conversation}"""
 
-    assistant_message = response.choices[0].message.content
-    app.logger.info(f'Generated response for session {session_id}: {assistant_message[:100]}...')
+    try:
+        completion = complete_chat([{'role': 'user', 'content': prompt}], temperature=0.2, max_tokens=300)
+        api_logger.info(f'History summary generated for {len(messages)} messages - Tokens: {completion["usage"]["total_tokens"]}')
+        return completion['content'].strip()
+    except Exception as e:
+        app.logger.error(f'Error summarizing chat history: {str(e)}')
+        raise
+
+# Token-budgeted conversation history (HISTORY_TOKEN_BUDGET, HISTORY_SUMMARY)
+history_manager = HistoryManager(
+    token_budget=int(os.getenv('HISTORY_TOKEN_BUDGET', '3000')),
+    summarizer=summarize_history if os.getenv('HISTORY_SUMMARY', 'False').lower() == 'true' else None
+)
+app.logger.info(f"History token budget: {history_manager.token_budget}, summary: {history_manager.summarizer is not None}")
 
-    return assistant_message
+def build_openai_prompt(session_id):
+    """
+    Build answer prompt for OpenAI direct mode (session history, without RAG)
+
+    The session history is trimmed to HISTORY_TOKEN_BUDGET, keeping the most recent turns.
+
+    Returns:
+        dict: {'kind': 'openai', 'messages': list, 'context': str, 'history': dict}
+    """
+    with request_trace.span('history_window'):
+        messages, history_info = history_manager.build_messages(
+            OPENAI_SYSTEM_PROMPT,
+            chat_sessions.get_messages(session_id),
+            session_id=session_id
+        )
+    app.logger.debug('History window for session %s: %s', session_id, history_info)
+    return {'kind': 'openai', 'messages': messages, 'context': '', 'history': history_info}
 
 def extract_laws_from_retrieved_docs(retrieved_docs):
     """Extract related laws from Dify retrieved documents"""
@@ -693,11 +1675,49 @@ def extract_laws_from_retrieved_docs(retrieved_docs):
 
     return related_laws
 
-def call_dify_knowledge(user_message, top_k=3):
+def build_dify_payload(user_message, top_k=3):
+    """Dify Knowledge retrieve 요청 본문"""
+    return {
+        "query": user_message,
+        "retrieval_model": {
+            "search_method": "semantic_search",  # or "full_text_search", "hybrid_search"
+            "reranking_enable": False,  # Reranking 비활성화 (OpenAI API 불필요)
+            "top_k": top_k,
+            "score_threshold_enabled": True,
+            "score_threshold": 0.5
+        }
+    }
+
+def dify_success_result(user_message, result, elapsed_time):
+    """Dify retrieve 응답 → call_dify_knowledge_async() 결과 형식"""
+    # Extract retrieved documents
+    records = result.get('records', [])
+    app.logger.info(f"Dify Knowledge API call completed in {elapsed_time:.2f}s - Retrieved {len(records)} documents")
+    api_logger.info(f"Dify RAG retrieved {len(records)} documents for query: {user_message[:100]}")
+
+    dify_requests_total.inc(result='success')
+
+    # Log retrieved documents
+    if app.logger.isEnabledFor(logging.DEBUG):
+        for idx, record in enumerate(records):
+            score = record.get('score', 0)
+            segment = record.get('segment', {})
+            content_preview = segment.get('content', '')[:100]
+            app.logger.debug(f"Document {idx+1} - Score: {score:.3f} - Content: {content_preview}...")
+
+    return {
+        'success': True,
+        'records': records,
+        'query': user_message,
+        'elapsed_time': elapsed_time
+    }
+
+async def call_dify_knowledge_async(io, user_message, top_k=3):
     """
     Call Dify Knowledge API to retrieve relevant documents using RAG
 
     Args:
+        io: ChatIO (Flask는 requests 기반 DifyClient, ASGI는 httpx 기반 AsyncDifyClient)
         user_message: User's query
         top_k: Number of top results to retrieve (default: 3)
 
@@ -706,65 +1726,40 @@ def call_dify_knowledge(user_message, top_k=3):
     """
     try:
         app.logger.debug('Calling Dify Knowledge API')
-        start_time = datetime.now()
+        start_time = time.perf_counter()
 
-        # Dify Knowledge Retrieve API endpoint
-        url = f"{DIFY_API_URL}/datasets/{DIFY_DATASET_ID}/retrieve"
+        payload = build_dify_payload(user_message, top_k)
+        if app.logger.isEnabledFor(logging.DEBUG):
+            app.logger.debug('Dify API Request Payload: %s', json.dumps(payload, ensure_ascii=False))
 
-        headers = {
-            'Authorization': f'Bearer {DIFY_API_KEY}',
-            'Content-Type': 'application/json'
-        }
-
-        payload = {
-            "query": user_message,
-            "retrieval_model": {
-                "search_method": "semantic_search",  # or "full_text_search", "hybrid_search"
-                "reranking_enable": False,  # Reranking 비활성화 (OpenAI API 불필요)
-                "top_k": top_k,
-                "score_threshold_enabled": True,
-                "score_threshold": 0.5
-            }
-        }
-
-        app.logger.debug(f"Dify API Request URL: {url}")
-        app.logger.debug(f"Dify API Request Payload: {json.dumps(payload, ensure_ascii=False)}")
-
-        response = requests.post(url, headers=headers, json=payload, timeout=30)
-        response.raise_for_status()
-
-        result = response.json()
-        elapsed_time = (datetime.now() - start_time).total_seconds()
-
-        # Extract retrieved documents
-        records = result.get('records', [])
-        app.logger.info(f"Dify Knowledge API call completed in {elapsed_time:.2f}s - Retrieved {len(records)} documents")
-        api_logger.info(f"Dify RAG retrieved {len(records)} documents for query: {user_message[:100]}")
-
-        # Log retrieved documents
-        for idx, record in enumerate(records):
-            score = record.get('score', 0)
-            segment = record.get('segment', {})
-            content_preview = segment.get('content', '')[:100]
-            app.logger.debug(f"Document {idx+1} - Score: {score:.3f} - Content: {content_preview}...")
+        # 공유 세션(keep-alive) + connect/read 타임아웃 분리 + 재시도, 서킷이 열려 있으면 바로 실패
+        with request_trace.span('dify.retrieve'):
+            result = await io.dify_retrieve(payload)
+        return dify_success_result(user_message, result, time.perf_counter() - start_time)
 
+    except CircuitOpenError:
+        app.logger.warning('Dify circuit breaker is open, skipping Dify call')
+        dify_requests_total.inc(result='circuit_open')
         return {
-            'success': True,
-            'records': records,
-            'query': user_message,
-            'elapsed_time': elapsed_time
+            'success': False,
+            'error': 'Dify circuit open',
+            'circuit_open': True,
+            'records': []
         }
-
-    except requests.exceptions.Timeout:
+    except io.timeout_errors:
         app.logger.error('Dify API request timeout')
+        dify_requests_total.inc(result='timeout')
         return {
             'success': False,
             'error': 'Dify API timeout',
             'records': []
         }
-    except requests.exceptions.RequestException as e:
+    except io.http_errors as e:
         app.logger.error(f'Dify API request failed: {str(e)}')
-        app.logger.error(f'Response: {e.response.text if hasattr(e, "response") else "No response"}')
+        dify_requests_total.inc(result='error')
+        # 연결 실패 등은 e.response가 없음
+        response = getattr(e, 'response', None)
+        app.logger.error(f'Response: {response.text if response is not None else "No response"}')
         return {
             'success': False,
             'error': str(e),
@@ -772,6 +1767,7 @@ def call_dify_knowledge(user_message, top_k=3):
         }
     except Exception as e:
         app.logger.error(f'Unexpected error calling Dify API: {str(e)}')
+        dify_requests_total.inc(result='error')
         app.logger.error(f'Traceback: {traceback.format_exc()}')
         return {
             'success': False,
@@ -797,14 +1793,14 @@ def extract_faq_id_from_content(record):
         match = re.search(r'faq_id":"(.+?)"', content)
         if match:
             faq_id = match.group(1)
-            app.logger.debug(f"Extracted faq_id from content: {faq_id}")
+            app.logger.debug('Extracted faq_id from content: %s', faq_id)
             return faq_id
 
         # Method 2: Check document name
         doc_name = record.get('segment', {}).get('document', {}).get('name', '')
         if doc_name and doc_name.startswith('FAQ-') and doc_name.endswith('.md'):
             faq_id = doc_name[:-3]  # Remove .md extension
-            app.logger.debug(f"Extracted faq_id from document name: {faq_id}")
+            app.logger.debug('Extracted faq_id from document name: %s', faq_id)
             return faq_id
 
         app.logger.warning("Could not extract faq_id from record")
@@ -814,11 +1810,12 @@ def extract_faq_id_from_content(record):
         app.logger.error(f"Error extracting faq_id: {e}")
         return None
 
-def get_policy_anchor(faq_id):
+def get_policy_anchor(data, faq_id):
     """
     Get policy_anchor from local mapping table
 
     Args:
+        data: Reference data snapshot (current_data())
         faq_id: FAQ identifier (e.g., "FAQ-협약체결-0002")
 
     Returns:
@@ -827,49 +1824,37 @@ def get_policy_anchor(faq_id):
     if not faq_id:
         return None
 
-    policy_anchor = faq_policy_map.get(faq_id)
+    policy_anchor = data.faq_store.policy_map.get(faq_id) or None
 
     if policy_anchor:
-        app.logger.debug(f"Mapped {faq_id} -> {policy_anchor[:50]}...")
+        app.logger.debug('Mapped %s -> %s...', faq_id, policy_anchor[:50])
     else:
         app.logger.warning(f"No policy_anchor found for faq_id: {faq_id}")
 
     return policy_anchor
 
-def get_faq_direct_answer(faq_id):
+def get_faq_direct_answer(data, faq_id):
     """
     FAQ 답변을 직접 조회 (높은 유사도 매칭 시 GPT 호출 없이 사용)
 
     Args:
+        data: 참조 데이터 스냅샷 (current_data())
         faq_id: FAQ identifier (e.g., "FAQ-협약체결-0002")
 
     Returns:
-        dict: {'answer_text': str, 'policy_anchor': str, 'question': str} or None
+        dict: {'faq_id', 'question', 'answer_text', 'policy_anchor', 'policy_anchors': tuple} or None
     """
-    global faq_df_global
-
-    if faq_df_global is None or faq_id is None:
+    if faq_id is None:
         return None
 
-    try:
-        row = faq_df_global[faq_df_global['faq_id'] == faq_id]
-        if row.empty:
-            app.logger.warning(f"FAQ not found for direct answer: {faq_id}")
-            return None
-
-        result = {
-            'faq_id': faq_id,
-            'answer_text': str(row['answer_text'].values[0]) if pd.notna(row['answer_text'].values[0]) else '',
-            'policy_anchor': str(row['policy_anchor'].values[0]) if pd.notna(row['policy_anchor'].values[0]) else '',
-            'question': str(row['question'].values[0]) if pd.notna(row['question'].values[0]) else ''
-        }
-        app.logger.info(f"[FAQ Direct] Retrieved answer for {faq_id}")
-        return result
-
-    except Exception as e:
-        app.logger.error(f"Error getting FAQ direct answer: {e}")
+    record = data.faq_store.get(faq_id)
+    if record is None:
+        app.logger.warning(f"FAQ not found for direct answer: {faq_id}")
         return None
 
+    app.logger.info(f"[FAQ Direct] Retrieved answer for {faq_id}")
+    return record._asdict()
+
 def format_faq_as_html(faq_data, user_message):
     """
     FAQ 답변을 HTML 포맷으로 변환 (suggested_answer용)
@@ -902,8 +1887,8 @@ def format_faq_as_html(faq_data, user_message):
 
 def search_faq_local(user_message, threshold=0.6):
     """
-    로컬 faq_topic.xlsx에서 유사한 FAQ 검색 (Dify 실패 시 폴백용)
-    간단한 키워드 매칭 기반 검색
+    로컬 FAQ에서 유사한 FAQ 검색 (Dify 실패 시 폴백용)
+    문자 2-gram 자카드 유사도 (서버 시작 시 만든 역색인으로 전체 FAQ를 한 번에 계산)
 
     Args:
         user_message: 사용자 질문
@@ -912,37 +1897,14 @@ def search_faq_local(user_message, threshold=0.6):
     Returns:
         dict: {'faq_id': str, 'score': float, 'question': str} or None
     """
-    global faq_df_global
-
-    if faq_df_global is None:
+    faq_ngram_matcher = current_data().faq_ngram_matcher
+    if faq_ngram_matcher is None:
         return None
 
     try:
-        # 사용자 질문에서 키워드 추출
-        user_keywords = set(user_message.replace('?', '').replace('？', '').split())
-
-        best_match = None
-        best_score = 0
-
-        for _, row in faq_df_global.iterrows():
-            faq_question = str(row.get('question', ''))
-            faq_keywords = set(faq_question.replace('?', '').replace('？', '').split())
-
-            # Jaccard 유사도 계산
-            if len(user_keywords | faq_keywords) > 0:
-                score = len(user_keywords & faq_keywords) / len(user_keywords | faq_keywords)
-
-                # 정확히 일치하는 경우 보너스
-                if user_message.strip() == faq_question.strip():
-                    score = 1.0
-
-                if score > best_score:
-                    best_score = score
-                    best_match = {
-                        'faq_id': row.get('faq_id'),
-                        'score': score,
-                        'question': faq_question
-                    }
+        matches = faq_ngram_matcher.search(user_message, top_k=1)
+        best_match = matches[0] if matches else None
+        best_score = best_match['score'] if best_match else 0
 
         if best_match and best_score >= threshold:
             app.logger.info(f'[Local FAQ] Found match: {best_match["faq_id"]} (score: {best_score:.2f})')
@@ -955,9 +1917,9 @@ def search_faq_local(user_message, threshold=0.6):
         app.logger.error(f'Error in local FAQ search: {e}')
         return None
 
-def generate_answer_with_context(user_message, faq_records, policy_docs):
+def build_context_prompt(user_message, faq_records, policy_docs):
     """
-    Generate answer using FAQ + Policy documents as context
+    Build answer prompt using FAQ + Policy documents as context
 
     Args:
         user_message: User's question
@@ -965,36 +1927,35 @@ def generate_answer_with_context(user_message, faq_records, policy_docs):
         policy_docs: Policy document records from Dify search (can be None/empty)
 
     Returns:
-        str: Generated answer
+        dict: {'kind': 'context', 'messages': list, 'context': str}
     """
-    try:
-        # Build FAQ context
-        faq_context = ""
-        if faq_records:
-            for idx, record in enumerate(faq_records[:2], 1):  # Top 2 FAQs
-                content = record.get('segment', {}).get('content', '')
-                # Extract question and answer from CSV format
-                # Format: faq_id":"FAQ-...";"question":"질문";"answer_text":"답변"
-                question_match = re.search(r'question":"(.+?)"', content)
-                answer_match = re.search(r'answer_text":"(.+?)"', content)
-
-                if question_match and answer_match:
-                    question = question_match.group(1)
-                    answer = answer_match.group(1)
-                    faq_context += f"\n[참고 FAQ {idx}]\n질문: {question}\n답변: {answer}\n"
-                else:
-                    # Fallback: use first 500 chars
-                    faq_context += f"\n[참고 FAQ {idx}]\n{content[:500]}\n"
-
-        # Build policy documents context
-        policy_context = ""
-        if policy_docs:
-            for idx, doc in enumerate(policy_docs[:3], 1):  # Top 3 policy docs
-                content = doc.get('segment', {}).get('content', '')
-                policy_context += f"\n[참고 법령 {idx}]\n{content[:500]}\n"
-
-        # System prompt
-        system_prompt = f"""당신은 대한민국 ICT 기금사업 민원처리 전문가입니다.
+    # Build FAQ context
+    faq_context = ""
+    if faq_records:
+        for idx, record in enumerate(faq_records[:2], 1):  # Top 2 FAQs
+            content = record.get('segment', {}).get('content', '')
+            # Extract question and answer from CSV format
+            # Format: faq_id":"FAQ-...";"question":"질문";"answer_text":"답변"
+            question_match = re.search(r'question":"(.+?)"', content)
+            answer_match = re.search(r'answer_text":"(.+?)"', content)
+
+            if question_match and answer_match:
+                question = question_match.group(1)
+                answer = answer_match.group(1)
+                faq_context += f"\n[참고 FAQ {idx}]\n질문: {question}\n답변: {answer}\n"
+            else:
+                # Fallback: use first 500 chars
+                faq_context += f"\n[참고 FAQ {idx}]\n{content[:500]}\n"
+
+    # Build policy documents context
+    policy_context = ""
+    if policy_docs:
+        for idx, doc in enumerate(policy_docs[:3], 1):  # Top 3 policy docs
+            content = doc.get('segment', {}).get('content', '')
+            policy_context += f"\n[참고 법령 {idx}]\n{content[:500]}\n"
+
+    # System prompt
+    system_prompt = f"""당신은 대한민국 ICT 기금사업 민원처리 전문가입니다.
 
 다음 자료를 참고하여 질문에 답변하세요:
 
@@ -1009,34 +1970,18 @@ def generate_answer_with_context(user_message, faq_records, policy_docs):
 4. 참고 자료에 없는 내용은 추측하지 말고, 추가 확인이 필요하다고 안내하세요
 5. 정중하고 공손한 어투를 사용하세요"""
 
-        # Call OpenAI API
-        start_time = datetime.now()
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {'role': 'system', 'content': system_prompt},
-                {'role': 'user', 'content': user_message}
-            ],
-            temperature=0.7,
-            max_tokens=1000
-        )
-
-        elapsed_time = (datetime.now() - start_time).total_seconds()
-        assistant_message = response.choices[0].message.content
-
-        api_logger.info(f'Answer generated in {elapsed_time:.2f}s - Tokens: {response.usage.total_tokens}')
-        app.logger.debug(f'Generated answer: {assistant_message[:100]}...')
-
-        return assistant_message
-
-    except Exception as e:
-        app.logger.error(f'Error generating answer with context: {str(e)}')
-        app.logger.error(traceback.format_exc())
-        raise
+    return {
+        'kind': 'context',
+        'messages': [
+            {'role': 'system', 'content': system_prompt},
+            {'role': 'user', 'content': user_message}
+        ],
+        'context': f"{faq_context}\n{policy_context}".strip()
+    }
 
-def generate_answer_with_dify_rag(user_message, retrieved_docs, prompt_template=None):
+def build_dify_rag_prompt(user_message, retrieved_docs, prompt_template=None):
     """
-    Generate answer using OpenAI with Dify retrieved documents as context
+    Build answer prompt with Dify retrieved documents as context
 
     Args:
         user_message: User's query
@@ -1044,33 +1989,30 @@ def generate_answer_with_dify_rag(user_message, retrieved_docs, prompt_template=
         prompt_template: Optional custom prompt template
 
     Returns:
-        str: Generated answer
+        dict: {'kind': 'dify_rag', 'messages': list, 'context': str}
     """
-    try:
-        app.logger.debug('Generating answer with RAG context')
-
-        # Build context from retrieved documents
-        context_parts = []
-        for idx, record in enumerate(retrieved_docs):
-            segment = record.get('segment', {})
-            content = segment.get('content', '')
-            dataset_name = record.get('dataset_name', '문서')
-            document_name = segment.get('document', {}).get('name', '알 수 없음')
-            score = record.get('score', 0)
+    # Build context from retrieved documents
+    context_parts = []
+    for idx, record in enumerate(retrieved_docs):
+        segment = record.get('segment', {})
+        content = segment.get('content', '')
+        dataset_name = record.get('dataset_name', '문서')
+        document_name = segment.get('document', {}).get('name', '알 수 없음')
+        score = record.get('score', 0)
 
-            context_parts.append(f"""
+        context_parts.append(f"""
 [참고자료 {idx+1}] (관련도: {score:.2f})
 출처: {dataset_name} - {document_name}
 내용: {content}
 """)
 
-        context = "\n".join(context_parts)
+    context = "\n".join(context_parts)
 
-        # Use custom prompt template or default
-        if prompt_template:
-            system_prompt = prompt_template
-        else:
-            system_prompt = f"""당신은 대한민국 공무원이 민원인의 문의에 전문적으로 답변하기 위한 기금 민원처리 전문가 도우미입니다.
+    # Use custom prompt template or default
+    if prompt_template:
+        system_prompt = prompt_template
+    else:
+        system_prompt = f"""당신은 대한민국 공무원이 민원인의 문의에 전문적으로 답변하기 위한 기금 민원처리 전문가 도우미입니다.
 
 다음 참고자료를 바탕으로 답변해주세요:
 
@@ -1084,51 +2026,19 @@ def generate_answer_with_dify_rag(user_message, retrieved_docs, prompt_template=
 5. 참고자료에 없는 내용은 추측하지 말고, 추가 확인이 필요하다고 안내하세요
 6. 추가 문의사항이 있는지 확인하세요"""
 
-        # Call OpenAI with RAG context
-        start_time = datetime.now()
-
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {'role': 'system', 'content': system_prompt},
-                {'role': 'user', 'content': user_message}
-            ],
-            temperature=0.7,
-            max_tokens=1000
-        )
-
-        elapsed_time = (datetime.now() - start_time).total_seconds()
-        assistant_message = response.choices[0].message.content
-
-        api_logger.info(f'RAG answer generated in {elapsed_time:.2f}s - Tokens: {response.usage.total_tokens}')
-
-        return assistant_message
-
-    except Exception as e:
-        app.logger.error(f'Error generating RAG answer: {str(e)}')
-        app.logger.error(f'Traceback: {traceback.format_exc()}')
-        raise
-
-def generate_suggested_answer(user_message, assistant_response, matched_faq_id=None, related_laws=None):
-    """
-    FAQ RAG 기반 민원처리 답변 생성
-
-    Args:
-        user_message: 사용자 질문
-        assistant_response: 챗봇 답변 (FAQ RAG 기반)
-        matched_faq_id: 매칭된 FAQ ID (선택)
-        related_laws: 관련 법령 리스트 (선택, 별도 탭에 표시됨)
-
-    Returns:
-        str: HTML 형식의 민원처리 답변
-    """
-    try:
-        app.logger.debug(f'Generating suggested answer (FAQ ID: {matched_faq_id})')
+    return {
+        'kind': 'dify_rag',
+        'messages': [
+            {'role': 'system', 'content': system_prompt},
+            {'role': 'user', 'content': user_message}
+        ],
+        'context': context.strip()
+    }
 
-        # ========================================
-        # 📝 답변지침란 (나중에 수정 가능)
-        # ========================================
-        system_instruction = """당신은 ICT 기금사업규정 전문가입니다.
+# ========================================
+# 📝 답변지침란 (나중에 수정 가능)
+# ========================================
+SUGGESTED_ANSWER_INSTRUCTION = """당신은 ICT 기금사업규정 전문가입니다.
 기금규정 업무를 담당하는 직원들의 질문에 답변하는 역할입니다.
 업무 조언 형식으로 답변하며, 문의처 안내는 필요하지 않습니다.
 
@@ -1184,43 +2094,270 @@ def generate_suggested_answer(user_message, assistant_response, matched_faq_id=N
     <p>추가로 필요한 정보가 있으면 언제든 문의하세요.</p>
 </div>
 """
-        # ========================================
+# ========================================
+
+SUGGESTED_ANSWER_ERROR_HTML = "<p>답변 생성 중 오류가 발생했습니다.</p>"
+
+def build_suggested_answer_prompt(user_message, reference, reference_label='참고 답변'):
+    """
+    suggested_answer 생성 프롬프트 구성
+
+    Args:
+        user_message: 사용자 질문
+        reference: 참고 내용 (챗봇 답변 또는 검색 컨텍스트)
+        reference_label: 참고 내용 이름 ('참고 답변' / '참고 자료')
 
-        prompt = f"""{system_instruction}
+    Returns:
+        str: 프롬프트
+    """
+    return f"""{SUGGESTED_ANSWER_INSTRUCTION}
 
 질문: {user_message}
-참고 답변: {assistant_response}
+{reference_label}: {reference}
 
 위 내용을 바탕으로 직원 업무 조언 형식의 답변을 작성하세요.
 반드시 위의 HTML 포맷 지침을 따라 깔끔하고 보기 좋게 구조화하세요.
 
 ✅ 필수 포함 사항:
 - 참고사항 섹션에 관련 처리지침(운영지침, 시행세칙 등)을 반드시 포함하세요
-- 처리지침이 참고 답변에 있다면 반드시 명시하세요
+- 처리지침이 {reference_label}에 있다면 반드시 명시하세요
 
 ⚠️ 중요: HTML 코드만 출력하세요. ```html``` 같은 마크다운 코드 블록 태그는 절대 사용하지 마세요."""
 
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{'role': 'user', 'content': prompt}],
-            temperature=0.3,  # 낮춰서 더 일관성 있는 답변
-            max_tokens=800
-        )
+def clean_html_answer(answer):
+    """마크다운 코드 블록 제거 (```html, ``` 등)"""
+    return answer.replace('```html', '').replace('```', '').strip()
+
+async def complete_suggested_answer_async(io, user_message, reference, reference_label='참고 답변'):
+    """
+    suggested_answer 생성 호출 (실패 시 오류 HTML 반환)
 
-        api_logger.info(f'Suggested answer generated - Tokens used: {response.usage.total_tokens}')
+    Returns:
+        dict: complete_chat_async() 결과 (content는 정리된 HTML)
+    """
+    try:
+        with request_trace.span('suggested_answer'):
+            completion = await complete_chat_async(
+                io,
+                [{'role': 'user', 'content': build_suggested_answer_prompt(user_message, reference, reference_label)}],
+                temperature=0.3,  # 낮춰서 더 일관성 있는 답변
+                max_tokens=800
+            )
 
-        # 마크다운 코드 블록 제거 (```html, ``` 등)
-        answer = response.choices[0].message.content
-        answer = answer.replace('```html', '').replace('```', '').strip()
+        api_logger.info(f'Suggested answer generated - Tokens used: {completion["usage"]["total_tokens"]}')
 
-        app.logger.debug(f'Generated answer length: {len(answer)}')
+        completion['content'] = clean_html_answer(completion['content'])
+        app.logger.debug('Generated answer length: %d', len(completion['content']))
 
-        return answer
+        return completion
 
     except Exception as e:
         app.logger.error(f'Error generating suggested answer: {str(e)}')
         app.logger.error(traceback.format_exc())
-        return "<p>답변 생성 중 오류가 발생했습니다.</p>"
+        return {
+            'content': SUGGESTED_ANSWER_ERROR_HTML,
+            'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0},
+            'elapsed': 0.0
+        }
+
+# ========================================
+# 생성 모드 (GENERATION_MODE)
+# - sequential: 답변 생성 → 답변을 참고해 suggested_answer 생성 (LLM 2회, 순차)
+# - parallel:   같은 검색 컨텍스트로 두 호출을 동시에 실행 (LLM 2회, 병렬)
+# - combined:   JSON 출력 1회 호출로 message + suggested_answer 동시 생성
+# ========================================
+GENERATION_MODES = ('sequential', 'parallel', 'combined')
+GENERATION_MODE = os.getenv('GENERATION_MODE', 'sequential').lower()
+if GENERATION_MODE not in GENERATION_MODES:
+    app.logger.warning(f"Unknown GENERATION_MODE '{GENERATION_MODE}', using 'sequential'")
+    GENERATION_MODE = 'sequential'
+app.logger.info(f"Generation mode: {GENERATION_MODE}")
+
+generation_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('GENERATION_MAX_WORKERS', '8')),
+    thread_name_prefix='generation'
+)
+
+COMBINED_OUTPUT_INSTRUCTION = f"""
+
+[출력 형식]
+반드시 아래 두 필드만 가진 JSON 객체 하나로 출력하세요.
+{{"message": "챗봇 답변", "suggested_answer": "HTML 답변"}}
+
+- message: 위 지침에 따른 챗봇 답변 (일반 텍스트)
+- suggested_answer: message와 같은 내용을 직원 업무 조언 형식으로 정리한 HTML (아래 지침을 따르세요)
+
+{SUGGESTED_ANSWER_INSTRUCTION}
+✅ suggested_answer 필수 포함 사항:
+- 참고사항 섹션에 관련 처리지침(운영지침, 시행세칙 등)을 반드시 포함하세요
+- HTML 코드만 넣고 ```html``` 같은 마크다운 코드 블록 태그는 사용하지 마세요"""
+
+class GenerationMetrics:
+    """생성 모드별 누적 토큰 사용량 및 지연시간 통계"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, mode, elapsed, usage, llm_calls):
+        with self._lock:
+            stats = self._stats.setdefault(mode, {
+                'requests': 0,
+                'llm_calls': 0,
+                'prompt_tokens': 0,
+                'completion_tokens': 0,
+                'total_tokens': 0,
+                'total_elapsed': 0.0,
+                'max_elapsed': 0.0
+            })
+            stats['requests'] += 1
+            stats['llm_calls'] += llm_calls
+            for key in ('prompt_tokens', 'completion_tokens', 'total_tokens'):
+                stats[key] += usage[key]
+            stats['total_elapsed'] += elapsed
+            stats['max_elapsed'] = max(stats['max_elapsed'], elapsed)
+
+    def snapshot(self):
+        """모드별 통계 (요청당 평균 포함)"""
+        with self._lock:
+            result = {}
+            for mode, stats in self._stats.items():
+                requests_count = stats['requests']
+                result[mode] = dict(stats)
+                result[mode]['avg_total_tokens'] = round(stats['total_tokens'] / requests_count, 1)
+                result[mode]['avg_elapsed'] = round(stats['total_elapsed'] / requests_count, 3)
+            return result
+
+generation_metrics = GenerationMetrics()
+
+def _sum_usage(*completions):
+    """여러 complete_chat_async() 결과의 토큰 사용량 합산"""
+    return {
+        key: sum(completion['usage'][key] for completion in completions)
+        for key in ('prompt_tokens', 'completion_tokens', 'total_tokens')
+    }
+
+def build_combined_messages(answer_prompt):
+    """답변 프롬프트의 시스템 메시지에 JSON 출력 형식 지시 추가"""
+    messages = [dict(message) for message in answer_prompt['messages']]
+    messages[0]['content'] += COMBINED_OUTPUT_INSTRUCTION
+    return messages
+
+def parse_combined_output(completion):
+    """
+    combined 모드 JSON 응답 파싱
+
+    Returns:
+        tuple: (message, suggested_answer), JSON이 아니면 None (suggested_answer는 별도 생성)
+    """
+    api_logger.info(f'Combined answer generated in {completion["elapsed"]:.2f}s - Tokens: {completion["usage"]["total_tokens"]}')
+    try:
+        payload = json.loads(completion['content'])
+        return payload['message'], clean_html_answer(payload['suggested_answer'])
+    except (ValueError, KeyError, TypeError) as e:
+        app.logger.warning(f'Combined output is not valid JSON ({e}), generating suggested answer separately')
+        return None
+
+async def generate_chat_outputs_async(io, answer_prompt, user_message, mode=None, on_delta=None):
+    """
+    답변 프롬프트로 챗봇 답변과 suggested_answer 생성 (GENERATION_MODE에 따라)
+
+    Args:
+        io: ChatIO
+        answer_prompt: build_*_prompt() 결과
+        user_message: 사용자 질문
+        mode: 생성 모드 (기본값: GENERATION_MODE)
+        on_delta: 지정 시 챗봇 답변을 스트리밍 생성하며 텍스트 조각마다 호출
+                  (토큰 단위 출력이 불가능한 combined 모드는 sequential로 처리)
+
+    Returns:
+        dict: {'message': str, 'suggested_answer': str, 'stats': dict}
+    """
+    mode = mode or GENERATION_MODE
+    if on_delta is not None:
+        mode = 'stream_parallel' if mode == 'parallel' else 'stream_sequential'
+    with request_trace.span('generation', mode=mode):
+        if on_delta is not None:
+            return await _stream_chat_outputs(io, answer_prompt, user_message, mode, on_delta)
+        return await _generate_chat_outputs(io, answer_prompt, user_message, mode)
+
+async def _generate_chat_outputs(io, answer_prompt, user_message, mode):
+    """generate_chat_outputs_async() 본문 (generation span 안에서 실행)"""
+    start_time = time.perf_counter()
+
+    if mode == 'combined':
+        # LLM 1회 호출(JSON 출력), 파싱에 실패하면 응답 전체를 챗봇 답변으로 보고 suggested_answer만 별도 생성
+        completion = await complete_chat_async(
+            io,
+            build_combined_messages(answer_prompt),
+            temperature=0.5,
+            max_tokens=2000,
+            response_format={'type': 'json_object'}
+        )
+        parsed = parse_combined_output(completion)
+        if parsed:
+            message, suggested_answer, completions = parsed[0], parsed[1], [completion]
+        else:
+            suggested = await complete_suggested_answer_async(io, user_message, completion['content'])
+            message, suggested_answer, completions = completion['content'], suggested['content'], [completion, suggested]
+
+    elif mode == 'parallel':
+        # 챗봇 답변 대신 검색 컨텍스트를 참고해 suggested_answer를 동시에 생성
+        reference = answer_prompt['context'] or user_message
+        answer, suggested = await asyncio.gather(
+            io.start(generation_executor, complete_chat_async, io, answer_prompt['messages']),
+            io.start(generation_executor, complete_suggested_answer_async, io, user_message, reference, '참고 자료')
+        )
+        message, suggested_answer, completions = answer['content'], suggested['content'], [answer, suggested]
+
+    else:
+        answer = await complete_chat_async(io, answer_prompt['messages'])
+        suggested = await complete_suggested_answer_async(io, user_message, answer['content'])
+        message, suggested_answer, completions = answer['content'], suggested['content'], [answer, suggested]
+
+    return generation_result(mode, start_time, message, suggested_answer, completions)
+
+async def _stream_chat_outputs(io, answer_prompt, user_message, mode, on_delta):
+    """generate_chat_outputs_async() 스트리밍 본문 (stream_parallel / stream_sequential)"""
+    start_time = time.perf_counter()
+
+    if mode == 'stream_parallel':
+        reference = answer_prompt['context'] or user_message
+        suggested_future = io.start(
+            generation_executor, complete_suggested_answer_async, io, user_message, reference, '참고 자료'
+        )
+        try:
+            answer = await stream_chat_async(io, answer_prompt['messages'], on_delta)
+        except BaseException:
+            suggested_future.cancel()
+            raise
+        suggested = await suggested_future
+    else:
+        answer = await stream_chat_async(io, answer_prompt['messages'], on_delta)
+        suggested = await complete_suggested_answer_async(io, user_message, answer['content'])
+
+    return generation_result(mode, start_time, answer['content'], suggested['content'], [answer, suggested])
+
+def generation_result(mode, start_time, message, suggested_answer, completions):
+    """생성 통계 기록 후 generate_chat_outputs_async() 결과 구성"""
+    elapsed_time = time.perf_counter() - start_time
+    usage = _sum_usage(*completions)
+    generation_metrics.record(mode, elapsed_time, usage, llm_calls=len(completions))
+
+    api_logger.info(
+        f'[Generation:{mode}] {len(completions)} LLM call(s) in {elapsed_time:.2f}s - Tokens: {usage["total_tokens"]}'
+    )
+
+    return {
+        'message': message,
+        'suggested_answer': suggested_answer,
+        'stats': {
+            'mode': mode,
+            'llm_calls': len(completions),
+            'elapsed': round(elapsed_time, 3),
+            **usage
+        }
+    }
 
 def generate_related_laws(user_message):
     """Generate related laws and regulations"""
@@ -1275,19 +2412,28 @@ def generate_related_laws(user_message):
 def get_law_master_tree():
     """
     [2단계] 마스터 트리 데이터 반환
-    서버 시작 시 로드한 전역 변수를 그대로 반환 (DB 실시간 조회 X)
+    서버 시작 시 직렬화·압축해 둔 본문을 그대로 반환 (DB 조회, JSON 직렬화 X)
+
+    - ETag/If-None-Match: 변경이 없으면 304 (본문 없음)
+    - ?v=<버전>으로 요청하면 내용이 바뀌지 않으므로 장기 캐시(immutable)
+    - 버전 없는 요청은 매번 재검증 (no-cache + ETag)
     """
-    try:
-        app.logger.info(f'Master tree requested: {len(LAW_MASTER_TREE)} sheets')
-        return jsonify({
-            'success': True,
-            'data': LAW_MASTER_TREE,
-            'sheet_count': len(LAW_MASTER_TREE),
-            'article_count': sum(len(v) for v in LAW_MASTER_TREE.values())
-        })
-    except Exception as e:
-        app.logger.error(f'Error getting master tree: {str(e)}')
-        return jsonify({'success': False, 'error': str(e), 'data': {}}), 500
+    payload = current_data().master_tree_payload
+    if request.args.get('v') == payload.version:
+        cache_control = f'public, max-age={MASTER_TREE_MAX_AGE}, immutable'
+    else:
+        cache_control = 'no-cache'
+    encoding = payload.select_encoding(request.headers.get('Accept-Encoding'))
+    headers = {'ETag': payload.etag_for(encoding), 'Cache-Control': cache_control, 'Vary': 'Accept-Encoding'}
+
+    if payload.matches(request.headers.get('If-None-Match')):
+        return Response(status=304, headers=headers)
+
+    if encoding != 'identity':
+        headers['Content-Encoding'] = encoding
+    app.logger.info(f'Master tree requested: version={payload.version}, encoding={encoding}')
+    return Response(payload.bodies[encoding], status=200, headers=headers,
+                    content_type='application/json; charset=utf-8')
 
 @app.route('/api/laws/sheets', methods=['GET'])
 def get_sheets():
@@ -1332,32 +2478,157 @@ def get_paragraphs():
         app.logger.error(f'Error getting paragraphs: {str(e)}')
         return jsonify({'error': str(e), 'paragraphs': []}), 500
 
+# ----------------------------------------
+# 지연 로딩 트리 API (지침 요약 → 조 → 항, 커서 페이지네이션)
+# 공통 파라미터: limit (기본 50, 최대 500), cursor (이전 응답의 next_cursor), fields (쉼표 구분)
+# ----------------------------------------
+
+def law_tree_page_response(build_page):
+    """트리 인덱스 페이지 조회 결과를 공통 형식으로 변환 (잘못된 파라미터 400, 만료된 커서 409)"""
+    try:
+        page = build_page(current_data().law_tree_index)
+    except StaleCursorError as e:
+        return jsonify({'success': False, 'error': str(e)}), 409
+    except TreeQueryError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    if page is None:
+        return jsonify({'success': False, 'error': 'Not found'}), 404
+    return jsonify({'success': True, **page})
+
+@app.route('/api/laws/tree/sheets', methods=['GET'])
+def get_law_tree_sheets():
+    """지침 요약 목록 (지침명, 조 수, 항 수)"""
+    args = request.args
+    return law_tree_page_response(
+        lambda index: index.sheets(args.get('limit'), args.get('cursor'), args.get('fields'))
+    )
+
+@app.route('/api/laws/tree/articles', methods=['GET'])
+def get_law_tree_articles():
+    """지침의 조 목록 (조 키, 조 번호, 제목, 항 수)"""
+    args = request.args
+    sheet_name = args.get('sheet_name')
+    if not sheet_name:
+        return jsonify({'success': False, 'error': 'sheet_name is required'}), 400
+    return law_tree_page_response(
+        lambda index: index.articles(sheet_name, args.get('limit'), args.get('cursor'), args.get('fields'))
+    )
+
+@app.route('/api/laws/tree/paragraphs', methods=['GET'])
+def get_law_tree_paragraphs():
+    """조의 항 목록 (article은 '제35조' 또는 '35')"""
+    args = request.args
+    sheet_name = args.get('sheet_name')
+    article = args.get('article')
+    if not sheet_name or not article:
+        return jsonify({'success': False, 'error': 'sheet_name and article are required'}), 400
+    return law_tree_page_response(
+        lambda index: index.paragraphs(sheet_name, article, args.get('limit'), args.get('cursor'),
+                                       args.get('fields'))
+    )
+
+@app.route('/api/generation/stats', methods=['GET'])
+def get_generation_stats():
+    """생성 모드별 토큰 사용량 및 지연시간 통계"""
+    return jsonify({'mode': GENERATION_MODE, 'modes': generation_metrics.snapshot()})
+
+@app.route('/api/trace/stats', methods=['GET'])
+def get_trace_stats():
+    """/api/chat 단계별(span 이름별) 지연시간 히스토그램 (count, avg, p50/p95, 버킷별 누적 건수)"""
+    return jsonify({'stages': stage_histograms.snapshot()})
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus 텍스트 형식 메트릭 (요청 수/지연시간, OpenAI 토큰, Dify 결과, 답변 경로, 캐시, 세션, SQLite)"""
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+@app.route('/api/sessions/stats', methods=['GET'])
+def get_session_stats():
+    """채팅 세션 저장소 통계 (세션 수, 메모리 사용량, 만료/제거 횟수)"""
+    return jsonify(chat_sessions.stats())
+
+@app.route('/api/faq/law-links', methods=['GET'])
+def get_faq_law_links_report():
+    """미리 계산된 FAQ 법령 연결 현황 + 해석하지 못한 anchor 목록"""
+    try:
+        unresolved = database.get_unresolved_anchors()
+    except Exception as e:
+        app.logger.error(f'Error reading unresolved anchors: {e}')
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+    faq_law_links = current_data().faq_law_links
+    return jsonify({
+        'success': True,
+        'faqs_linked': len(faq_law_links),
+        'anchors_linked': sum(len(anchors) for anchors in faq_law_links.values()),
+        'unresolved_count': len(unresolved),
+        'unresolved': unresolved
+    })
+
+@app.route('/api/admin/reload', methods=['GET', 'POST'])
+def admin_reload():
+    """
+    참조 데이터 재적재 (POST) / 상태 조회 (GET)
+
+    POST body: {"wait": true}이면 재적재가 끝날 때까지 기다린 뒤 결과 반환,
+    아니면 백그라운드로 시작하고 바로 반환합니다.
+    ADMIN_TOKEN이 없으면 재적재(POST)는 서버 자신(localhost)에서 보낸 요청만 허용합니다.
+    """
+    if ADMIN_TOKEN:
+        token = request.headers.get('X-Admin-Token', '')
+        if not hmac.compare_digest(token.encode('utf-8'), ADMIN_TOKEN.encode('utf-8')):
+            return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+    elif request.method == 'POST' and request.remote_addr not in _LOCAL_ADDRESSES:
+        return jsonify({'success': False, 'error': 'ADMIN_TOKEN is not configured'}), 403
+
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        if data.get('wait'):
+            result = data_reloader.reload(reason='admin')
+            return jsonify({'success': result['success'], 'reload': result, 'status': data_reloader.status()})
+
+        started = data_reloader.trigger(reason='admin')
+        return jsonify({'success': True, 'started': started, 'status': data_reloader.status()}), 202
+
+    data = current_data()
+    return jsonify({
+        'success': True,
+        'status': data_reloader.status(),
+        'data': {
+            'version': data.version,
+            'sheet_count': len(data.law_master_tree),
+            'faq_count': len(data.faq_store),
+            'faqs_linked': len(data.faq_law_links),
+            'master_tree_version': data.master_tree_payload.version
+        }
+    })
+
+@app.route('/api/dify/stats', methods=['GET'])
+def get_dify_stats():
+    """Dify 클라이언트 서킷 브레이커 상태, 호출/재시도 횟수, 지연시간 p50/p95"""
+    return jsonify(dify_client.stats())
+
+@app.route('/api/cache/stats', methods=['GET'])
+def get_response_cache_stats():
+    """응답 캐시 항목 수와 적중/실패 카운터"""
+    return jsonify({'enabled': RESPONSE_CACHE_ENABLED, **response_cache.stats()})
+
+@app.route('/api/db/pool-stats', methods=['GET'])
+def get_db_pool_stats():
+    """SQLite 커넥션 풀 통계 (연결 생성/재사용 횟수)"""
+    return jsonify(database.get_pool_stats())
+
 @app.route('/api/new-session', methods=['POST'])
 def new_session():
     """Create a new chat session"""
     session_id = str(uuid.uuid4())
-    chat_sessions[session_id] = {
-        'messages': [],
-        'created_at': datetime.now()
-    }
+    chat_sessions.ensure(session_id)
     app.logger.info(f'New session created: {session_id} from IP: {request.remote_addr}')
     return jsonify({'session_id': session_id})
 
-@app.route('/api/chat/confirm', methods=['POST'])
-def chat_confirm():
-    """
-    1단계: 질문 요약 및 확인
-    사용자 질문을 이해하고 확인 메시지만 생성 (FAQ RAG 호출 X)
-    """
-    try:
-        data = request.get_json()
-        user_message = data.get('message', '')
-        session_id = data.get('session_id', str(uuid.uuid4()))
-
-        app.logger.info(f'[CONFIRM] Question from session {session_id}: {user_message[:100]}...')
-
-        # 질문 요약/확인 프롬프트
-        confirmation_prompt = f"""다음 질문을 이해하고 간단히 요약하여 되물어주세요.
+def build_confirmation_prompt(user_message):
+    """질문 요약/확인 프롬프트 (/api/chat/confirm)"""
+    return f"""다음 질문을 이해하고 간단히 요약하여 되물어주세요.
 
 사용자 질문: {user_message}
 
@@ -1374,26 +2645,45 @@ def chat_confirm():
 
 간결하고 정중하게 답변하세요."""
 
-        start_time = datetime.now()
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{'role': 'user', 'content': confirmation_prompt}],
-            temperature=0.3,
-            max_tokens=100
-        )
+async def confirm_question_async(io, session_id, user_message):
+    """
+    질문 요약/확인 메시지 생성 (/api/chat/confirm 응답 본문)
 
-        elapsed_time = (datetime.now() - start_time).total_seconds()
-        confirmation_message = response.choices[0].message.content
+    Returns:
+        dict: {'success', 'message', 'session_id', 'requires_confirmation'}
+    """
+    app.logger.info(f'[CONFIRM] Question from session {session_id}: {user_message[:100]}...')
 
-        app.logger.info(f'[CONFIRM] Generated confirmation in {elapsed_time:.2f}s: {confirmation_message}')
-        api_logger.info(f'Confirmation generated - Tokens: {response.usage.total_tokens}')
+    completion = await complete_chat_async(
+        io,
+        [{'role': 'user', 'content': build_confirmation_prompt(user_message)}],
+        temperature=0.3,
+        max_tokens=100
+    )
+    confirmation_message = completion['content']
 
-        return jsonify({
-            'success': True,
-            'message': confirmation_message,
-            'session_id': session_id,
-            'requires_confirmation': True
-        })
+    app.logger.info(f'[CONFIRM] Generated confirmation in {completion["elapsed"]:.2f}s: {confirmation_message}')
+    api_logger.info(f'Confirmation generated - Tokens: {completion["usage"]["total_tokens"]}')
+
+    return {
+        'success': True,
+        'message': confirmation_message,
+        'session_id': session_id,
+        'requires_confirmation': True
+    }
+
+@app.route('/api/chat/confirm', methods=['POST'])
+def chat_confirm():
+    """
+    1단계: 질문 요약 및 확인
+    사용자 질문을 이해하고 확인 메시지만 생성 (FAQ RAG 호출 X)
+    """
+    try:
+        data = request.get_json()
+        user_message = data.get('message', '')
+        session_id = data.get('session_id', str(uuid.uuid4()))
+
+        return jsonify(run_flow(confirm_question_async, chat_io, session_id, user_message))
 
     except Exception as e:
         app.logger.error(f'Error in confirmation: {str(e)}')
@@ -0,0 +1,323 @@
+"""
+비동기 ASGI 채팅 서버 (FastAPI + uvicorn)
+
+Flask 앱(app.py)의 처리 흐름(run_chat_async, confirm_question_async)을 그대로 실행하고,
+외부 I/O만 AsyncChatIO로 바꿔 비동기로 처리합니다.
+- OpenAI: AsyncOpenAI (LLM 대기 중에도 이벤트 루프가 다른 요청 처리)
+- Dify: AsyncDifyClient (httpx 연결 풀 + 재시도 + 서킷 브레이커)
+- SQLite/CPU 작업(키워드 검색, FAQ 매칭, 프롬프트 구성, 세션 저장): 스레드 풀로 넘겨 이벤트 루프를 막지 않음
+- 검색 브랜치, parallel 생성은 스레드 풀 대신 asyncio 태스크로 동시에 실행
+
+제공 경로: /, /api/chat, /api/chat/confirm, /api/new-session, /api/laws/*, 통계 API, /metrics
+(/api/chat/stream, /api/admin/reload는 Flask 버전에서만 제공)
+
+실행: uv run uvicorn asgi_app:app --host 127.0.0.1 --port 8000
+     (또는 uv run python asgi_app.py, ASGI_WORKERS로 워커 수 지정)
+"""
+import asyncio
+import os
+import time
+import traceback
+import uuid
+from contextlib import asynccontextmanager
+from typing import Optional
+
+import anyio
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, JSONResponse, Response
+from fastapi.staticfiles import StaticFiles
+from openai import AsyncOpenAI
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+
+import app as flask_app  # 참조 데이터 적재, 세션 저장소, 응답 캐시, 프롬프트 구성 공유
+import database
+import log_pipeline
+import metrics
+import request_trace
+from dify_client import AsyncDifyClient, CircuitBreaker
+from law_tree_index import StaleCursorError, TreeQueryError
+
+logger = flask_app.app.logger
+api_logger = flask_app.api_logger
+
+# SQLite/CPU 작업용 스레드 수 (anyio 기본 40)
+ASGI_THREADPOOL_SIZE = int(os.getenv('ASGI_THREADPOOL_SIZE', '40'))
+
+async_client = AsyncOpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+async_dify_client = AsyncDifyClient(
+    flask_app.DIFY_API_URL, flask_app.DIFY_API_KEY, flask_app.DIFY_DATASET_ID,
+    connect_timeout=flask_app.DIFY_CONNECT_TIMEOUT,
+    read_timeout=flask_app.DIFY_READ_TIMEOUT,
+    max_retries=flask_app.DIFY_MAX_RETRIES,
+    pool_size=flask_app.DIFY_POOL_SIZE,
+    breaker=CircuitBreaker(flask_app.DIFY_BREAKER_FAILURES, flask_app.DIFY_BREAKER_RECOVERY)
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    anyio.to_thread.current_default_thread_limiter().total_tokens = ASGI_THREADPOOL_SIZE
+    logger.info(f'ASGI server started (threadpool={ASGI_THREADPOOL_SIZE})')
+    yield
+    await async_dify_client.aclose()
+    await async_client.close()
+
+app = FastAPI(title='Civil Complaint Chatbot (ASGI)', lifespan=lifespan)
+app.mount('/static', StaticFiles(directory=os.path.join(os.path.dirname(__file__), 'static')), name='static')
+
+class ChatRequest(BaseModel):
+    message: str = ''
+    session_id: Optional[str] = None
+    prompt_template: Optional[str] = None
+    debug: bool = False  # True면 metadata.timings에 단계별 소요시간 포함
+
+class ConfirmRequest(BaseModel):
+    message: str = ''
+    session_id: Optional[str] = None
+
+@app.middleware('http')
+async def log_requests(request: Request, call_next):
+    """Log incoming requests and outgoing responses (요청 ID는 call_next 안의 태스크/스레드 풀로 전파)"""
+    request_id = request.headers.get('X-Request-ID') or log_pipeline.new_request_id()
+    token = log_pipeline.set_request_id(request_id)
+    try:
+        logger.info('Request: %s %s', request.method, request.url.path)
+        start = time.perf_counter()
+        response = await call_next(request)
+        logger.info('Response: %s %s - Status: %s', request.method, request.url.path, response.status_code)
+    finally:
+        log_pipeline.reset_request_id(token)
+    response.headers['X-Request-ID'] = request_id
+
+    # 라우팅 후 scope['route']에 매칭된 라우트가 들어 있음 (Flask와 같은 레이블 사용)
+    route = getattr(request.scope.get('route'), 'path', 'unmatched')
+    flask_app.http_request_duration.observe(time.perf_counter() - start, method=request.method, route=route)
+    flask_app.http_requests_total.inc(method=request.method, route=route, status=response.status_code)
+    return response
+
+@app.get('/', response_class=HTMLResponse)
+async def index():
+    """Render the main chat interface (Flask 템플릿 재사용)"""
+    def render():
+        with flask_app.app.test_request_context('/'):
+            return flask_app.index()
+    return HTMLResponse(await run_in_threadpool(render))
+
+# ========================================
+# 외부 I/O (처리 흐름은 app.py와 공유)
+# ========================================
+
+class AsyncChatIO(flask_app.ChatIO):
+    """ASGI용 외부 I/O (비동기 OpenAI/Dify 클라이언트, 블로킹 함수는 스레드 풀)"""
+
+    timeout_errors = (httpx.TimeoutException,)
+    http_errors = (httpx.HTTPError,)
+
+    async def call(self, func, *args):
+        return await run_in_threadpool(func, *args)
+
+    async def chat_completion(self, **kwargs):
+        return await async_client.chat.completions.create(**kwargs)
+
+    async def chat_completion_stream(self, **kwargs):
+        async for chunk in await async_client.chat.completions.create(stream=True, **kwargs):
+            yield chunk
+
+    async def dify_retrieve(self, payload):
+        return await async_dify_client.retrieve(payload)
+
+    def start(self, executor, coro_func, *args):
+        """스레드 풀(executor) 대신 같은 이벤트 루프의 태스크로 실행 (컨텍스트는 태스크가 복사)"""
+        return asyncio.ensure_future(coro_func(*args))
+
+async_io = AsyncChatIO()
+
+# ========================================
+# 채팅 API
+# ========================================
+
+@app.post('/api/chat')
+async def chat(body: ChatRequest):
+    """Handle chat messages and generate responses"""
+    session_id = None
+    try:
+        user_message = body.message
+        session_id = body.session_id or str(uuid.uuid4())
+
+        logger.info(f'Chat request from session {session_id}: {user_message[:100]}...')
+        api_logger.info(f'Session {session_id} - User message: {user_message}')
+
+        with request_trace.trace('chat', flask_app.stage_histograms) as trace:
+            response_data = await flask_app.run_chat_async(async_io, session_id, user_message, body.prompt_template)
+        if flask_app.wants_timings(body.debug):
+            response_data['metadata']['timings'] = trace.to_dict()
+        return response_data
+
+    except Exception as e:
+        error_session = session_id if session_id else 'unknown'
+        logger.error(f'Error in chat endpoint for session {error_session}: {str(e)}')
+        logger.error(f'Traceback: {traceback.format_exc()}')
+        return JSONResponse({'success': False, 'error': str(e), 'ai_mode': flask_app.AI_MODE}, status_code=500)
+
+@app.post('/api/chat/confirm')
+async def chat_confirm(body: ConfirmRequest):
+    """1단계: 질문 요약 및 확인 (FAQ RAG 호출 X)"""
+    try:
+        user_message = body.message
+        session_id = body.session_id or str(uuid.uuid4())
+        return await flask_app.confirm_question_async(async_io, session_id, user_message)
+
+    except Exception as e:
+        logger.error(f'Error in confirmation: {str(e)}')
+        logger.error(traceback.format_exc())
+        return JSONResponse({'success': False, 'error': str(e)}, status_code=500)
+
+@app.post('/api/new-session')
+async def new_session(request: Request):
+    """Create a new chat session"""
+    session_id = str(uuid.uuid4())
+    await run_in_threadpool(flask_app.chat_sessions.ensure, session_id)
+    logger.info(f'New session created: {session_id} from IP: {request.client.host if request.client else "-"}')
+    return {'session_id': session_id}
+
+# ========================================
+# 관련 법령 API (DB 조회는 스레드 풀, 트리 인덱스는 메모리 조회)
+# ========================================
+
+@app.get('/api/laws/master-tree')
+async def get_law_master_tree(request: Request, v: Optional[str] = None):
+    """미리 직렬화·압축해 둔 마스터 트리 본문 반환 (ETag/304, ?v=<버전> 장기 캐시)"""
+    payload = flask_app.current_data().master_tree_payload
+    if v == payload.version:
+        cache_control = f'public, max-age={flask_app.MASTER_TREE_MAX_AGE}, immutable'
+    else:
+        cache_control = 'no-cache'
+    encoding = payload.select_encoding(request.headers.get('accept-encoding'))
+    headers = {'ETag': payload.etag_for(encoding), 'Cache-Control': cache_control, 'Vary': 'Accept-Encoding'}
+
+    if payload.matches(request.headers.get('if-none-match')):
+        return Response(status_code=304, headers=headers)
+
+    if encoding != 'identity':
+        headers['Content-Encoding'] = encoding
+    return Response(payload.bodies[encoding], headers=headers, media_type='application/json; charset=utf-8')
+
+@app.get('/api/laws/sheets')
+async def get_sheets():
+    """Sheet 목록 조회 (지침 목록)"""
+    try:
+        sheets = await run_in_threadpool(database.get_sheet_list)
+        return {'sheets': sheets}
+    except Exception as e:
+        logger.error(f'Error getting sheets: {str(e)}')
+        return JSONResponse({'error': str(e), 'sheets': []}, status_code=500)
+
+@app.get('/api/laws/articles')
+async def get_articles(sheet_name: Optional[str] = None):
+    """조항 목록 조회"""
+    if not sheet_name:
+        return JSONResponse({'error': 'sheet_name is required', 'articles': []}, status_code=400)
+    try:
+        articles = await run_in_threadpool(database.get_articles_by_sheet, sheet_name)
+        return {'articles': articles}
+    except Exception as e:
+        logger.error(f'Error getting articles: {str(e)}')
+        return JSONResponse({'error': str(e), 'articles': []}, status_code=500)
+
+@app.get('/api/laws/paragraphs')
+async def get_paragraphs(sheet_name: Optional[str] = None, article_num: Optional[str] = None):
+    """항 목록 조회"""
+    if not sheet_name or not article_num:
+        return JSONResponse({'error': 'sheet_name and article_num are required', 'paragraphs': []}, status_code=400)
+    try:
+        paragraphs = await run_in_threadpool(database.get_paragraphs_by_article, sheet_name, article_num)
+        return {'paragraphs': paragraphs}
+    except Exception as e:
+        logger.error(f'Error getting paragraphs: {str(e)}')
+        return JSONResponse({'error': str(e), 'paragraphs': []}, status_code=500)
+
+def law_tree_page_response(build_page):
+    """트리 인덱스 페이지 조회 결과를 공통 형식으로 변환 (잘못된 파라미터 400, 만료된 커서 409)"""
+    try:
+        page = build_page(flask_app.current_data().law_tree_index)
+    except StaleCursorError as e:
+        return JSONResponse({'success': False, 'error': str(e)}, status_code=409)
+    except TreeQueryError as e:
+        return JSONResponse({'success': False, 'error': str(e)}, status_code=400)
+    if page is None:
+        return JSONResponse({'success': False, 'error': 'Not found'}, status_code=404)
+    return {'success': True, **page}
+
+@app.get('/api/laws/tree/sheets')
+async def get_law_tree_sheets(limit: Optional[str] = None, cursor: Optional[str] = None,
+                              fields: Optional[str] = None):
+    """지침 요약 목록 (지침명, 조 수, 항 수)"""
+    return law_tree_page_response(lambda index: index.sheets(limit, cursor, fields))
+
+@app.get('/api/laws/tree/articles')
+async def get_law_tree_articles(sheet_name: Optional[str] = None, limit: Optional[str] = None,
+                                cursor: Optional[str] = None, fields: Optional[str] = None):
+    """지침의 조 목록 (조 키, 조 번호, 제목, 항 수)"""
+    if not sheet_name:
+        return JSONResponse({'success': False, 'error': 'sheet_name is required'}, status_code=400)
+    return law_tree_page_response(lambda index: index.articles(sheet_name, limit, cursor, fields))
+
+@app.get('/api/laws/tree/paragraphs')
+async def get_law_tree_paragraphs(sheet_name: Optional[str] = None, article: Optional[str] = None,
+                                  limit: Optional[str] = None, cursor: Optional[str] = None,
+                                  fields: Optional[str] = None):
+    """조의 항 목록 (article은 '제35조' 또는 '35')"""
+    if not sheet_name or not article:
+        return JSONResponse({'success': False, 'error': 'sheet_name and article are required'}, status_code=400)
+    return law_tree_page_response(lambda index: index.paragraphs(sheet_name, article, limit, cursor, fields))
+
+# ========================================
+# 통계 API
+# ========================================
+
+@app.get('/api/generation/stats')
+async def get_generation_stats():
+    """생성 모드별 토큰 사용량 및 지연시간 통계"""
+    return {'mode': flask_app.GENERATION_MODE, 'modes': flask_app.generation_metrics.snapshot()}
+
+@app.get('/api/trace/stats')
+async def get_trace_stats():
+    """/api/chat 단계별(span 이름별) 지연시간 히스토그램"""
+    return {'stages': flask_app.stage_histograms.snapshot()}
+
+@app.get('/metrics')
+async def get_metrics():
+    """Prometheus 텍스트 형식 메트릭 (app.py와 같은 레지스트리)"""
+    body = await run_in_threadpool(metrics.REGISTRY.render)  # SQLite 세션 저장소는 조회 쿼리 실행
+    return Response(body, media_type=metrics.CONTENT_TYPE)
+
+@app.get('/api/sessions/stats')
+async def get_session_stats():
+    """채팅 세션 저장소 통계"""
+    return await run_in_threadpool(flask_app.chat_sessions.stats)
+
+@app.get('/api/dify/stats')
+async def get_dify_stats():
+    """비동기 Dify 클라이언트 서킷 브레이커 상태, 호출/재시도 횟수, 지연시간 p50/p95"""
+    return async_dify_client.stats()
+
+@app.get('/api/cache/stats')
+async def get_response_cache_stats():
+    """응답 캐시 항목 수와 적중/실패 카운터"""
+    return {'enabled': flask_app.RESPONSE_CACHE_ENABLED, **flask_app.response_cache.stats()}
+
+@app.get('/api/db/pool-stats')
+async def get_db_pool_stats():
+    """SQLite 커넥션 풀 통계 (연결 생성/재사용 횟수)"""
+    return database.get_pool_stats()
+
+if __name__ == '__main__':
+    import uvicorn
+
+    uvicorn.run(
+        'asgi_app:app',
+        host=os.getenv('ASGI_HOST', '127.0.0.1'),
+        port=int(os.getenv('ASGI_PORT', '8000')),
+        workers=int(os.getenv('ASGI_WORKERS', '1'))
+    )
@@ -0,0 +1,213 @@
+"""
+법령 JSON 내보내기(export_law_data.py) 벤치마크
+- 기존 방식: 항번호 채우기를 df.iterrows() 루프로, 호/항내용 중복 확인을 누적 문자열 부분 검색으로 처리
+- 현재 방식: 조 단위 그룹 ffill(벡터화) + 항별 줄 목록/집합으로 중복 확인 후 1회 join
+
+실행: uv run python bench_export_law_data.py [--rows 2000 20000 100000] [--hos 5 500 5000] [--xlsx data/law.xlsx]
+(합성 데이터로 규모별 시간을 비교하고, 두 방식의 JSON 출력이 같은지 확인합니다.
+ --xlsx를 주면 실제 파일에서도 generate_js_file()과 같은 형식으로 출력이 동일한지 확인합니다)
+"""
+import argparse
+import json
+import random
+import time
+
+import pandas as pd
+
+import export_law_data as exporter
+from export_law_data import (convert_paragraph_num_to_circle, extract_number_for_sort, format_ho_number,
+                             normalize_dataframe, process_sheet_with_state_machine, safe_str)
+
+WORDS = ['사업비', '협약', '정산', '연구기관', '교부', '집행', '증빙', '보고', '승인', '변경', '위탁',
+         '재료비', '인건비', '간접비', '평가', '반납', '이자', '회계', '감사', '기한', '서류', '제출']
+
+# ========================================
+# 기존 구현 (비교 기준)
+# ========================================
+
+def legacy_normalize_dataframe(df):
+    df.columns = [str(col).strip() for col in df.columns]
+    for col in ['조번호', '조제목', '항번호', '항내용', '호번호', '호내용']:
+        if col not in df.columns:
+            df[col] = ''
+    df['조번호'] = df['조번호'].ffill()
+    df['조제목'] = df['조제목'].ffill()
+
+    current_para = None
+    para_list = []
+    prev_jo = None
+    for idx, row in df.iterrows():
+        jo = row['조번호']
+        para = row['항번호']
+        if jo != prev_jo:
+            current_para = para if pd.notna(para) and para != '' else None
+        else:
+            if pd.notna(para) and para != '':
+                current_para = para
+        para_list.append(current_para)
+        prev_jo = jo
+    df['항번호_filled'] = para_list
+
+    for col in ['항내용', '호내용', '조제목']:
+        if col in df.columns:
+            df[col] = df[col].fillna('')
+    return df
+
+def legacy_process_sheet(df, sheet_name):
+    result = {}
+    current_article = None
+    current_para_num = None
+    prev_para_content = None
+    articles_data = {}
+
+    for row in df.itertuples(index=False):
+        jo_num = safe_str(getattr(row, '조번호', ''))
+        jo_title = safe_str(getattr(row, '조제목', ''))
+        para_num = getattr(row, '항번호_filled', None)
+        para_content = safe_str(getattr(row, '항내용', ''))
+        ho_num = getattr(row, '호번호', None)
+        ho_content = safe_str(getattr(row, '호내용', ''))
+
+        if jo_num:
+            article_key = f"{jo_num} ({jo_title})" if jo_title else jo_num
+        else:
+            article_key = "일반 조항"
+
+        if article_key != current_article:
+            current_article = article_key
+            current_para_num = None
+            prev_para_content = None
+            if article_key not in articles_data:
+                articles_data[article_key] = {}
+
+        para_num_str = safe_str(para_num) if para_num is not None else ''
+
+        if para_num_str and para_num_str != current_para_num:
+            current_para_num = para_num_str
+            prev_para_content = None
+            circle_num = convert_paragraph_num_to_circle(para_num)
+            if para_content:
+                content = f"{circle_num} {para_content}" if circle_num else para_content
+            else:
+                content = f"{circle_num}" if circle_num else ''
+            if current_para_num not in articles_data[article_key]:
+                articles_data[article_key][current_para_num] = {
+                    'no': circle_num, 'content': content, 'sort_key': extract_number_for_sort(para_num)
+                }
+            prev_para_content = para_content
+
+        elif para_num_str and para_num_str == current_para_num:
+            if ho_num is not None and safe_str(ho_num) and ho_content:
+                ho_text = f"  {format_ho_number(ho_num)} {ho_content}"
+                if current_para_num in articles_data[article_key]:
+                    existing = articles_data[article_key][current_para_num]['content']
+                    if ho_text not in existing:
+                        articles_data[article_key][current_para_num]['content'] = existing + "\n" + ho_text
+            elif para_content and para_content != prev_para_content:
+                if current_para_num in articles_data[article_key]:
+                    existing = articles_data[article_key][current_para_num]['content']
+                    if para_content not in existing:
+                        articles_data[article_key][current_para_num]['content'] = existing + "\n" + para_content
+                prev_para_content = para_content
+
+        elif not para_num_str and (ho_num is not None and safe_str(ho_num)):
+            ho_key = f"_ho_{safe_str(ho_num)}"
+            if ho_key not in articles_data[article_key]:
+                ho_formatted = format_ho_number(ho_num)
+                content = f"{ho_formatted} {ho_content}" if ho_content else ho_formatted
+                articles_data[article_key][ho_key] = {
+                    'no': '', 'content': content, 'sort_key': extract_number_for_sort(ho_num) + 1000
+                }
+
+    for article_key, paras_dict in articles_data.items():
+        if paras_dict:
+            paras_list = list(paras_dict.values())
+            paras_list.sort(key=lambda x: x.get('sort_key', float('inf')))
+            for p in paras_list:
+                p.pop('sort_key', None)
+            paras_list = [p for p in paras_list if p['content'].strip()]
+            if paras_list:
+                result[article_key] = paras_list
+    return result
+
+# ========================================
+# 합성 데이터
+# ========================================
+
+def make_text(rng, words=6):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)) + f' {rng.randrange(10 ** 6)}'
+
+def make_sheet(rng, rows, hos_per_paragraph):
+    """조/항 셀은 병합 셀처럼 첫 행에만, 항내용은 호 행마다 반복되는 엑셀 형태 (+ 호 없는 이어지는 항내용 줄)"""
+    records = []
+    article = 0
+    while len(records) < rows:
+        article += 1
+        first_article_row = True
+        for paragraph in range(1, rng.randint(1, 4) + 1):
+            para_text = make_text(rng)
+            for ho in range(0, rng.randint(0, hos_per_paragraph) + 1):
+                records.append({
+                    '조번호': f'제{article}조' if first_article_row else None,
+                    '조제목': f'제목{article}' if first_article_row else None,
+                    '항번호': float(paragraph) if ho <= 1 else None,
+                    '항내용': para_text,
+                    '호번호': float(ho) if ho else None,
+                    '호내용': make_text(rng, 4) if ho else None,
+                })
+                first_article_row = False
+            # 호 없이 이어지는 항내용 줄: 첫 줄의 일부(이전 방식은 부분 문자열이라 버림) 또는 새 문장
+            if rng.random() < 0.3:
+                continuation = para_text.split(' ', 2)[1] if rng.random() < 0.5 else make_text(rng, 3)
+                records.append({
+                    '조번호': None, '조제목': None, '항번호': None,
+                    '항내용': continuation, '호번호': None, '호내용': None,
+                })
+    return pd.DataFrame(records[:rows])
+
+def run(normalize, process, df):
+    start = time.perf_counter()
+    result = process(normalize(df.copy()), 'bench')
+    return result, time.perf_counter() - start
+
+def compare_xlsx(path):
+    """실제 파일에서 generate_js_file()과 같은 json.dumps 출력 비교"""
+    all_sheets = pd.read_excel(path, sheet_name=None)
+    legacy, current = {}, {}
+    for sheet_name, df in all_sheets.items():
+        for target, normalize, process in ((legacy, legacy_normalize_dataframe, legacy_process_sheet),
+                                           (current, normalize_dataframe, process_sheet_with_state_machine)):
+            sheet_data = process(normalize(df.copy()), sheet_name)
+            if sheet_data:
+                target[sheet_name] = dict(sorted(sheet_data.items(), key=lambda x: extract_number_for_sort(x[0])))
+
+    legacy_json = json.dumps(legacy, ensure_ascii=False, indent=2)
+    current_json = json.dumps(current, ensure_ascii=False, indent=2)
+    assert current == exporter.process_all_sheets(path)
+    print(f"\n{path}: {len(current_json.encode('utf-8')):,} bytes, "
+          f"{'byte-identical' if legacy_json == current_json else 'DIFFERENT'}")
+
+def main():
+    parser = argparse.ArgumentParser(description='법령 JSON 내보내기 벤치마크')
+    parser.add_argument('--rows', type=int, nargs='+', default=[2000, 20000, 100000])
+    parser.add_argument('--hos', type=int, nargs='+', default=[5, 500, 5000], help='항당 최대 호 수')
+    parser.add_argument('--xlsx', default=None, help='출력 동일성을 확인할 실제 law.xlsx 경로')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'rows':>8} | {'hos':>5} | {'legacy s':>9} | {'current s':>9} | {'speedup':>7} | same")
+    print('-' * 60)
+    for rows in args.rows:
+        for hos in args.hos:
+            df = make_sheet(rng, rows, hos)
+            legacy, legacy_time = run(legacy_normalize_dataframe, legacy_process_sheet, df)
+            current, current_time = run(normalize_dataframe, process_sheet_with_state_machine, df)
+            print(f'{rows:>8} | {hos:>5} | {legacy_time:>9.3f} | {current_time:>9.3f} | '
+                  f'{legacy_time / current_time:>6.1f}x | {legacy == current}')
+
+    if args.xlsx:
+        compare_xlsx(args.xlsx)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+로컬 FAQ 매칭 마이크로 벤치마크
+- 기존 방식: FAQ마다 질문을 매번 split()해 공백 토큰 자카드 계산 (행 단위 루프)
+- FaqNgramMatcher: 문자 2-gram 역색인 + np.bincount 일괄 계산
+- FaqVectorIndex: n-gram TF-IDF 코사인 + 어휘 hybrid
+
+실행: uv run python bench_faq_matcher.py [--sizes 100 1000 10000 50000] [--queries 200]
+(실제 FAQ 대신 합성 FAQ를 사용하므로 규모에 따른 지연 변화 비교용입니다)
+"""
+import argparse
+import random
+import time
+
+from faq_index import FaqNgramMatcher, FaqVectorIndex
+
+WORDS = ['협약', '체결', '사업비', '정산', '연구장비', '구입', '과제', '변경', '신청', '절차', '인건비',
+         '계상', '기준', '간접비', '비율', '집행', '증빙', '서류', '제출', '기한', '연구기관', '참여연구원',
+         '위탁', '재료비', '회의비', '출장비', '반납', '이자', '수익', '평가', '중간보고', '최종보고']
+PARTICLES = ['', '은', '는', '을', '를', '의', '에', '시', '에서']
+ENDINGS = ['무엇인가요?', '어떻게 하나요?', '가능한가요?', '알려주세요', '궁금합니다', '언제까지인가요?']
+
+def make_question(rng):
+    words = [rng.choice(WORDS) + rng.choice(PARTICLES) for _ in range(rng.randint(3, 6))]
+    return ' '.join(words + [rng.choice(ENDINGS)])
+
+def legacy_search(faqs, user_message, threshold=0.6):
+    """기존 search_faq_local 알고리즘 (DataFrame.iterrows 오버헤드는 제외한 하한)"""
+    user_keywords = set(user_message.replace('?', '').replace('？', '').split())
+    best_match, best_score = None, 0
+    for faq in faqs:
+        faq_question = faq['question']
+        faq_keywords = set(faq_question.replace('?', '').replace('？', '').split())
+        if len(user_keywords | faq_keywords) > 0:
+            score = len(user_keywords & faq_keywords) / len(user_keywords | faq_keywords)
+            if user_message.strip() == faq_question.strip():
+                score = 1.0
+            if score > best_score:
+                best_score = score
+                best_match = {'faq_id': faq['faq_id'], 'score': score, 'question': faq_question}
+    return best_match if best_match and best_score >= threshold else None
+
+def time_per_query(func, queries):
+    start = time.perf_counter()
+    for query in queries:
+        func(query)
+    return (time.perf_counter() - start) / len(queries) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description='로컬 FAQ 매칭 벤치마크')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000, 50000])
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'FAQs':>8} | {'legacy ms':>10} | {'ngram build s':>13} | {'ngram ms':>9} | "
+          f"{'vector build s':>14} | {'vector ms':>9}")
+    print('-' * 80)
+
+    for size in args.sizes:
+        faqs = [{'faq_id': f'FAQ-{i:05d}', 'question': make_question(rng), 'answer_text': ''}
+                for i in range(size)]
+        queries = [make_question(rng) for _ in range(args.queries)]
+
+        start = time.perf_counter()
+        matcher = FaqNgramMatcher(faqs)
+        ngram_build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        vector_index = FaqVectorIndex(faqs)
+        vector_build = time.perf_counter() - start
+
+        legacy_ms = time_per_query(lambda q: legacy_search(faqs, q), queries)
+        ngram_ms = time_per_query(lambda q: matcher.search(q, top_k=5), queries)
+        vector_ms = time_per_query(lambda q: vector_index.search(q, top_k=5), queries)
+
+        print(f'{size:>8} | {legacy_ms:>10.3f} | {ngram_build:>13.3f} | {ngram_ms:>9.3f} | '
+              f'{vector_build:>14.3f} | {vector_ms:>9.3f}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,239 @@
+"""
+채팅 서버 부하 테스트: Flask(app.py, 스레드) vs FastAPI(asgi_app.py, asyncio)
+
+- OpenAI/Dify 대신 고정 지연시간으로 응답하는 모의 upstream 서버를 띄우고,
+  두 서버를 같은 환경 변수(OPENAI_BASE_URL, DIFY_API_URL)로 실행해 같은 조건에서 비교
+- 응답 캐시는 끄고(RESPONSE_CACHE_ENABLED=false) 질문마다 번호를 붙여 매 요청이 검색 + LLM 호출을 거치게 함
+- 동시 요청 수별 처리량(req/s), 지연시간 p50/p95/p99, 오류 수 출력
+
+실행: uv run python bench_load.py [--endpoint chat|confirm|sheets] [--concurrency 1 16 64 128]
+                                  [--requests 400] [--llm-latency 0.8] [--dify-latency 0.2]
+     실행 중인 서버를 측정하려면: --target flask=http://127.0.0.1:5000 --target asgi=http://127.0.0.1:8000
+     (이 경우 두 서버의 OPENAI_BASE_URL/DIFY_API_URL은 직접 설정)
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+QUESTION = '연구개발비 정산 시 증빙서류는 무엇이 필요한가요?'
+
+# ========================================
+# 모의 OpenAI / Dify 서버
+# ========================================
+
+def build_mock_upstream(llm_latency, dify_latency):
+    from fastapi import FastAPI, Request
+
+    mock = FastAPI()
+
+    @mock.post('/v1/chat/completions')
+    async def chat_completions(request: Request):
+        body = await request.json()
+        await asyncio.sleep(llm_latency)
+        if (body.get('response_format') or {}).get('type') == 'json_object':
+            content = json.dumps({'message': '모의 답변입니다.', 'suggested_answer': '<p>모의 답변</p>'},
+                                 ensure_ascii=False)
+        else:
+            content = '모의 답변입니다.'
+        return {
+            'id': 'chatcmpl-bench',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model', 'gpt-4o-mini'),
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': 100, 'completion_tokens': 20, 'total_tokens': 120}
+        }
+
+    @mock.post('/v1/datasets/{dataset_id}/retrieve')
+    async def retrieve(dataset_id: str, request: Request):
+        body = await request.json()
+        await asyncio.sleep(dify_latency)
+        return {
+            'query': {'content': body.get('query', '')},
+            'records': [{
+                'segment': {'content': '모의 FAQ 문서 내용', 'document': {'name': 'bench'}},
+                'score': 0.7
+            }]
+        }
+
+    return mock
+
+def serve_mock_upstream(port, llm_latency, dify_latency):
+    import uvicorn
+    uvicorn.run(build_mock_upstream(llm_latency, dify_latency), host='127.0.0.1', port=port, log_level='warning')
+
+# ========================================
+# 서버 실행
+# ========================================
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def spawn(command, env):
+    return subprocess.Popen(command, cwd=PROJECT_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+def wait_ready(url, process, timeout=120.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'server exited with code {process.returncode}: {url}')
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f'server not ready after {timeout}s: {url}')
+
+def start_servers(args):
+    """모의 upstream + Flask + ASGI 서버 실행, ({이름: URL}, [프로세스]) 반환"""
+    mock_port, flask_port, asgi_port = free_port(), free_port(), free_port()
+    env = dict(os.environ)
+    env.update({
+        'OPENAI_API_KEY': 'bench',
+        'OPENAI_BASE_URL': f'http://127.0.0.1:{mock_port}/v1',
+        'DIFY_API_URL': f'http://127.0.0.1:{mock_port}/v1',
+        'DIFY_API_KEY': 'bench',
+        'DIFY_DATASET_ID': 'bench',
+        'AI_MODE': 'dify',
+        'RESPONSE_CACHE_ENABLED': 'false',
+        'DATA_RELOAD_INTERVAL': '0',
+        'GENERATION_MODE': args.generation_mode
+    })
+
+    processes = []
+    try:
+        mock = spawn([sys.executable, __file__, '--serve-mock', str(mock_port),
+                      '--llm-latency', str(args.llm_latency), '--dify-latency', str(args.dify_latency)], env)
+        processes.append(mock)
+        wait_ready(f'http://127.0.0.1:{mock_port}/docs', mock)
+
+        flask = spawn([sys.executable, '-c',
+                       f"import app; app.app.run(host='127.0.0.1', port={flask_port}, threaded=True)"], env)
+        asgi = spawn([sys.executable, '-m', 'uvicorn', 'asgi_app:app', '--host', '127.0.0.1',
+                      '--port', str(asgi_port), '--log-level', 'warning'], env)
+        processes += [flask, asgi]
+
+        targets = {'flask': f'http://127.0.0.1:{flask_port}', 'asgi': f'http://127.0.0.1:{asgi_port}'}
+        wait_ready(targets['flask'] + '/api/cache/stats', flask)
+        wait_ready(targets['asgi'] + '/api/cache/stats', asgi)
+        return targets, processes
+    except Exception:
+        stop_servers(processes)
+        raise
+
+def stop_servers(processes):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+# ========================================
+# 부하 생성
+# ========================================
+
+def build_request(endpoint, seq, worker):
+    if endpoint == 'sheets':
+        return 'GET', '/api/laws/sheets', None
+    body = {'message': f'{QUESTION} ({seq})', 'session_id': f'bench-{worker}'}
+    return 'POST', '/api/chat/confirm' if endpoint == 'confirm' else '/api/chat', body
+
+async def run_level(base_url, endpoint, concurrency, total):
+    """동시 요청 concurrency개로 total건 실행, (경과 시간, 지연시간 목록, 오류 수) 반환"""
+    latencies = []
+    errors = 0
+    counter = iter(range(total))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120.0, limits=limits) as client:
+        async def worker(worker_id):
+            nonlocal errors
+            for seq in counter:
+                method, path, body = build_request(endpoint, seq, worker_id)
+                start = time.perf_counter()
+                try:
+                    response = await client.request(method, path, json=body)
+                    ok = response.status_code == 200 and response.json().get('success', True)
+                except (httpx.HTTPError, ValueError):
+                    ok = False
+                latencies.append(time.perf_counter() - start)
+                errors += not ok
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        return time.perf_counter() - start, latencies, errors
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+async def run_benchmark(targets, args):
+    results = {}
+    print(f"{'target':>8} | {'conc':>5} | {'req/s':>8} | {'p50 s':>7} | {'p95 s':>7} | {'p99 s':>7} | errors")
+    print('-' * 66)
+    for concurrency in args.concurrency:
+        total = max(args.requests, concurrency)
+        for name, base_url in targets.items():
+            await run_level(base_url, args.endpoint, min(concurrency, 4), min(concurrency, 4))  # 워밍업
+            elapsed, latencies, errors = await run_level(base_url, args.endpoint, concurrency, total)
+            throughput = len(latencies) / elapsed
+            results[(name, concurrency)] = throughput
+            print(f'{name:>8} | {concurrency:>5} | {throughput:>8.1f} | {percentile(latencies, 50):>7.3f} | '
+                  f'{percentile(latencies, 95):>7.3f} | {percentile(latencies, 99):>7.3f} | {errors}')
+
+    if {'flask', 'asgi'} <= set(targets):
+        print('\nasgi / flask throughput: ' + ', '.join(
+            f"c={concurrency} {results[('asgi', concurrency)] / results[('flask', concurrency)]:.2f}x"
+            for concurrency in args.concurrency
+        ))
+
+def parse_target(value):
+    name, sep, url = value.partition('=')
+    if not sep:
+        raise argparse.ArgumentTypeError('target must be name=url')
+    return name, url.rstrip('/')
+
+def main():
+    parser = argparse.ArgumentParser(description='Flask vs ASGI 채팅 서버 부하 테스트')
+    parser.add_argument('--endpoint', choices=['chat', 'confirm', 'sheets'], default='chat')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 16, 64, 128])
+    parser.add_argument('--requests', type=int, default=400, help='동시 요청 수 단계별 요청 수')
+    parser.add_argument('--llm-latency', type=float, default=0.8, help='모의 OpenAI 응답 지연(초)')
+    parser.add_argument('--dify-latency', type=float, default=0.2, help='모의 Dify 응답 지연(초)')
+    parser.add_argument('--generation-mode', default='sequential', help='두 서버의 GENERATION_MODE')
+    parser.add_argument('--target', type=parse_target, action='append', default=None,
+                        help='이미 실행 중인 서버 (name=url, 여러 번 지정 가능)')
+    parser.add_argument('--serve-mock', type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_mock:
+        serve_mock_upstream(args.serve_mock, args.llm_latency, args.dify_latency)
+        return
+
+    if args.target:
+        asyncio.run(run_benchmark(dict(args.target), args))
+        return
+
+    targets, processes = start_servers(args)
+    try:
+        print(f'mock upstream: llm={args.llm_latency}s, dify={args.dify_latency}s, '
+              f'endpoint=/api/{args.endpoint}, generation={args.generation_mode}\n')
+        asyncio.run(run_benchmark(targets, args))
+    finally:
+        stop_servers(processes)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+로깅 설정별 요청당 오버헤드 측정 (app.py의 setup_logging)
+
+- 모드별로 새 프로세스에서 app을 불러와 같은 요청을 반복하고 비교
+  · 요청 스레드 CPU 시간 평균 (로깅이 요청 처리 경로에 더하는 비용, 대기 시간과 리스너 스레드 제외)
+  · 요청 처리 시간 p99 (대기 시간 제외, 리스너와 CPU를 나눠 쓰는 영향 포함)
+  · 요청당 프로세스 CPU 시간 (리스너 스레드가 큐를 모두 기록할 때까지 포함한 전체 비용)
+  off        : 로깅 비활성화 (기준값)
+  sync-text  : LOG_QUEUE=false, 요청 스레드에서 파일/콘솔에 직접 기록 (이전 방식)
+  queue-text : LOG_QUEUE=true, 큐에 넣고 백그라운드 리스너가 기록
+  sync-json / queue-json : LOG_FORMAT=json
+- 요청마다 /api/chat 처리와 비슷한 수의 INFO 로그(--lines)를 남기는 측정용 라우트를 추가해 사용
+  (검색 없이 로깅 비용만 측정, 본문은 JSON POST로 log_request_info 경로 포함)
+- --io-wait: 요청 중간의 upstream(OpenAI/Dify) 대기 시간 흉내 (sleep, 실제 채팅 요청은 대부분 대기 시간)
+  0이면 CPU를 쉬지 않고 쓰므로 큐 모드의 리스너가 요청 스레드와 CPU를 나눠 씀
+- 로그 파일은 임시 디렉터리(LOG_DIR)에 기록, 콘솔 출력은 버림
+
+실행: uv run python bench_logging.py [--requests 1000] [--lines 30] [--io-wait 0.01] [--modes off sync-text ...]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = {
+    'off': {},
+    'sync-text': {'LOG_QUEUE': 'false', 'LOG_FORMAT': 'text'},
+    'queue-text': {'LOG_QUEUE': 'true', 'LOG_FORMAT': 'text'},
+    'sync-json': {'LOG_QUEUE': 'false', 'LOG_FORMAT': 'json'},
+    'queue-json': {'LOG_QUEUE': 'true', 'LOG_FORMAT': 'json'}
+}
+
+def run_child(mode, requests, lines, io_wait):
+    """측정 프로세스 본문: 결과를 JSON 한 줄로 stdout에 출력"""
+    import logging
+
+    import app as chat_app
+
+    if mode == 'off':
+        logging.disable(logging.CRITICAL)
+
+    @chat_app.app.route('/__bench/log', methods=['POST'])
+    def bench_log():
+        data = chat_app.request.get_json()
+        for idx in range(lines):
+            chat_app.app.logger.info('[Bench] step %d for session %s: %s', idx, data['session_id'], data['message'][:50])
+            chat_app.app.logger.debug('[Bench] detail %d: %s', idx, data)
+            if idx == lines // 2 and io_wait:
+                time.sleep(io_wait)
+        chat_app.api_logger.info('Session %s - User message: %s', data['session_id'], data['message'])
+        return chat_app.jsonify({'success': True})
+
+    client = chat_app.app.test_client()
+    body = {'message': '연구개발비 정산 시 증빙서류는 무엇이 필요한가요?', 'session_id': 'bench'}
+    for _ in range(min(100, requests)):  # 워밍업
+        client.post('/__bench/log', json=body)
+
+    queue_handler = chat_app.log_queue_handler
+    samples = []
+    thread_cpu = 0.0
+    cpu_start = time.process_time()
+    for _ in range(requests):
+        start, thread_start = time.perf_counter(), time.thread_time()
+        client.post('/__bench/log', json=body)
+        thread_cpu += time.thread_time() - thread_start
+        samples.append(time.perf_counter() - start)
+    backlog = queue_handler.queue.qsize() if queue_handler else 0
+    while queue_handler and queue_handler.queue.qsize():
+        time.sleep(0.01)  # 리스너가 남은 레코드를 모두 기록할 때까지
+    cpu_per_request = (time.process_time() - cpu_start) / requests
+
+    samples.sort()
+    print(json.dumps({
+        'request_cpu_us': thread_cpu / requests * 1e6,
+        'p99_us': (samples[min(len(samples) - 1, int(0.99 * len(samples)))] - io_wait) * 1e6,
+        'cpu_us': cpu_per_request * 1e6,
+        'backlog': backlog,
+        'dropped': queue_handler.dropped if queue_handler else 0
+    }))
+
+def run_mode(mode, args, log_dir):
+    env = dict(os.environ, LOG_DIR=os.path.join(log_dir, mode), DATA_RELOAD_INTERVAL='0',
+               OPENAI_API_KEY=os.getenv('OPENAI_API_KEY', 'bench'), **MODES[mode])
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', mode,
+         '--requests', str(args.requests), '--lines', str(args.lines), '--io-wait', str(args.io_wait)],
+        cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description='로깅 설정별 요청당 오버헤드 측정')
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--lines', type=int, default=30, help='요청당 INFO 로그 줄 수')
+    parser.add_argument('--io-wait', type=float, default=0.01, help='요청당 upstream 대기 흉내(초)')
+    parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES))
+    parser.add_argument('--child', choices=list(MODES), default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.requests, args.lines, args.io_wait)
+        return
+
+    with tempfile.TemporaryDirectory() as log_dir:
+        results = {mode: run_mode(mode, args, log_dir) for mode in args.modes}
+
+    baseline = results.get('off')
+    print(f'{args.requests} requests, {args.lines} INFO lines/request, io-wait {args.io_wait * 1000:g}ms '
+          f'(excluded from latency)\n')
+    print(f"{'mode':>11} | {'req cpu us':>10} | {'+req cpu':>8} | {'p99 us':>8} | {'total cpu':>9} | "
+          f"{'+total':>8} | backlog | dropped")
+    print('-' * 91)
+    for mode, result in results.items():
+        extra_request = f"{result['request_cpu_us'] - baseline['request_cpu_us']:>8.1f}" if baseline else f"{'-':>8}"
+        extra_total = f"{result['cpu_us'] - baseline['cpu_us']:>8.1f}" if baseline else f"{'-':>8}"
+        print(f"{mode:>11} | {result['request_cpu_us']:>10.1f} | {extra_request} | {result['p99_us']:>8.1f} | "
+              f"{result['cpu_us']:>9.1f} | {extra_total} | {result['backlog']:>7} | {result['dropped']}")
+
+if __name__ == '__main__':
+    main()
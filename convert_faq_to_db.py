@@ -1,51 +1,39 @@
 """
-faq_topic.xlsx를 SQLite DB로 변환하는 스크립트
+faq_topic.xlsx를 SQLite DB에 증분 적재하는 스크립트
+- faq_id 기준으로 바뀐 행만 INSERT/UPDATE/DELETE (스키마, 인덱스 유지)
 실행: uv run python convert_faq_to_db.py
 """
-import pandas as pd
 import sqlite3
 
-# 1. faq_topic.xlsx 읽기
-df = pd.read_excel('data/faq_topic.xlsx', engine='openpyxl')
+import database
+import ingest
 
-print(f'총 {len(df)}개 FAQ 발견')
+# 1. faq_topic.xlsx (첫 Sheet를 행 단위로 스트리밍)
+excel_file = 'data/faq_topic.xlsx'
+first_sheet = ingest.excel_sheet_names(excel_file)[:1]
 
 # 2. SQLite DB 연결
 conn = sqlite3.connect('data/chatbot.db')
+database.enable_wal(conn)  # 서버의 읽기 전용 풀 연결과 동시 접근 허용
 
-# 3. faqs 테이블 생성
-cursor = conn.cursor()
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS faqs (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    faq_id TEXT UNIQUE NOT NULL,
-    question TEXT NOT NULL,
-    answer_text TEXT NOT NULL,
-    policy_anchor TEXT,
-    tag TEXT,
-    last_reviewed_at DATE,
-    source TEXT
+# 3. faqs 테이블 증분 동기화 (tags 컬럼은 tag로, 날짜는 문자열로 정리)
+report = ingest.sync_table(
+    conn, ingest.FAQS,
+    (ingest.normalize_row(ingest.FAQS, raw) for _, raw in ingest.iter_excel_rows(excel_file, first_sheet))
 )
-''')
 
-# 4. 데이터 삽입
-# 날짜 컬럼 문자열 변환
-if 'last_reviewed_at' in df.columns:
-    df['last_reviewed_at'] = df['last_reviewed_at'].astype(str)
-
-# 컬럼 이름이 다를 수 있으니 확인
-if 'tags' in df.columns:
-    df.rename(columns={'tags': 'tag'}, inplace=True)
-
-df.to_sql('faqs', conn, if_exists='replace', index=False)
-
-# 5. 인덱스 생성
-cursor.execute('CREATE INDEX IF NOT EXISTS idx_faq_question ON faqs(question)')
-cursor.execute('CREATE INDEX IF NOT EXISTS idx_policy_anchor ON faqs(policy_anchor)')
+# 4. policy_anchor → 법령 연결 (laws 테이블이 있을 때)
+links_report = None
+if (ingest.has_changes(report) or not database.has_faq_law_links(conn)) and database.table_exists(conn, 'laws'):
+    print('FAQ 법령 연결 계산 중...')
+    links_report = database.build_faq_law_links(conn)
 
 conn.commit()
 conn.close()
 
-print(f"[SUCCESS] 변환 완료!")
-print(f"   - 총 {len(df)}개 FAQ")
+print(f"[SUCCESS] 적재 완료!")
+print(f"   - 총 {report['inserted'] + report['updated'] + report['unchanged']}개 FAQ")
+ingest.print_sync_report(report)
+if links_report:
+    database.print_faq_law_links_report(links_report)
 print(f"   - 저장 위치: data/chatbot.db")
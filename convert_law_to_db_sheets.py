@@ -1,98 +1,58 @@
 """
-law.xlsx의 모든 Sheet를 SQLite DB로 변환
+law.xlsx의 모든 Sheet를 SQLite DB에 증분 적재
 총 14개 Sheet, 1,063개 법령 조항
+- openpyxl read_only 모드로 행 단위 스트리밍 (통합문서 크기와 관계없이 메모리 일정)
+- law_id 기준으로 바뀐 행만 INSERT/UPDATE/DELETE (스키마, 인덱스, FTS 트리거 유지)
 실행: uv run python convert_law_to_db_sheets.py
 """
-import pandas as pd
 import sqlite3
 
-# 1. law.xlsx의 모든 Sheet 읽기
+import database
+import ingest
+
+# 1. law.xlsx의 모든 Sheet 확인
 excel_file = 'data/law.xlsx'
-sheets = pd.ExcelFile(excel_file, engine='openpyxl')
+sheet_names = ingest.excel_sheet_names(excel_file)
 
-print(f'총 {len(sheets.sheet_names)}개 Sheet 발견:')
-for i, sheet in enumerate(sheets.sheet_names, 1):
+print(f'총 {len(sheet_names)}개 Sheet 발견:')
+for i, sheet in enumerate(sheet_names, 1):
     print(f'  {i}. {sheet}')
 
-# 2. SQLite DB 연결 (파일 자동 생성)
-conn = sqlite3.connect('data/chatbot.db')
-
-# 3. laws 테이블 생성 (⭐ sheet_name 컬럼 추가!)
-cursor = conn.cursor()
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS laws (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    law_id TEXT UNIQUE NOT NULL,
-    law_title TEXT NOT NULL,
-    sheet_name TEXT NOT NULL,              -- ⭐ Sheet 이름 (1단계: 지침 그룹)
-    chapter_num TEXT,
-    chapter_title TEXT,
-    article_num TEXT,                      -- 2단계: 조번호
-    article_title TEXT,
-    paragraph_num REAL,                    -- 3단계: 항번호
-    paragraph_content TEXT,
-    clause_num REAL,
-    clause_content TEXT,
-    item_num TEXT,
-    item_content TEXT,
-    full_text TEXT NOT NULL,
-    first_effective_date DATE,
-    amendment_date DATE,
-    is_active BOOLEAN DEFAULT 1,
-    tags TEXT
-)
-''')
-
-# 4. 모든 Sheet 데이터 삽입
-all_data = []
-for sheet_name in sheets.sheet_names:
-    print(f'읽는 중: {sheet_name}...')
-    df = pd.read_excel(excel_file, sheet_name=sheet_name, engine='openpyxl')
+sheet_counts = {}
+sheet_order = {sheet: index for index, sheet in enumerate(sheet_names)}
 
-    # sheet_name 컬럼 추가
-    df['sheet_name'] = sheet_name
+def iter_law_rows():
+    """law.xlsx를 행 단위로 스트리밍해 laws 컬럼으로 정리 (sheet_name, 원본 순서 컬럼 추가)"""
+    for sheet_name, raw in ingest.iter_excel_rows(excel_file, sheet_names):
+        if sheet_name not in sheet_counts:
+            print(f'읽는 중: {sheet_name}...')
+            sheet_counts[sheet_name] = 0
+        row_order = sheet_counts[sheet_name]
+        sheet_counts[sheet_name] += 1
+        yield ingest.normalize_row(ingest.LAWS, raw, sheet_name=sheet_name,
+                                   sheet_order=sheet_order[sheet_name], row_order=row_order)
 
-    # 컬럼 매핑
-    df.rename(columns={
-        '장번호': 'chapter_num',
-        '장제목': 'chapter_title',
-        '조번호': 'article_num',
-        '조제목': 'article_title',
-        '항번호': 'paragraph_num',
-        '항내용': 'paragraph_content',
-        '호번호': 'clause_num',
-        '호내용': 'clause_content',
-        '목번호': 'item_num',
-        '목내용': 'item_content',
-        '최초시행일': 'first_effective_date',
-        '개정일': 'amendment_date',
-    }, inplace=True)
-
-    all_data.append(df)
-    print(f'   → {len(df)}개 법령 조항')
-
-# 6. 전체 데이터 병합 후 DB 삽입
-final_df = pd.concat(all_data, ignore_index=True)
-
-# ⭐ 날짜 컬럼을 문자열로 변환 (SQLite 호환성)
-if 'first_effective_date' in final_df.columns:
-    final_df['first_effective_date'] = final_df['first_effective_date'].astype(str)
-if 'amendment_date' in final_df.columns:
-    final_df['amendment_date'] = final_df['amendment_date'].astype(str)
+# 2. SQLite DB 연결 (파일 자동 생성)
+conn = sqlite3.connect('data/chatbot.db')
+database.enable_wal(conn)  # 서버의 읽기 전용 풀 연결과 동시 접근 허용
 
-final_df.to_sql('laws', conn, if_exists='replace', index=False)
+# 3. laws 테이블 증분 동기화 (읽으면서 배치 단위 executemany, 한 트랜잭션)
+report = ingest.sync_table(conn, ingest.LAWS, iter_law_rows())
 
-# 7. 인덱스 생성 (데이터 삽입 후)
-print('\n인덱스 생성 중...')
-cursor.execute('CREATE INDEX IF NOT EXISTS idx_sheet_name ON laws(sheet_name)')
-cursor.execute('CREATE INDEX IF NOT EXISTS idx_law_title ON laws(law_title)')
-cursor.execute('CREATE INDEX IF NOT EXISTS idx_article_num ON laws(article_num)')
-cursor.execute('CREATE INDEX IF NOT EXISTS idx_tags ON laws(tag)')  # tag 컬럼 사용
+# 4. FAQ policy_anchor → 법령 연결 재계산 (law_id가 바뀌었을 수 있으므로)
+links_report = None
+if (ingest.has_changes(report) or not database.has_faq_law_links(conn)) and database.table_exists(conn, 'faqs'):
+    print('FAQ 법령 연결 재계산 중...')
+    links_report = database.build_faq_law_links(conn)
 
 conn.commit()
 conn.close()
 
-print(f"\n[SUCCESS] 변환 완료!")
-print(f"   - 총 {len(sheets.sheet_names)}개 Sheet")
-print(f"   - 총 {len(final_df)}개 법령 조항")
+print(f"\n[SUCCESS] 적재 완료!")
+print(f"   - 총 {len(sheet_names)}개 Sheet, {sum(sheet_counts.values())}개 행")
+for sheet_name, count in sheet_counts.items():
+    print(f"     · {sheet_name}: {count}개")
+ingest.print_sync_report(report)
+if links_report:
+    database.print_faq_law_links_report(links_report)
 print(f"   - 저장 위치: data/chatbot.db")
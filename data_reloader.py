@@ -0,0 +1,190 @@
+"""
+참조 데이터 핫 리로드 (프로세스 재시작 없이 법령 트리/FAQ 인덱스 교체)
+
+- 원본 파일(chatbot.db, faq_topic.xlsx 등)의 수정시각/크기를 주기적으로 확인
+- 변경이 감지되면 다음 확인 때까지 값이 그대로인지 기다린 뒤(쓰기 중 재적재 방지)
+  내용 해시가 실제로 바뀐 경우에만 재적재
+- 백그라운드 스레드에서 새 스냅샷을 만든 뒤 참조 1개를 교체 (요청은 항상 완성된 스냅샷만 봄)
+- 재적재 실패 시 기존 스냅샷 유지
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+def _stat(path: str):
+    try:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+    except OSError:
+        return None
+
+def _content_hash(path: str) -> Optional[str]:
+    try:
+        digest = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+    except OSError:
+        return None
+
+class DataReloader:
+    """
+    스냅샷 빌드 + 원자적 교체 + 파일 변경 감시
+
+    Args:
+        build: 버전 번호를 받아 새 스냅샷을 만드는 함수 (예외 발생 시 교체하지 않음)
+        watch_paths: 변경을 감시할 파일 경로
+        interval: 파일 확인 주기(초), 0 이하이면 감시하지 않음 (수동 재적재만)
+        on_swap: 스냅샷 교체 직후 호출할 함수 (캐시 무효화 등)
+        logger: 재적재 로그를 남길 로거 (기본: 모듈 로거)
+    """
+
+    def __init__(self, build: Callable[[int], Any], watch_paths: List[str], interval: float = 10.0,
+                 on_swap: Optional[Callable[[Any], None]] = None, logger: Optional[logging.Logger] = None):
+        self.build = build
+        self.watch_paths = list(watch_paths)
+        self.interval = interval
+        self.on_swap = on_swap
+        self.logger = logger or logging.getLogger(__name__)
+
+        self._current = None
+        self._version = 0
+        self._reload_lock = threading.Lock()
+        self._reloading = False
+        self._watch_thread = None
+        self._stop = threading.Event()
+
+        self._seen_stats = self._stats()
+        self._pending_stats = None
+        self._built_hashes = {}
+        self._reload_count = 0
+        self._failure_count = 0
+        self._last_reload = None
+
+    @property
+    def current(self):
+        """현재 스냅샷 (교체는 참조 1개 대입이므로 읽는 쪽은 잠금 불필요)"""
+        return self._current
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def _stats(self) -> Dict[str, Any]:
+        return {path: _stat(path) for path in self.watch_paths}
+
+    def reload(self, reason: str = 'manual') -> Dict:
+        """
+        스냅샷을 다시 만들어 교체 (동기 실행, 이미 재적재 중이면 기다렸다가 실행)
+
+        Returns:
+            dict: 이번 재적재 결과 (status()의 last_reload)
+        """
+        with self._reload_lock:
+            self._reloading = True
+            started_at = datetime.now()
+            start = time.perf_counter()
+            stats = self._stats()
+            hashes = {path: _content_hash(path) for path in self.watch_paths}
+            try:
+                snapshot = self.build(self._version + 1)
+            except Exception as e:
+                self._failure_count += 1
+                self.logger.exception(f'[Reload] Failed to rebuild reference data ({reason})')
+                # 같은 파일 상태로 반복 재시도하지 않음 (파일이 다시 바뀌거나 수동 요청 시 재시도)
+                self._seen_stats = stats
+                self._pending_stats = None
+                result = {'success': False, 'error': str(e)}
+            else:
+                self._current = snapshot
+                self._version += 1
+                self._reload_count += 1
+                self._seen_stats = stats
+                self._pending_stats = None
+                self._built_hashes = hashes
+                if self.on_swap:
+                    self.on_swap(snapshot)
+                result = {'success': True}
+            finally:
+                self._reloading = False
+
+            result.update({
+                'reason': reason,
+                'version': self._version,
+                'started_at': started_at.isoformat(timespec='seconds'),
+                'duration': round(time.perf_counter() - start, 3)
+            })
+            self._last_reload = result
+            self.logger.info(f"[Reload] {reason}: success={result['success']}, version={self._version}, "
+                             f"duration={result['duration']}s")
+            return result
+
+    def trigger(self, reason: str = 'manual') -> bool:
+        """백그라운드 재적재 시작 (이미 재적재 중이면 False)"""
+        if self._reloading or self._reload_lock.locked():
+            return False
+        threading.Thread(target=self.reload, args=(reason,), name='data-reload', daemon=True).start()
+        return True
+
+    def check(self) -> bool:
+        """
+        파일 변경 확인 (감시 스레드에서 주기적으로 호출)
+
+        수정시각/크기가 바뀌면 한 주기 동안 그대로인지 확인하고, 내용 해시가 마지막
+        재적재 때와 다르면 재적재를 시작합니다.
+        """
+        stats = self._stats()
+        if stats == self._seen_stats:
+            self._pending_stats = None
+            return False
+
+        if stats != self._pending_stats:
+            # 아직 쓰는 중일 수 있으므로 다음 주기까지 대기
+            self._pending_stats = stats
+            return False
+
+        changed = [path for path in self.watch_paths if stats[path] != self._seen_stats.get(path)]
+        if all(_content_hash(path) == self._built_hashes.get(path) for path in changed):
+            # 수정시각만 바뀐 경우 (내용 동일)
+            self._seen_stats = stats
+            self._pending_stats = None
+            return False
+
+        return self.trigger(reason='file change: ' + ', '.join(os.path.basename(path) for path in changed))
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception:
+                self.logger.exception('[Reload] File check failed')
+
+    def start(self):
+        """파일 감시 스레드 시작 (interval <= 0이면 시작하지 않음)"""
+        if self.interval <= 0 or self._watch_thread is not None:
+            return
+        self._watch_thread = threading.Thread(target=self._watch, name='data-reload-watch', daemon=True)
+        self._watch_thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self) -> Dict:
+        return {
+            'version': self._version,
+            'reloading': self._reloading,
+            'reload_count': self._reload_count,
+            'failure_count': self._failure_count,
+            'last_reload': self._last_reload,
+            'watch_interval': self.interval,
+            'watching': self._watch_thread is not None,
+            'watched_files': {
+                path: (datetime.fromtimestamp(stat[0] / 1e9).isoformat(timespec='seconds') if stat else None)
+                for path, stat in self._seen_stats.items()
+            }
+        }
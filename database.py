@@ -1,73 +1,326 @@
 """
 SQLite 데이터베이스 연결 및 쿼리 함수
 """
+import functools
+import os
+import re
 import sqlite3
-from typing import List, Dict, Optional
+import threading
+import time
+from typing import Callable, List, Dict, Optional
+
+import metrics
+from request_trace import traced
 
 DB_PATH = 'data/chatbot.db'
 
-def get_db_connection():
-    """DB 연결 반환"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row  # 딕셔너리처럼 사용 가능
-    return conn
+# 조회 함수별 실행 시간 (/metrics, 요청 추적 중이면 sqlite.<함수> span도 기록)
+query_duration = metrics.Histogram(
+    'chatbot_sqlite_query_duration_seconds', 'SQLite query function latency', ('query',))
+
+def timed_query(name: str):
+    """조회 함수를 span + 지연시간 히스토그램으로 측정하는 데코레이터"""
+    def decorator(func):
+        traced_func = traced(f'sqlite.{name}')(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return traced_func(*args, **kwargs)
+            finally:
+                query_duration.observe(time.perf_counter() - start, query=name)
+        return wrapper
+    return decorator
+
+# ========================================
+# 커넥션 풀 (스레드별 읽기 전용 연결 재사용)
+# ========================================
+
+# 연결 생성 시 1회만 적용하는 PRAGMA
+DB_MMAP_SIZE = 256 * 1024 * 1024   # 256MB 메모리 맵 I/O
+DB_CACHE_SIZE = -64 * 1024         # 음수 = KiB 단위 (64MB 페이지 캐시)
+DB_CACHED_STATEMENTS = 256         # 연결별 prepared statement 캐시 크기
+
+class ConnectionPool:
+    """
+    스레드 로컬 SQLite 커넥션 풀
+
+    - 스레드마다 읽기 전용(mode=ro) URI 연결 1개를 만들어 재사용
+    - mmap_size / cache_size / query_only PRAGMA는 연결 생성 시 1회만 적용
+    - sqlite3 모듈의 statement 캐시로 같은 쿼리는 재컴파일 없이 실행
+    - reset() 호출 시 세대(generation)가 바뀌어 각 스레드가 다음 요청에서 재연결
+      (DB 파일 재생성 후 사용)
+    - 인덱스 존재 여부 같은 스키마 조회 결과는 세대별로 캐시 (schema_flag)
+
+    WAL 모드는 DB 파일에 영구 저장되는 설정이므로 쓰기 연결을 가진
+    변환 스크립트에서 enable_wal()로 설정합니다.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._opened = 0
+        self._reused = 0
+        self._schema_flags = (0, {})  # (세대, {이름: 값})
+
+    def _connect(self) -> sqlite3.Connection:
+        uri = f'file:{os.path.abspath(self.db_path)}?mode=ro'
+        conn = sqlite3.connect(uri, uri=True, cached_statements=DB_CACHED_STATEMENTS)
+        conn.row_factory = sqlite3.Row  # 딕셔너리처럼 사용 가능
+        conn.execute(f'PRAGMA mmap_size = {DB_MMAP_SIZE}')
+        conn.execute(f'PRAGMA cache_size = {DB_CACHE_SIZE}')
+        conn.execute('PRAGMA query_only = ON')
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        """현재 스레드의 연결 반환 (없거나 세대가 바뀌었으면 새로 연결)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.generation == self._generation:
+            with self._lock:
+                self._reused += 1
+            return conn
+
+        if conn is not None:
+            conn.close()
+
+        conn = self._connect()
+        self._local.conn = conn
+        self._local.generation = self._generation
+        with self._lock:
+            self._opened += 1
+        return conn
+
+    def owns(self, conn: sqlite3.Connection) -> bool:
+        """conn이 현재 스레드의 현재 세대 풀 연결인지 여부"""
+        return (getattr(self._local, 'conn', None) is conn
+                and self._local.generation == self._generation)
+
+    def schema_flag(self, name: str, probe: Callable[[sqlite3.Connection], bool],
+                    conn: sqlite3.Connection) -> bool:
+        """
+        스키마 조회 결과를 현재 세대 동안 캐시해서 반환
+
+        풀 연결은 읽기 전용이라 세대 안에서는 스키마가 바뀌지 않습니다
+        (DB를 다시 적재하면 reset()으로 세대가 바뀌고 캐시도 비워짐).
+        """
+        with self._lock:
+            generation, flags = self._schema_flags
+            if generation != self._generation:
+                generation, flags = self._generation, {}
+                self._schema_flags = (generation, flags)
+            if name in flags:
+                return flags[name]
+
+        value = probe(conn)
+        with self._lock:
+            # 조회 중 reset()되었으면 이전 세대 값이므로 저장하지 않음
+            if self._schema_flags[0] == generation:
+                flags[name] = value
+        return value
+
+    def reset(self):
+        """모든 스레드의 연결을 다음 acquire() 시점에 재연결하도록 표시"""
+        with self._lock:
+            self._generation += 1
+
+    def stats(self) -> Dict:
+        """연결 생성/재사용 카운터"""
+        with self._lock:
+            total = self._opened + self._reused
+            return {
+                'db_path': self.db_path,
+                'generation': self._generation,
+                'connections_opened': self._opened,
+                'connections_reused': self._reused,
+                'reuse_ratio': round(self._reused / total, 4) if total else 0.0
+            }
+
+_pool = ConnectionPool(DB_PATH)
+
+def get_db_connection() -> sqlite3.Connection:
+    """
+    현재 스레드의 풀링된 읽기 전용 DB 연결 반환
+
+    연결은 같은 스레드 안에서 재사용되므로 호출 측에서 close()하지 않습니다.
+    """
+    return _pool.acquire()
+
+def get_pool_stats() -> Dict:
+    """커넥션 풀 통계 반환"""
+    return _pool.stats()
+
+def reset_connection_pool():
+    """DB 파일 교체 후 풀링된 연결 무효화"""
+    _pool.reset()
+
+def enable_wal(conn: sqlite3.Connection) -> str:
+    """쓰기 연결에서 WAL 저널 모드 설정 (DB 파일에 영구 저장)"""
+    return conn.execute('PRAGMA journal_mode = WAL').fetchone()[0]
 
 # ========================================
 # Sheet 기반 함수 (app.js 3단계 구조 지원)
 # ========================================
 
+# 정렬 키 컬럼 (article_num은 TEXT, paragraph_num은 REAL이므로 정수 정렬 키를 따로 저장)
+LAWS_TREE_INDEX = 'idx_laws_tree_order'
+LAWS_ARTICLE_INDEX = 'idx_laws_article_list'
+SORT_LAST = 1 << 30            # 번호 없는 조/항은 맨 뒤로
+ARTICLE_BRANCH_FACTOR = 1000   # 제35조의2 → 35 * 1000 + 2
+
+_ARTICLE_NUM_PATTERN = re.compile(r'\s*(?:제\s*)?(\d+)(?:\.0+)?\s*(?:조)?\s*(?:의\s*(\d+))?')
+
+def article_sort_key(article_num) -> int:
+    """'35' / '제35조' / '35의2' → 정수 정렬 키 (숫자가 아니면 SORT_LAST)"""
+    if article_num is None:
+        return SORT_LAST
+    match = _ARTICLE_NUM_PATTERN.match(str(article_num))
+    if not match:
+        return SORT_LAST
+    return int(match.group(1)) * ARTICLE_BRANCH_FACTOR + int(match.group(2) or 0)
+
+def paragraph_sort_key(paragraph_num) -> int:
+    """항번호(REAL) → 정수 정렬 키 (없으면 SORT_LAST, 조 본문은 항 뒤)"""
+    try:
+        return int(float(paragraph_num))
+    except (TypeError, ValueError, OverflowError):  # None, NaN, 숫자 아닌 값
+        return SORT_LAST
+
+def build_laws_sort_columns(conn: sqlite3.Connection) -> int:
+    """
+    to_sql로 만든 이전 형식 laws 테이블에 정렬 키 컬럼을 채우고 트리 순서 인덱스 생성
+
+    - article_sort / paragraph_sort: 조/항 번호 정수 정렬 키
+    - sheet_order / row_order: 원본 순서 (to_sql로 한 번에 적재한 테이블은 rowid가 원본 행 순서)
+    - idx_laws_tree_order (sheet_name, article_sort, article_num, paragraph_sort, row_order):
+      항/트리 조회를 정렬 없이 범위 검색 (동순위 항은 원본 행 순서)
+    - idx_laws_article_list (sheet_name, article_sort, article_num, article_title):
+      지침 목록/조 목록 조회를 테이블 접근 없이(covering) 처리
+
+    ingest.sync_table()로 적재한 테이블은 이 컬럼을 적재 시 함께 기록하므로 호출할 필요가 없습니다
+    (증분 적재 후에는 rowid가 원본 순서가 아님).
+
+    Returns:
+        int: 정렬 키를 채운 행 수
+    """
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(laws)')}
+    for column in ('article_sort', 'paragraph_sort', 'sheet_order', 'row_order'):
+        if column not in columns:
+            conn.execute(f'ALTER TABLE laws ADD COLUMN {column} INTEGER')
+
+    rows = conn.execute('SELECT rowid, article_num, paragraph_num, sheet_name FROM laws ORDER BY rowid').fetchall()
+    sheet_order = {}
+    for row in rows:
+        sheet_order.setdefault(row[3], len(sheet_order))
+    conn.executemany(
+        'UPDATE laws SET article_sort = ?, paragraph_sort = ?, sheet_order = ?, row_order = ? WHERE rowid = ?',
+        [(article_sort_key(row[1]), paragraph_sort_key(row[2]), sheet_order[row[3]], row[0], row[0])
+         for row in rows]
+    )
+    conn.execute(f'DROP INDEX IF EXISTS {LAWS_TREE_INDEX}')
+    conn.execute(f'DROP INDEX IF EXISTS {LAWS_ARTICLE_INDEX}')
+    create_laws_tree_indexes(conn)
+    conn.execute('ANALYZE laws')
+    return len(rows)
+
+def create_laws_tree_indexes(conn: sqlite3.Connection):
+    """트리 순서 인덱스 생성 (이미 있으면 유지, 정렬 키/원본 순서 컬럼 필요)"""
+    conn.execute(f'CREATE INDEX IF NOT EXISTS {LAWS_TREE_INDEX} '
+                 f'ON laws(sheet_name, article_sort, article_num, paragraph_sort, row_order)')
+    conn.execute(f'CREATE INDEX IF NOT EXISTS {LAWS_ARTICLE_INDEX} '
+                 f'ON laws(sheet_name, article_sort, article_num, article_title)')
+
+def has_laws_sort_columns(conn: sqlite3.Connection) -> bool:
+    """트리 순서 인덱스(정렬 키/원본 순서 컬럼) 존재 여부 (없으면 이전 방식으로 정렬)"""
+    # row_order가 없는 이전 정의의 인덱스는 변환 스크립트를 다시 실행할 때까지 이전 방식 사용
+    columns = [row[2] for row in conn.execute(f"PRAGMA index_info('{LAWS_TREE_INDEX}')")]
+    return 'row_order' in columns
+
+# 트리 조회 쿼리 (정렬 키 인덱스 사용) - debug_db_connection.py에서 EXPLAIN QUERY PLAN 확인
+SHEET_LIST_QUERY = 'SELECT DISTINCT sheet_name FROM laws ORDER BY sheet_name'
+
+SHEET_ORDER_QUERY = '''
+SELECT sheet_name FROM laws
+WHERE sheet_name IS NOT NULL
+GROUP BY sheet_name
+ORDER BY MIN(sheet_order), sheet_name
+'''
+
+ARTICLES_BY_SHEET_QUERY = '''
+SELECT article_num, MIN(article_title) as article_title
+FROM laws
+WHERE sheet_name = ? AND article_num IS NOT NULL
+GROUP BY article_sort, article_num
+ORDER BY article_sort, article_num
+'''
+
+PARAGRAPHS_BY_ARTICLE_QUERY = '''
+SELECT law_id, paragraph_num, paragraph_content, full_text, article_title
+FROM laws
+WHERE sheet_name = ? AND article_sort = ? AND article_num = ?
+ORDER BY paragraph_sort, row_order
+'''
+
+TREE_ROWS_BY_SHEET_QUERY = '''
+SELECT sheet_name, article_num, article_title, paragraph_num, paragraph_content, full_text, law_id
+FROM laws
+WHERE sheet_name = ? AND article_num IS NOT NULL
+ORDER BY article_sort, article_num, paragraph_sort, row_order
+'''
+
+@timed_query('get_sheet_list')
 def get_sheet_list() -> List[str]:
     """Sheet 목록 조회 (1단계: 지침)"""
     conn = get_db_connection()
     cursor = conn.cursor()
 
-    cursor.execute('SELECT DISTINCT sheet_name FROM laws ORDER BY sheet_name')
+    cursor.execute(SHEET_LIST_QUERY)
     sheets = [row['sheet_name'] for row in cursor.fetchall()]
 
-    conn.close()
     return sheets
 
+@timed_query('get_articles_by_sheet')
 def get_articles_by_sheet(sheet_name: str) -> List[Dict]:
     """Sheet별 조항 목록 조회 (2단계: 조항)"""
     conn = get_db_connection()
     cursor = conn.cursor()
 
-    # GROUP BY로 article_num 기준 중복 제거, 첫 번째 article_title 사용
-    query = '''
+    if has_laws_sort_columns(conn):
+        # 트리 순서 인덱스만 읽음 (GROUP BY로 article_num 기준 중복 제거, 첫 번째 article_title 사용)
+        cursor.execute(ARTICLES_BY_SHEET_QUERY, (sheet_name,))
+        return [dict(row) for row in cursor.fetchall()]
+
+    # 정렬 키 컬럼이 없는 이전 DB
+    cursor.execute('''
     SELECT article_num, MIN(article_title) as article_title
     FROM laws
     WHERE sheet_name = ? AND article_num IS NOT NULL
     GROUP BY article_num
-    ORDER BY
-        CASE
-            WHEN article_num GLOB '[0-9]*' THEN CAST(article_num AS INTEGER)
-            ELSE 9999
-        END,
-        article_num
-    '''
-
-    cursor.execute(query, (sheet_name,))
+    ''', (sheet_name,))
     articles = [dict(row) for row in cursor.fetchall()]
+    articles.sort(key=lambda article: (article_sort_key(article['article_num']), str(article['article_num'])))
 
-    conn.close()
     return articles
 
+@timed_query('get_paragraphs_by_article')
 def get_paragraphs_by_article(sheet_name: str, article_num: str) -> List[Dict]:
     """조항별 항 목록 조회 (3단계: 항/내용)"""
     conn = get_db_connection()
     cursor = conn.cursor()
 
-    # 먼저 paragraph_num이 있는 레코드 조회
-    query = '''
-    SELECT law_id, paragraph_num, paragraph_content, full_text, article_title
-    FROM laws
-    WHERE sheet_name = ? AND article_num = ?
-    ORDER BY
-        CASE WHEN paragraph_num IS NULL THEN 1 ELSE 0 END,
-        paragraph_num
-    '''
-
-    cursor.execute(query, (sheet_name, article_num))
+    if has_laws_sort_columns(conn):
+        cursor.execute(PARAGRAPHS_BY_ARTICLE_QUERY, (sheet_name, article_sort_key(article_num), article_num))
+    else:
+        cursor.execute('''
+        SELECT law_id, paragraph_num, paragraph_content, full_text, article_title
+        FROM laws
+        WHERE sheet_name = ? AND article_num = ?
+        ORDER BY
+            CASE WHEN paragraph_num IS NULL THEN 1 ELSE 0 END,
+            paragraph_num
+        ''', (sheet_name, article_num))
     rows = cursor.fetchall()
 
     paragraphs = []
@@ -78,16 +331,338 @@ def get_paragraphs_by_article(sheet_name: str, article_num: str) -> List[Dict]:
             row_dict['paragraph_num'] = '본문'
         paragraphs.append(row_dict)
 
-    conn.close()
     return paragraphs
 
+def get_law_tree_rows() -> List[sqlite3.Row]:
+    """
+    마스터 트리용 법령 행 조회 (지침은 원본 시트 순서, 지침 안에서는 조 → 항 순서)
+
+    정렬 키 인덱스가 있으면 지침별 인덱스 범위 검색으로 이미 정렬된 행을 읽고,
+    없으면 전체를 읽어 Python에서 같은 키로 정렬합니다.
+    """
+    conn = get_db_connection()
+
+    if has_laws_sort_columns(conn):
+        sheets = [row['sheet_name'] for row in conn.execute(SHEET_ORDER_QUERY)]
+        rows = []
+        for sheet_name in sheets:
+            rows.extend(conn.execute(TREE_ROWS_BY_SHEET_QUERY, (sheet_name,)).fetchall())
+        return rows
+
+    rows = conn.execute('''
+        SELECT sheet_name, article_num, article_title, paragraph_num, paragraph_content, full_text, law_id
+        FROM laws
+        WHERE sheet_name IS NOT NULL AND article_num IS NOT NULL
+        ORDER BY rowid
+    ''').fetchall()
+    sheet_order = {}
+    for row in rows:
+        sheet_order.setdefault(row['sheet_name'], len(sheet_order))
+    # 이전 형식(to_sql) 테이블은 rowid가 원본 행 순서, sorted()는 안정 정렬이므로 동순위는 rowid 순서 유지
+    return sorted(rows, key=lambda row: (sheet_order[row['sheet_name']],
+                                         article_sort_key(row['article_num']),
+                                         str(row['article_num']),
+                                         paragraph_sort_key(row['paragraph_num'])))
+
+# ========================================
+# FTS5 전문 검색 인덱스 (trigram)
+# ========================================
+
+LAWS_FTS_TABLE = 'laws_fts'
+
+# trigram 토크나이저는 3글자 미만 질의를 인덱스로 처리하지 못함 → 2글자는 bigram 테이블 사용
+FTS_MIN_KEYWORD_LENGTH = 3
+
+# 2글자 키워드용 bigram 역색인 (gram → laws.rowid)
+LAWS_BIGRAM_TABLE = 'laws_bigram'
+LAWS_BIGRAM_POSITIONS_TABLE = 'laws_bigram_positions'  # 트리거에서 문자열을 글자 위치로 펼치는 숫자 테이블
+LAWS_BIGRAM_MIN_POSITIONS = 65536  # 위치 테이블 최소 크기 (색인 텍스트 길이 상한)
+BIGRAM_KEYWORD_LENGTH = 2
+
+# bigram 색인 텍스트 (full_text, article_title, tag를 줄바꿈으로 연결, LIKE처럼 ASCII 대소문자 무시)
+# 줄바꿈이 걸친 gram은 컬럼 경계이므로 색인하지 않음
+_BIGRAM_TEXT_SQL = ("lower(coalesce({row}.full_text, '') || char(10) || "
+                    "coalesce({row}.article_title, '') || char(10) || coalesce({row}.tag, ''))")
+
+# bm25 컬럼 가중치 (full_text, article_title, tag 순서)
+FTS_BM25_WEIGHTS = (1.0, 2.0, 2.0)
+
+def build_laws_fts(conn: sqlite3.Connection) -> int:
+    """
+    laws 테이블용 FTS5 인덱스(laws_fts) 생성 및 재색인
+
+    - 외부 콘텐츠(content='laws') 방식: 본문은 laws에만 저장
+    - trigram 토크나이저: 조사가 붙은 한글(사업비는, 협약을)도 부분 일치
+    - INSERT/UPDATE/DELETE 트리거로 laws 변경 시 자동 동기화
+      (UPDATE는 색인 컬럼이 바뀔 때만, 원본 위치 컬럼만 바뀐 행은 재색인하지 않음)
+
+    laws 테이블을 다시 만들면(ingest.ensure_table) 트리거가 함께 삭제되므로
+    적재 후 다시 호출해야 합니다.
+
+    Returns:
+        int: 색인된 행 수
+    """
+    cursor = conn.cursor()
+    cursor.execute(f'DROP TABLE IF EXISTS {LAWS_FTS_TABLE}')
+    cursor.execute(f'''
+    CREATE VIRTUAL TABLE {LAWS_FTS_TABLE} USING fts5(
+        full_text, article_title, tag,
+        content='laws', content_rowid='rowid',
+        tokenize='trigram'
+    )
+    ''')
+
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS laws_fts_ai AFTER INSERT ON laws BEGIN
+        INSERT INTO {LAWS_FTS_TABLE}(rowid, full_text, article_title, tag)
+        VALUES (new.rowid, new.full_text, new.article_title, new.tag);
+    END
+    ''')
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS laws_fts_ad AFTER DELETE ON laws BEGIN
+        INSERT INTO {LAWS_FTS_TABLE}({LAWS_FTS_TABLE}, rowid, full_text, article_title, tag)
+        VALUES ('delete', old.rowid, old.full_text, old.article_title, old.tag);
+    END
+    ''')
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS laws_fts_au AFTER UPDATE OF full_text, article_title, tag ON laws BEGIN
+        INSERT INTO {LAWS_FTS_TABLE}({LAWS_FTS_TABLE}, rowid, full_text, article_title, tag)
+        VALUES ('delete', old.rowid, old.full_text, old.article_title, old.tag);
+        INSERT INTO {LAWS_FTS_TABLE}(rowid, full_text, article_title, tag)
+        VALUES (new.rowid, new.full_text, new.article_title, new.tag);
+    END
+    ''')
+
+    cursor.execute(f"INSERT INTO {LAWS_FTS_TABLE}({LAWS_FTS_TABLE}) VALUES ('rebuild')")
+    cursor.execute(f"INSERT INTO {LAWS_FTS_TABLE}({LAWS_FTS_TABLE}) VALUES ('optimize')")
+
+    build_laws_bigram(conn)
+
+    cursor.execute(f'SELECT COUNT(*) FROM {LAWS_FTS_TABLE}')
+    return cursor.fetchone()[0]
+
+# 트리거에서 새 행 1개를 t(law_rowid, text)로 감싸는 FROM 항목 (트리거 안에서는 CTE 사용 불가)
+_BIGRAM_NEW_ROW_SQL = f"(SELECT new.rowid AS law_rowid, {_BIGRAM_TEXT_SQL.format(row='new')} AS text) t"
+
+def _bigram_select_sql(source: str) -> str:
+    """source(law_rowid, text 컬럼의 t)를 (gram, law_rowid) 행으로 펼치는 SELECT"""
+    # CROSS JOIN: 위치 테이블을 바깥 루프로 두면 위치마다 laws 전체를 훑으므로 순서 고정
+    return f'''
+    SELECT DISTINCT substr(t.text, p.n, 2) AS gram, t.law_rowid
+    FROM {source}
+    CROSS JOIN {LAWS_BIGRAM_POSITIONS_TABLE} p ON p.n < length(t.text)
+    WHERE instr(substr(t.text, p.n, 2), char(10)) = 0
+    '''
+
+def _laws_bigram_text_length(conn: sqlite3.Connection) -> int:
+    """laws 행 중 가장 긴 bigram 색인 텍스트 길이"""
+    cursor = conn.execute(f'SELECT MAX(length({_BIGRAM_TEXT_SQL.format(row="laws")})) FROM laws')
+    return cursor.fetchone()[0] or 0
+
+def build_laws_bigram(conn: sqlite3.Connection) -> int:
+    """
+    2글자 키워드용 bigram 역색인(laws_bigram) 생성 및 재색인
+
+    - (gram, law_rowid) WITHOUT ROWID 테이블: 2글자 키워드는 gram 1건 조회로 후보 행을 찾음
+    - CTE를 쓸 수 없는 트리거에서도 문자열을 펼칠 수 있도록 위치 숫자 테이블을 함께 생성
+      (가장 긴 색인 텍스트 또는 LAWS_BIGRAM_MIN_POSITIONS 중 큰 값까지)
+    - INSERT/UPDATE/DELETE 트리거로 laws 변경 시 자동 동기화
+
+    build_laws_fts()에서 함께 호출되며, 위치 테이블보다 긴 행이 적재되면
+    (laws_bigram_outgrown) 다시 호출해야 합니다.
+
+    Returns:
+        int: 색인된 (gram, 행) 수
+    """
+    cursor = conn.cursor()
+    cursor.execute(f'DROP TABLE IF EXISTS {LAWS_BIGRAM_TABLE}')
+    cursor.execute(f'DROP TABLE IF EXISTS {LAWS_BIGRAM_POSITIONS_TABLE}')
+    cursor.execute(f'CREATE TABLE {LAWS_BIGRAM_POSITIONS_TABLE} (n INTEGER PRIMARY KEY)')
+    cursor.execute(f'''
+    WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < ?)
+    INSERT INTO {LAWS_BIGRAM_POSITIONS_TABLE}(n) SELECT n FROM seq
+    ''', (max(LAWS_BIGRAM_MIN_POSITIONS, _laws_bigram_text_length(conn)),))
+
+    cursor.execute(f'''
+    CREATE TABLE {LAWS_BIGRAM_TABLE} (
+        gram TEXT NOT NULL,
+        law_rowid INTEGER NOT NULL,
+        PRIMARY KEY (gram, law_rowid)
+    ) WITHOUT ROWID
+    ''')
+    # 전체 재색인은 Python에서 gram을 펼침 (SQLite substr()은 UTF-8 문자열을 앞에서부터 세므로
+    # 위치 테이블 조인은 행 길이의 제곱에 비례, 행 단위 트리거에서만 사용)
+    postings = {}
+    cursor.execute(f'SELECT rowid, {_BIGRAM_TEXT_SQL.format(row="laws")} FROM laws ORDER BY rowid')
+    for rowid, text in cursor.fetchall():
+        for gram in {text[i:i + 2] for i in range(len(text) - 1)}:
+            if '\n' not in gram:
+                postings.setdefault(gram, []).append(rowid)
+    # 기본 키 순서로 넣어 B-tree 페이지 분할 최소화 (gram별 rowid는 이미 오름차순)
+    cursor.executemany(f'INSERT INTO {LAWS_BIGRAM_TABLE}(gram, law_rowid) VALUES (?, ?)',
+                       ((gram, rowid) for gram in sorted(postings) for rowid in postings[gram]))
+    # 삭제/수정 트리거가 행 단위로 지우므로 law_rowid 인덱스 필요
+    cursor.execute(f'CREATE INDEX idx_laws_bigram_rowid ON {LAWS_BIGRAM_TABLE}(law_rowid)')
+
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS laws_bigram_ai AFTER INSERT ON laws BEGIN
+        INSERT OR IGNORE INTO {LAWS_BIGRAM_TABLE}(gram, law_rowid) {_bigram_select_sql(_BIGRAM_NEW_ROW_SQL)};
+    END
+    ''')
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS laws_bigram_ad AFTER DELETE ON laws BEGIN
+        DELETE FROM {LAWS_BIGRAM_TABLE} WHERE law_rowid = old.rowid;
+    END
+    ''')
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS laws_bigram_au AFTER UPDATE OF full_text, article_title, tag ON laws BEGIN
+        DELETE FROM {LAWS_BIGRAM_TABLE} WHERE law_rowid = old.rowid;
+        INSERT OR IGNORE INTO {LAWS_BIGRAM_TABLE}(gram, law_rowid) {_bigram_select_sql(_BIGRAM_NEW_ROW_SQL)};
+    END
+    ''')
+
+    cursor.execute(f'SELECT COUNT(*) FROM {LAWS_BIGRAM_TABLE}')
+    return cursor.fetchone()[0]
+
+def laws_bigram_outgrown(conn: sqlite3.Connection) -> bool:
+    """위치 테이블보다 긴 행이 있어 트리거가 일부 gram을 색인하지 못했는지 여부"""
+    cursor = conn.execute(f'SELECT MAX(n) FROM {LAWS_BIGRAM_POSITIONS_TABLE}')
+    return _laws_bigram_text_length(conn) > (cursor.fetchone()[0] or 0)
+
+def has_laws_fts(conn: sqlite3.Connection) -> bool:
+    """laws_fts 인덱스 존재 여부"""
+    return table_exists(conn, LAWS_FTS_TABLE)
+
+def has_laws_bigram(conn: sqlite3.Connection) -> bool:
+    """laws_bigram 인덱스 존재 여부"""
+    return table_exists(conn, LAWS_BIGRAM_TABLE)
+
+def _fts_phrase(keyword: str) -> str:
+    """키워드를 FTS5 구문(phrase) 질의로 변환 (따옴표 이스케이프)"""
+    return '"' + keyword.replace('"', '""') + '"'
+
+@timed_query('search_laws_fts')
+def search_laws_fts(keyword: str, limit: int = 10, conn: Optional[sqlite3.Connection] = None) -> List[Dict]:
+    """
+    FTS5 + BM25 랭킹 기반 법령 검색 (중복 제거)
+
+    search_laws와 같은 컬럼을 반환하며, 관련도 점수(score, 낮을수록 관련도 높음)를
+    추가로 포함합니다. 같은 조(sheet_name + article_num)의 여러 항 중
+    가장 관련도가 높은 행(동점이면 먼저 적재된 행)의 law_id를 대표로 사용합니다.
+    """
+    conn = conn or get_db_connection()
+    cursor = conn.cursor()
+
+    w_full_text, w_title, w_tag = FTS_BM25_WEIGHTS
+    # MATERIALIZED: 서브쿼리 평탄화 시 bm25()를 사용할 수 없으므로 먼저 랭킹 계산
+    # 대표 law_id는 ROW_NUMBER()로 고름 (GROUP BY의 집계 없는 컬럼은 임의의 행 값이 될 수 있음)
+    query = f'''
+    WITH matched AS MATERIALIZED (
+        SELECT rowid, bm25({LAWS_FTS_TABLE}, ?, ?, ?) AS score
+        FROM {LAWS_FTS_TABLE}
+        WHERE {LAWS_FTS_TABLE} MATCH ?
+    ),
+    ranked AS (
+        SELECT l.law_id, l.sheet_name, l.article_num,
+               MIN(l.article_title) OVER article as article_title,
+               MIN(l.full_text) OVER article as full_text,
+               MIN(l.paragraph_content) OVER article as paragraph_content,
+               MIN(l.tag) OVER article as tag,
+               MAX(l.is_active) OVER article as is_active,
+               m.score,
+               ROW_NUMBER() OVER (article ORDER BY m.score, l.rowid) as article_rank
+        FROM matched m
+        JOIN laws l ON l.rowid = m.rowid
+        WINDOW article AS (PARTITION BY l.sheet_name, l.article_num)
+    )
+    SELECT law_id, sheet_name, article_num, article_title, full_text, paragraph_content, tag, is_active, score
+    FROM ranked
+    WHERE article_rank = 1
+    ORDER BY score, is_active DESC
+    LIMIT ?
+    '''
+
+    cursor.execute(query, (w_full_text, w_title, w_tag, _fts_phrase(keyword), limit))
+
+    results = [dict(row) for row in cursor.fetchall()]
+
+    return results
+
 # ========================================
 # 검색 함수 (태그 기반)
 # ========================================
 
-def search_laws(keyword: str, limit: int = 10) -> List[Dict]:
-    """키워드로 법령 검색 (중복 제거)"""
-    conn = get_db_connection()
+@timed_query('search_laws_bigram')
+def search_laws_bigram(keyword: str, limit: int = 10, conn: Optional[sqlite3.Connection] = None) -> List[Dict]:
+    """
+    bigram 역색인 기반 2글자 키워드 검색 (중복 제거)
+
+    search_laws_like와 같은 행·컬럼·정렬을 인덱스 조회로 반환합니다.
+    같은 조의 여러 항 중 먼저 적재된 행의 law_id를 대표로 사용합니다.
+    """
+    conn = conn or get_db_connection()
+    cursor = conn.cursor()
+
+    query = f'''
+    WITH matched AS MATERIALIZED (
+        SELECT law_rowid AS rowid FROM {LAWS_BIGRAM_TABLE} WHERE gram = ?
+    ),
+    ranked AS (
+        SELECT l.law_id, l.sheet_name, l.article_num,
+               MIN(l.article_title) OVER article as article_title,
+               MIN(l.full_text) OVER article as full_text,
+               MIN(l.paragraph_content) OVER article as paragraph_content,
+               MIN(l.tag) OVER article as tag,
+               MAX(l.is_active) OVER article as is_active,
+               ROW_NUMBER() OVER (article ORDER BY l.rowid) as article_rank
+        FROM matched m
+        JOIN laws l ON l.rowid = m.rowid
+        WINDOW article AS (PARTITION BY l.sheet_name, l.article_num)
+    )
+    SELECT law_id, sheet_name, article_num, article_title, full_text, paragraph_content, tag, is_active
+    FROM ranked
+    WHERE article_rank = 1
+    ORDER BY is_active DESC, sheet_name, article_num
+    LIMIT ?
+    '''
+
+    cursor.execute(query, (keyword.lower(), limit))
+
+    results = [dict(row) for row in cursor.fetchall()]
+
+    return results
+
+def search_laws(keyword: str, limit: int = 10, conn: Optional[sqlite3.Connection] = None) -> List[Dict]:
+    """
+    키워드로 법령 검색 (중복 제거)
+
+    키워드가 3글자 이상이면 laws_fts(search_laws_fts, BM25), 2글자면
+    laws_bigram(search_laws_bigram)을 사용하고, 인덱스가 없으면 LIKE 전체 스캔으로 검색합니다.
+    인덱스 존재 여부는 풀 연결이면 풀 세대별로 캐시합니다.
+    conn을 넘기면 해당 연결을 사용합니다 (기본: 읽기 전용 풀 연결).
+    """
+    conn = conn or get_db_connection()
+    keyword = keyword.strip()
+    if len(keyword) >= FTS_MIN_KEYWORD_LENGTH:
+        if _has_index(conn, LAWS_FTS_TABLE, has_laws_fts):
+            return search_laws_fts(keyword, limit, conn)
+    elif len(keyword) == BIGRAM_KEYWORD_LENGTH:
+        if _has_index(conn, LAWS_BIGRAM_TABLE, has_laws_bigram):
+            return search_laws_bigram(keyword, limit, conn)
+
+    return search_laws_like(keyword, limit, conn)
+
+def _has_index(conn: sqlite3.Connection, name: str,
+               probe: Callable[[sqlite3.Connection], bool]) -> bool:
+    """인덱스 존재 여부 (풀 연결은 세대별 캐시, 쓰기 연결 등은 매번 조회)"""
+    if _pool.owns(conn):
+        return _pool.schema_flag(name, probe, conn)
+    return probe(conn)
+
+@timed_query('search_laws_like')
+def search_laws_like(keyword: str, limit: int = 10, conn: Optional[sqlite3.Connection] = None) -> List[Dict]:
+    """LIKE '%keyword%' 전체 스캔 검색 (인덱스가 없거나 1글자 키워드용)"""
+    conn = conn or get_db_connection()
     cursor = conn.cursor()
 
     # GROUP BY로 sheet_name + article_num 기준 중복 제거
@@ -111,11 +686,12 @@ def search_laws(keyword: str, limit: int = 10) -> List[Dict]:
     cursor.execute(query, (pattern, pattern, pattern, limit))
 
     results = [dict(row) for row in cursor.fetchall()]
-    conn.close()
 
     return results
 
-def search_laws_by_policy_anchor(policy_anchor: str, limit: int = 5) -> List[Dict]:
+@timed_query('search_laws_by_policy_anchor')
+def search_laws_by_policy_anchor(policy_anchor: str, limit: int = 5,
+                                 conn: Optional[sqlite3.Connection] = None) -> List[Dict]:
     """
     policy_anchor로 법령 검색 (조항 번호 추출 + 키워드 매칭)
 
@@ -124,7 +700,7 @@ def search_laws_by_policy_anchor(policy_anchor: str, limit: int = 5) -> List[Dic
     """
     import re
 
-    conn = get_db_connection()
+    conn = conn or get_db_connection()
     cursor = conn.cursor()
 
     results = []
@@ -223,15 +799,161 @@ def search_laws_by_policy_anchor(policy_anchor: str, limit: int = 5) -> List[Dic
         # policy_anchor에서 핵심 단어 추출해서 검색
         for kw in keywords:
             if not results:
-                results = search_laws(kw, limit)
+                results = search_laws(kw, limit, conn)
 
-    conn.close()
     return results
 
+# ========================================
+# FAQ policy_anchor → 법령 연결 (faq_law_links)
+# ========================================
+
+FAQ_LAW_LINKS_TABLE = 'faq_law_links'
+FAQ_LAW_LINKS_PER_ANCHOR = 2  # anchor별 저장할 법령 수 (요청 시 사용하는 최대 limit)
+
+def _split_policy_anchor(policy_anchor: Optional[str]) -> List[str]:
+    """'A;B' 형식 policy_anchor 분리 (빈 항목 제외)"""
+    return [anchor.strip() for anchor in (policy_anchor or '').split(';') if anchor.strip()]
+
+def build_faq_law_links(conn: sqlite3.Connection, per_anchor: int = FAQ_LAW_LINKS_PER_ANCHOR) -> Dict:
+    """
+    faqs의 모든 policy_anchor를 law_id로 미리 해석해 faq_law_links 테이블에 저장
+
+    FAQ/법령 데이터를 다시 적재할 때마다 실행합니다. 해석하지 못한 anchor는
+    law_id가 NULL인 행으로 남겨 get_unresolved_anchors()로 확인할 수 있습니다.
+
+    Returns:
+        dict: {'faqs', 'anchors', 'links', 'unresolved': [(faq_id, anchor), ...]}
+    """
+    previous_factory = conn.row_factory
+    conn.row_factory = sqlite3.Row
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f'DROP TABLE IF EXISTS {FAQ_LAW_LINKS_TABLE}')
+        cursor.execute(f'''
+        CREATE TABLE {FAQ_LAW_LINKS_TABLE} (
+            faq_id TEXT NOT NULL,
+            anchor_order INTEGER NOT NULL,
+            anchor TEXT NOT NULL,
+            law_rank INTEGER NOT NULL,
+            law_id TEXT,
+            PRIMARY KEY (faq_id, anchor_order, law_rank)
+        )
+        ''')
+
+        faqs = cursor.execute('SELECT faq_id, policy_anchor FROM faqs ORDER BY faq_id').fetchall()
+
+        rows = []
+        unresolved = []
+        anchor_count = 0
+        resolved_cache = {}  # 같은 anchor를 공유하는 FAQ가 많으므로 anchor별 1회만 검색
+        for faq in faqs:
+            for anchor_order, anchor in enumerate(_split_policy_anchor(faq['policy_anchor'])):
+                anchor_count += 1
+                if anchor not in resolved_cache:
+                    laws = search_laws_by_policy_anchor(anchor, limit=per_anchor, conn=conn)
+                    resolved_cache[anchor] = [law['law_id'] for law in laws]
+                law_ids = resolved_cache[anchor]
+
+                if not law_ids:
+                    unresolved.append((faq['faq_id'], anchor))
+                    rows.append((faq['faq_id'], anchor_order, anchor, 0, None))
+                for law_rank, law_id in enumerate(law_ids):
+                    rows.append((faq['faq_id'], anchor_order, anchor, law_rank, law_id))
+
+        cursor.executemany(f'INSERT INTO {FAQ_LAW_LINKS_TABLE} VALUES (?, ?, ?, ?, ?)', rows)
+        conn.commit()
+    finally:
+        conn.row_factory = previous_factory
+
+    return {
+        'faqs': len(faqs),
+        'anchors': anchor_count,
+        'links': sum(1 for row in rows if row[4] is not None),
+        'unresolved': unresolved
+    }
+
+def table_exists(conn: sqlite3.Connection, table: str) -> bool:
+    """테이블 존재 여부"""
+    cursor = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+    return cursor.fetchone() is not None
+
+def has_faq_law_links(conn: sqlite3.Connection) -> bool:
+    """faq_law_links 테이블 존재 여부"""
+    return table_exists(conn, FAQ_LAW_LINKS_TABLE)
+
+def print_faq_law_links_report(report: Dict, max_items: int = 50):
+    """build_faq_law_links() 결과 요약 + 해석 실패 anchor 목록 출력 (변환 스크립트용)"""
+    print(f"   - FAQ 법령 연결: FAQ {report['faqs']}개, anchor {report['anchors']}개, "
+          f"연결 {report['links']}개, 해석 실패 {len(report['unresolved'])}개")
+    for faq_id, anchor in report['unresolved'][:max_items]:
+        print(f"     [해석 실패] {faq_id}: {anchor}")
+    if len(report['unresolved']) > max_items:
+        print(f"     ... 외 {len(report['unresolved']) - max_items}개")
+
+def load_faq_law_links() -> Dict[str, Dict[str, List[Dict]]]:
+    """
+    faq_law_links를 메모리로 적재 (서버 시작 시 1회)
+
+    Returns:
+        dict: {faq_id: {anchor: [law, ...]}} law는 search_laws_by_policy_anchor()와 같은 컬럼.
+              해석하지 못한 anchor는 빈 목록. 테이블이 없으면 빈 dict.
+    """
+    conn = get_db_connection()
+    if not has_faq_law_links(conn):
+        return {}
+
+    cursor = conn.cursor()
+    cursor.execute(f'''
+    SELECT k.faq_id, k.anchor, l.law_id, l.sheet_name, l.article_num, l.article_title,
+           l.full_text, l.paragraph_content, l.tag, l.is_active
+    FROM {FAQ_LAW_LINKS_TABLE} k
+    LEFT JOIN laws l ON l.law_id = k.law_id
+    ORDER BY k.faq_id, k.anchor_order, k.law_rank
+    ''')
+
+    links = {}
+    for row in cursor.fetchall():
+        laws = links.setdefault(row['faq_id'], {}).setdefault(row['anchor'], [])
+        if row['law_id'] is not None:
+            law = dict(row)
+            del law['faq_id'], law['anchor']
+            laws.append(law)
+
+    return links
+
+def get_unresolved_anchors() -> List[Dict]:
+    """법령으로 해석하지 못한 (faq_id, anchor) 목록"""
+    conn = get_db_connection()
+    if not has_faq_law_links(conn):
+        return []
+
+    cursor = conn.cursor()
+    cursor.execute(f'''
+    SELECT k.faq_id, k.anchor
+    FROM {FAQ_LAW_LINKS_TABLE} k
+    LEFT JOIN laws l ON l.law_id = k.law_id
+    GROUP BY k.faq_id, k.anchor_order
+    HAVING COUNT(l.law_id) = 0
+    ORDER BY k.faq_id, k.anchor_order
+    ''')
+
+    return [dict(row) for row in cursor.fetchall()]
+
 # ========================================
 # FAQ 함수
 # ========================================
 
+def get_all_faqs() -> List[Dict]:
+    """FAQ 전체 조회 (로컬 FAQ 인덱스 구축용, faqs 테이블이 아직 없으면 빈 목록)"""
+    conn = get_db_connection()
+    if not table_exists(conn, 'faqs'):
+        return []
+    cursor = conn.cursor()
+
+    cursor.execute('SELECT faq_id, question, answer_text, policy_anchor FROM faqs ORDER BY faq_id')
+
+    return [dict(row) for row in cursor.fetchall()]
+
 def get_faq_by_question(question: str) -> Optional[Dict]:
     """질문으로 FAQ 검색"""
     conn = get_db_connection()
@@ -241,7 +963,6 @@ def get_faq_by_question(question: str) -> Optional[Dict]:
     cursor.execute(query, (f'%{question}%',))
 
     result = cursor.fetchone()
-    conn.close()
 
     return dict(result) if result else None
 
@@ -262,6 +983,5 @@ def get_laws_by_faq(faq_id: str) -> List[Dict]:
     cursor.execute('SELECT * FROM laws WHERE full_text LIKE ?', (f'%{anchor}%',))
 
     results = [dict(row) for row in cursor.fetchall()]
-    conn.close()
 
     return results
@@ -7,6 +7,8 @@ import os
 import sqlite3
 import sys
 
+import database
+
 # Windows 콘솔 UTF-8 설정
 if sys.platform == 'win32':
     import io
@@ -22,6 +24,9 @@ POSSIBLE_DB_PATHS = [
     'chatbot.db',
 ]
 
+# ingest.py가 만드는 sheet_name 단일 컬럼 인덱스 (DISTINCT sheet_name은 이 인덱스만 훑어도 됨)
+SHEET_NAME_INDEX = 'idx_sheet_name'
+
 def print_separator(title=""):
     print("\n" + "=" * 60)
     if title:
@@ -170,6 +175,45 @@ def test_laws_queries(db_path):
         traceback.print_exc()
         return False
 
+def check_tree_query_plans(db_path):
+    """트리 조회 쿼리가 정렬 키 인덱스를 쓰는지 EXPLAIN QUERY PLAN으로 확인"""
+    print_separator("Tree Query Plan Check")
+
+    conn = sqlite3.connect(db_path)
+    try:
+        if not database.has_laws_sort_columns(conn):
+            print("[X] article_sort/paragraph_sort index not found")
+            print("  -> Run convert_law_to_db_sheets.py to rebuild the laws table.")
+            return False
+
+        row = conn.execute('SELECT sheet_name, article_sort, article_num FROM laws LIMIT 1').fetchone()
+        if row is None:
+            print("  (No data)")
+            return True
+        sheet_name, article_sort, article_num = row
+
+        tree_indexes = (database.LAWS_TREE_INDEX, database.LAWS_ARTICLE_INDEX)
+        checks = [
+            ('sheet list', database.SHEET_LIST_QUERY, (), tree_indexes + (SHEET_NAME_INDEX,)),
+            ('articles by sheet', database.ARTICLES_BY_SHEET_QUERY, (sheet_name,), tree_indexes),
+            ('paragraphs by article', database.PARAGRAPHS_BY_ARTICLE_QUERY, (sheet_name, article_sort, article_num),
+             tree_indexes),
+            ('tree rows by sheet', database.TREE_ROWS_BY_SHEET_QUERY, (sheet_name,), tree_indexes),
+        ]
+        ok = True
+        for name, query, params, indexes in checks:
+            plan = [detail[3] for detail in conn.execute('EXPLAIN QUERY PLAN ' + query, params)]
+            uses_index = any(index in step for step in plan for index in indexes)
+            sorts = any('TEMP B-TREE' in step for step in plan)
+            passed = uses_index and not sorts
+            ok = ok and passed
+            print(f"\n[{'OK' if passed else 'X'}] {name}")
+            for step in plan:
+                print(f"  - {step}")
+        return ok
+    finally:
+        conn.close()
+
 def main():
     print_separator("SQLite DB Connection Debug Start")
     print(f"Current working directory: {os.getcwd()}")
@@ -198,14 +242,17 @@ def main():
         print("Solution:")
         print("  1. Check if data/chatbot.db file exists.")
         print("  2. Run convert_law_to_db_sheets.py to create the DB.")
-        return
+        return False
 
     # Step 2: DB 연결 테스트
     if not test_db_connection(found_db):
-        return
+        return False
 
     # Step 3: Laws 쿼리 테스트
-    test_laws_queries(found_db)
+    queries_ok = test_laws_queries(found_db)
+
+    # Step 4: 트리 조회 쿼리 플랜 확인
+    plans_ok = check_tree_query_plans(found_db)
 
     print_separator("Debug Complete")
     print(f"\n[OK] DB path to use: {found_db}")
@@ -219,5 +266,10 @@ def main():
     except:
         print(f"  DB_PATH = '{found_db}'")
 
+    print(f"\nQuery tests: {'OK' if queries_ok else 'FAIL'}, tree query plans: {'OK' if plans_ok else 'FAIL'}")
+    ok = queries_ok and plans_ok
+    print('\n[OK] All checks passed' if ok else '\n[X] FAIL: some checks failed (see above)')
+    return ok
+
 if __name__ == "__main__":
-    main()
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,331 @@
+"""
+Dify Knowledge API 클라이언트 (연결 재사용 + 재시도 + 서킷 브레이커)
+
+- requests.Session + HTTPAdapter 연결 풀: 질문마다 TCP/TLS 연결을 새로 맺지 않음
+- connect/read 타임아웃 분리 (서버가 죽었으면 connect 단계에서 빨리 실패)
+- 연결 실패/429/5xx만 제한 횟수 재시도 (지수 백오프 + 지터), read 타임아웃은 재시도하지 않음
+- 연속 실패 시 서킷을 열어 일정 시간 Dify를 호출하지 않고 바로 실패 반환 (호출 측은 로컬 FAQ로 폴백)
+  → 대기 시간이 지나면 요청 1건만 시험 호출(half-open)해 복구 여부 확인
+- 최근 호출 지연시간 p50/p95 통계
+- AsyncDifyClient: 같은 정책의 httpx.AsyncClient 버전 (ASGI 서버용, 이벤트 루프를 막지 않음)
+"""
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUS = frozenset({429, 500, 502, 503, 504})
+
+class CircuitOpenError(Exception):
+    """서킷이 열려 있어 Dify를 호출하지 않음"""
+
+class CircuitBreaker:
+    """
+    연속 실패 기반 서킷 브레이커 (closed → open → half_open → closed)
+
+    Args:
+        failure_threshold: 서킷을 여는 연속 실패 횟수
+        recovery_timeout: 서킷을 연 뒤 시험 호출까지 기다리는 시간(초)
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._open_count = 0
+
+    def allow(self) -> bool:
+        """호출 허용 여부 (open 상태에서 대기 시간이 지나면 1건만 시험 호출 허용)"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+                self._state = self.HALF_OPEN
+            if self._state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self._open_count += 1
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+                return self.HALF_OPEN  # 다음 요청이 시험 호출
+            return self._state
+
+    def stats(self) -> Dict:
+        state = self.state
+        with self._lock:
+            retry_in = 0.0
+            if state == self.OPEN:
+                retry_in = max(0.0, self.recovery_timeout - (time.monotonic() - self._opened_at))
+            return {
+                'state': state,
+                'consecutive_failures': self._failures,
+                'failure_threshold': self.failure_threshold,
+                'recovery_timeout': self.recovery_timeout,
+                'open_count': self._open_count,
+                'retry_in': round(retry_in, 1)
+            }
+
+class LatencyWindow:
+    """최근 N건 지연시간(초)의 백분위 통계"""
+
+    def __init__(self, size: int = 500):
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=size)
+
+    def record(self, elapsed: float):
+        with self._lock:
+            self._samples.append(elapsed)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return {'count': 0, 'p50': None, 'p95': None, 'max': None}
+
+        def percentile(p):
+            return round(samples[min(len(samples) - 1, int(p / 100 * len(samples)))], 3)
+
+        return {'count': len(samples), 'p50': percentile(50), 'p95': percentile(95), 'max': round(samples[-1], 3)}
+
+class _DifyClientBase:
+    """동기/비동기 클라이언트 공통 (서킷 브레이커, 호출 카운터, 지연시간 통계)"""
+
+    def __init__(self, base_url: str, dataset_id: str, connect_timeout: float, read_timeout: float,
+                 max_retries: int, backoff: float, breaker: Optional[CircuitBreaker]):
+        self.base_url = base_url.rstrip('/')
+        self.dataset_id = dataset_id
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = LatencyWindow()
+
+        self._lock = threading.Lock()
+        self._counts = {'requests': 0, 'success': 0, 'failure': 0, 'retries': 0, 'short_circuited': 0}
+
+    @property
+    def retrieve_url(self) -> str:
+        return f'{self.base_url}/datasets/{self.dataset_id}/retrieve'
+
+    def _count(self, key: str, n: int = 1):
+        with self._lock:
+            self._counts[key] += n
+
+    def _retry_delay(self, attempt: int) -> float:
+        delay = self.backoff * (2 ** attempt)
+        return delay + random.uniform(0, delay)
+
+    def _begin(self):
+        if not self.breaker.allow():
+            self._count('short_circuited')
+            raise CircuitOpenError('Dify circuit breaker is open')
+        self._count('requests')
+
+    def _record_success(self, start: float):
+        self.breaker.record_success()
+        self._count('success')
+        self.latency.record(time.perf_counter() - start)
+
+    def _record_client_error(self, start: float):
+        # 4xx(요청 오류)는 Dify 장애가 아니므로 서킷 실패로 집계하지 않음
+        self.breaker.record_success()
+        self._count('failure')
+        self.latency.record(time.perf_counter() - start)
+
+    def _record_failure(self, start: float):
+        self.breaker.record_failure()
+        self._count('failure')
+        self.latency.record(time.perf_counter() - start)
+
+    @staticmethod
+    def _is_client_error(status_code: int) -> bool:
+        return status_code < 500 and status_code != 429
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counts = dict(self._counts)
+        return {
+            'breaker': self.breaker.stats(),
+            'latency': self.latency.snapshot(),
+            'timeouts': {'connect': self.timeout[0], 'read': self.timeout[1]},
+            'max_retries': self.max_retries,
+            **counts
+        }
+
+class DifyClient(_DifyClientBase):
+    """
+    Dify Knowledge retrieve API 클라이언트 (스레드 간 공유)
+
+    Args:
+        base_url: Dify API URL (예: http://host:5001/v1)
+        connect_timeout / read_timeout: 연결 / 응답 대기 타임아웃(초)
+        max_retries: 재시도 횟수 (최초 호출 제외)
+        backoff: 재시도 대기 기본값(초), 시도마다 2배 + 0~100% 지터
+        pool_size: 호스트당 유지할 keep-alive 연결 수 (검색 워커 수 이상 권장)
+        breaker: 서킷 브레이커 (없으면 기본값으로 생성)
+    """
+
+    def __init__(self, base_url: str, api_key: str, dataset_id: str, connect_timeout: float = 3.0,
+                 read_timeout: float = 10.0, max_retries: int = 2, backoff: float = 0.2, pool_size: int = 8,
+                 breaker: Optional[CircuitBreaker] = None):
+        super().__init__(base_url, dataset_id, connect_timeout, read_timeout, max_retries, backoff, breaker)
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            'Authorization': f'Bearer {api_key}',
+            'Content-Type': 'application/json'
+        })
+        # 재시도는 아래에서 직접 처리 (지터, 서킷 브레이커와 함께 집계)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def retrieve(self, payload: Dict) -> Dict:
+        """
+        /datasets/{id}/retrieve 호출
+
+        Returns:
+            dict: Dify 응답 JSON
+
+        Raises:
+            CircuitOpenError: 서킷이 열려 있어 호출하지 않음
+            requests.exceptions.RequestException: 재시도 후에도 실패
+        """
+        self._begin()
+        start = time.perf_counter()
+        attempt = 0
+        while True:
+            try:
+                response = self.session.post(self.retrieve_url, json=payload, timeout=self.timeout)
+                if response.status_code in RETRY_STATUS and attempt < self.max_retries:
+                    response.close()
+                    raise requests.exceptions.RetryError(f'HTTP {response.status_code}')
+                response.raise_for_status()
+                result = response.json()
+            except (requests.exceptions.ConnectionError, requests.exceptions.RetryError):
+                # ConnectTimeout은 ConnectionError의 하위 클래스 (ReadTimeout은 아래에서 재시도 없이 실패)
+                if attempt < self.max_retries:
+                    attempt += 1
+                    self._count('retries')
+                    time.sleep(self._retry_delay(attempt - 1))
+                    continue
+                self._record_failure(start)
+                raise
+            except requests.exceptions.HTTPError as e:
+                if e.response is not None and self._is_client_error(e.response.status_code):
+                    self._record_client_error(start)
+                else:
+                    self._record_failure(start)
+                raise
+            except (requests.exceptions.RequestException, ValueError):
+                self._record_failure(start)
+                raise
+            except BaseException:
+                # 예상하지 못한 예외도 시험 호출(half_open)을 반납해야 서킷이 계속 닫히지 않음
+                self._record_failure(start)
+                raise
+
+            self._record_success(start)
+            return result
+
+class AsyncDifyClient(_DifyClientBase):
+    """
+    Dify Knowledge retrieve API 비동기 클라이언트 (ASGI 이벤트 루프에서 공유)
+
+    재시도/타임아웃/서킷 브레이커 정책은 DifyClient와 같습니다.
+    pool_size는 동시에 유지할 최대 연결 수입니다.
+    """
+
+    def __init__(self, base_url: str, api_key: str, dataset_id: str, connect_timeout: float = 3.0,
+                 read_timeout: float = 10.0, max_retries: int = 2, backoff: float = 0.2, pool_size: int = 8,
+                 breaker: Optional[CircuitBreaker] = None):
+        super().__init__(base_url, dataset_id, connect_timeout, read_timeout, max_retries, backoff, breaker)
+
+        headers = {'Content-Type': 'application/json'}
+        if api_key:
+            # httpx는 'Bearer '처럼 끝이 공백인 헤더 값을 거부하므로 키가 없으면 헤더 생략
+            headers['Authorization'] = f'Bearer {api_key}'
+        self.client = httpx.AsyncClient(
+            headers=headers,
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        )
+
+    async def retrieve(self, payload: Dict) -> Dict:
+        """
+        /datasets/{id}/retrieve 호출
+
+        Raises:
+            CircuitOpenError: 서킷이 열려 있어 호출하지 않음
+            httpx.HTTPError: 재시도 후에도 실패
+        """
+        self._begin()
+        start = time.perf_counter()
+        attempt = 0
+        while True:
+            try:
+                response = await self.client.post(self.retrieve_url, json=payload)
+                if response.status_code in RETRY_STATUS and attempt < self.max_retries:
+                    raise httpx.HTTPStatusError(f'HTTP {response.status_code}', request=response.request,
+                                                response=response)
+                response.raise_for_status()
+                result = response.json()
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.HTTPStatusError) as e:
+                retryable = not isinstance(e, httpx.HTTPStatusError) or e.response.status_code in RETRY_STATUS
+                if retryable and attempt < self.max_retries:
+                    attempt += 1
+                    self._count('retries')
+                    await asyncio.sleep(self._retry_delay(attempt - 1))
+                    continue
+                if isinstance(e, httpx.HTTPStatusError) and self._is_client_error(e.response.status_code):
+                    self._record_client_error(start)
+                else:
+                    self._record_failure(start)
+                raise
+            except (httpx.HTTPError, ValueError):
+                self._record_failure(start)
+                raise
+            except BaseException:
+                # 호출 쪽 시간 제한(asyncio.wait_for)으로 취소된 경우(CancelledError) 포함,
+                # 시험 호출(half_open)을 반납하지 않으면 서킷이 프로세스가 끝날 때까지 열린 채로 남음
+                self._record_failure(start)
+                raise
+
+            self._record_success(start)
+            return result
+
+    async def aclose(self):
+        await self.client.aclose()
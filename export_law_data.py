@@ -2,9 +2,18 @@
 law.xlsx 엑셀 파일을 분석하여 프론트엔드 UI용 마스터 데이터(JSON)를 생성
 - Row-by-Row 상태 머신(State Machine) 알고리즘 적용
 - 불규칙한 엑셀 데이터를 완벽하게 처리
+- 출력 형식: pretty(들여쓰기), minified(공백 제거), chunked(시트별 JSON + 매니페스트, 지연 로딩용)
+- --hash: 내용 해시를 파일명에 넣어 캐시 무효화 (law_data.<hash>.js)
+
+실행: uv run python export_law_data.py [--format pretty|minified|chunked] [--hash]
 """
+import argparse
+import gzip
+import hashlib
 import json
+import os
 import re
+import time
 import pandas as pd
 
 
@@ -75,30 +84,10 @@ def normalize_dataframe(df):
     df['조제목'] = df['조제목'].ffill()
 
     # 항번호 ffill - 단, 조번호가 바뀔 때는 리셋
-    df['_prev_조번호'] = df['조번호'].shift(1)
-    df['_조_changed'] = df['조번호'] != df['_prev_조번호']
-
-    # 조가 바뀌는 지점에서 항번호를 NaN으로 마킹하여 ffill이 넘어가지 않게 함
-    current_para = None
-    para_list = []
-    prev_jo = None
-
-    for idx, row in df.iterrows():
-        jo = row['조번호']
-        para = row['항번호']
-
-        # 조가 바뀌면 항번호 상태 리셋
-        if jo != prev_jo:
-            current_para = para if pd.notna(para) and para != '' else None
-        else:
-            # 같은 조 내에서 항번호가 있으면 업데이트
-            if pd.notna(para) and para != '':
-                current_para = para
-
-        para_list.append(current_para)
-        prev_jo = jo
-
-    df['항번호_filled'] = para_list
+    # 조가 바뀌는 지점마다 그룹 번호를 올리고, 그룹 안에서만 ffill (행 단위 루프 없이 O(n))
+    para = df['항번호'].where(df['항번호'].notna() & (df['항번호'] != ''))
+    jo_group = (df['조번호'] != df['조번호'].shift(1)).cumsum()
+    df['항번호_filled'] = para.groupby(jo_group).ffill()
 
     # 텍스트 컬럼 NaN -> 빈 문자열
     text_cols = ['항내용', '호내용', '조제목']
@@ -106,12 +95,24 @@ def normalize_dataframe(df):
         if col in df.columns:
             df[col] = df[col].fillna('')
 
-    # 임시 컬럼 제거
-    df = df.drop(columns=['_prev_조번호', '_조_changed'], errors='ignore')
-
     return df
 
 
+def _new_paragraph(no, content, sort_key):
+    return {'no': no, 'text': bytearray(content.encode('utf-8')), 'seen': {content}, 'sort_key': sort_key}
+
+
+def _append_line(paragraph, line):
+    """본문에 부분 문자열로 들어 있지 않은 줄만 추가 (UTF-8 바이트 검색은 문자열 검색과 같은 결과)"""
+    if line in paragraph['seen']:
+        return
+    encoded = line.encode('utf-8')
+    if encoded not in paragraph['text']:
+        paragraph['text'] += b'\n' + encoded
+    # 본문은 늘어나기만 하므로 한 번 포함된 줄은 계속 포함됨
+    paragraph['seen'].add(line)
+
+
 def process_sheet_with_state_machine(df, sheet_name):
     """
     Row-by-Row 상태 머신으로 데이터 처리
@@ -120,6 +121,10 @@ def process_sheet_with_state_machine(df, sheet_name):
     - current_article: 현재 처리 중인 조
     - current_paragraph: 현재 처리 중인 항
     - prev_para_content: 이전 행의 항내용 (중복 방지용)
+
+    항 내용은 UTF-8 bytearray(text)에 제자리로 이어 붙이고 마지막에 한 번만 디코딩합니다
+    (누적 문자열을 줄마다 복사하지 않음). 중복 규칙은 이전과 같이 "이미 쌓인 본문에 부분 문자열로
+    들어 있으면 추가하지 않음"이며, 이미 확인한 줄은 집합(seen)으로 바로 걸러 검색을 생략합니다.
     """
     result = {}
 
@@ -175,33 +180,29 @@ def process_sheet_with_state_machine(df, sheet_name):
                 content = f"{circle_num}" if circle_num else ''
 
             if current_para_num not in articles_data[article_key]:
-                articles_data[article_key][current_para_num] = {
-                    'no': circle_num,
-                    'content': content,
-                    'sort_key': extract_number_for_sort(para_num)
-                }
+                articles_data[article_key][current_para_num] = _new_paragraph(
+                    circle_num, content, extract_number_for_sort(para_num)
+                )
 
             prev_para_content = para_content
 
         # 같은 항 내에서 호 추가 (Case B)
         elif para_num_str and para_num_str == current_para_num:
+            paragraph = articles_data[article_key].get(current_para_num)
+
             # 호 내용 추가
             if ho_num is not None and safe_str(ho_num) and ho_content:
                 ho_formatted = format_ho_number(ho_num)
                 ho_text = f"  {ho_formatted} {ho_content}"
 
-                if current_para_num in articles_data[article_key]:
-                    existing = articles_data[article_key][current_para_num]['content']
-                    # 중복 방지: 동일한 호 내용이 이미 있으면 추가하지 않음
-                    if ho_text not in existing:
-                        articles_data[article_key][current_para_num]['content'] = existing + "\n" + ho_text
+                # 중복 방지: 동일한 호 내용이 이미 있으면 추가하지 않음
+                if paragraph is not None:
+                    _append_line(paragraph, ho_text)
 
             # 항내용이 이전과 다르면 추가 (중복 방지)
             elif para_content and para_content != prev_para_content:
-                if current_para_num in articles_data[article_key]:
-                    existing = articles_data[article_key][current_para_num]['content']
-                    if para_content not in existing:
-                        articles_data[article_key][current_para_num]['content'] = existing + "\n" + para_content
+                if paragraph is not None:
+                    _append_line(paragraph, para_content)
                 prev_para_content = para_content
 
         # 항번호 없이 호만 있는 경우 (Case 2)
@@ -211,22 +212,18 @@ def process_sheet_with_state_machine(df, sheet_name):
 
             if ho_key not in articles_data[article_key]:
                 content = f"{ho_formatted} {ho_content}" if ho_content else ho_formatted
-                articles_data[article_key][ho_key] = {
-                    'no': '',
-                    'content': content,
-                    'sort_key': extract_number_for_sort(ho_num) + 1000  # 항 뒤에 정렬되도록
-                }
+                articles_data[article_key][ho_key] = _new_paragraph(
+                    '', content, extract_number_for_sort(ho_num) + 1000  # 항 뒤에 정렬되도록
+                )
 
     # 결과 정리: 조별로 항 목록 생성
     for article_key, paras_dict in articles_data.items():
         if paras_dict:
             # 정렬
-            paras_list = list(paras_dict.values())
-            paras_list.sort(key=lambda x: x.get('sort_key', float('inf')))
+            paras_list = sorted(paras_dict.values(), key=lambda x: x.get('sort_key', float('inf')))
 
-            # sort_key 제거
-            for p in paras_list:
-                p.pop('sort_key', None)
+            # 본문을 한 번만 디코딩 (sort_key, seen 제거)
+            paras_list = [{'no': p['no'], 'content': p['text'].decode('utf-8')} for p in paras_list]
 
             # 빈 content 제거
             paras_list = [p for p in paras_list if p['content'].strip()]
@@ -262,25 +259,130 @@ def process_all_sheets(filepath='data/law.xlsx'):
     return result
 
 
-def generate_js_file(data, output_path='design/law_data.js'):
-    """JS 파일 생성"""
-    js_code = """// ============================================
+JS_HEADER = """// ============================================
 // 법령 데이터 (law.xlsx에서 추출한 마스터 데이터)
 // 구조: 시트명(규정) > 조(full_title) > 항(리스트)
 // Row-by-Row 상태 머신 알고리즘 적용
 // ============================================
+"""
+
+# chunked 형식의 매니페스트 + 시트 로더 (시트 데이터는 처음 열 때 fetch)
+MANIFEST_JS_TEMPLATE = """const LAW_DATA_MANIFEST = %s;
+
+const LAW_DATA_CACHE = {};
+
+function loadLawSheet(sheetName) {
+  if (!LAW_DATA_CACHE[sheetName]) {
+    const sheet = LAW_DATA_MANIFEST.sheets.find((s) => s.name === sheetName);
+    if (!sheet) {
+      return Promise.reject(new Error('Unknown sheet: ' + sheetName));
+    }
+    LAW_DATA_CACHE[sheetName] = fetch(LAW_DATA_MANIFEST.base + sheet.file).then((r) => r.json());
+  }
+  return LAW_DATA_CACHE[sheetName];
+}
+"""
 
-const LAW_DATA = %s;
-""" % json.dumps(data, ensure_ascii=False, indent=2)
 
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(js_code)
+def dump_json(data, minify=True):
+    """JSON 직렬화 (minify면 공백 없는 구분자)"""
+    if minify:
+        return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    return json.dumps(data, ensure_ascii=False, indent=2)
 
-    return js_code
 
+def content_hash(text, length=10):
+    """파일명용 내용 해시 (캐시 무효화)"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:length]
 
-def main():
+
+def hashed_path(path, text):
+    """design/law_data.js -> design/law_data.<hash>.js"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.{content_hash(text)}{ext}"
+
+
+def write_text(path, text):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def generate_js_file(data, output_path='design/law_data.js', minify=False, hashed=False):
+    """
+    JS 파일 생성 (const LAW_DATA = {...};)
+
+    Returns:
+        tuple: (실제 출력 경로, JS 코드)
+    """
+    js_code = JS_HEADER + "\nconst LAW_DATA = %s;\n" % dump_json(data, minify)
+    if hashed:
+        output_path = hashed_path(output_path, js_code)
+
+    write_text(output_path, js_code)
+    return output_path, js_code
+
+
+def generate_chunked_files(data, output_dir='design/law_data', manifest_path='design/law_data.manifest.js'):
+    """
+    시트별 JSON 청크 + 매니페스트 생성 (지연 로딩용)
+
+    - 청크: <output_dir>/<순번>.<내용 해시>.json (내용이 같으면 파일명도 같아 장기 캐시 가능)
+    - 매니페스트: LAW_DATA_MANIFEST(시트명, 조 수, 청크 파일명) + loadLawSheet(시트명) 로더
+
+    Returns:
+        tuple: (매니페스트 경로, 매니페스트 JS 코드, {시트명: 청크 JSON})
+    """
+    chunks = {}
+    sheets = []
+    for index, (sheet_name, articles) in enumerate(data.items()):
+        body = dump_json(articles)
+        file_name = f"{index:02d}.{content_hash(body)}.json"
+        write_text(os.path.join(output_dir, file_name), body)
+        chunks[sheet_name] = body
+        sheets.append({
+            'name': sheet_name,
+            'file': file_name,
+            'articles': len(articles),
+            'bytes': len(body.encode('utf-8'))
+        })
+
+    manifest = {
+        'version': content_hash(''.join(sheet['file'] for sheet in sheets)),
+        'base': '/' + output_dir.strip('/') + '/',
+        'sheets': sheets
+    }
+    manifest_js = JS_HEADER + "\n" + MANIFEST_JS_TEMPLATE % dump_json(manifest)
+    write_text(manifest_path, manifest_js)
+    return manifest_path, manifest_js, chunks
+
+
+def measure_payload(text, json_text=None):
+    """바이트 수, gzip 바이트 수, JSON 파싱 시간(ms, 브라우저 JSON.parse 대용)"""
+    raw = text.encode('utf-8')
+    start = time.perf_counter()
+    json.loads(json_text if json_text is not None else text)
+    parse_ms = (time.perf_counter() - start) * 1000
+    return len(raw), len(gzip.compress(raw, 9)), parse_ms
+
+
+def print_size_report(rows):
+    """[(이름, 바이트, gzip 바이트, 파싱 ms)] 표 출력"""
+    print(f"  {'output':<34} {'bytes':>11} {'gzip':>10} {'parse ms':>9}")
+    for name, size, gz_size, parse_ms in rows:
+        print(f"  {name:<34} {size:>11,} {gz_size:>10,} {parse_ms:>9.2f}")
+
+
+def main(argv=None):
     """메인 실행 함수"""
+    parser = argparse.ArgumentParser(description='law.xlsx -> law_data.js 변환')
+    parser.add_argument('--input', default='data/law.xlsx')
+    parser.add_argument('--output', default='design/law_data.js')
+    parser.add_argument('--format', choices=('pretty', 'minified', 'chunked'), default='minified',
+                        help='pretty: 들여쓰기, minified: 공백 제거, chunked: 시트별 JSON + 매니페스트')
+    parser.add_argument('--hash', action='store_true', help='파일명에 내용 해시 추가 (pretty/minified)')
+    args = parser.parse_args(argv)
+
     print("=" * 50)
     print("law.xlsx -> law_data.js 변환 시작")
     print("(Row-by-Row State Machine Algorithm)")
@@ -288,7 +390,7 @@ def main():
 
     # 1. 모든 시트 처리
     print("\n[1/2] 엑셀 파일 로딩 및 상태 머신 처리...")
-    result = process_all_sheets('data/law.xlsx')
+    result = process_all_sheets(args.input)
 
     # 통계 출력
     print(f"  - 처리된 시트 수: {len(result)}")
@@ -303,11 +405,36 @@ def main():
     print(f"\n  - 총 조항 수: {total_articles}")
     print(f"  - 총 항 수: {total_paragraphs}")
 
-    # 2. JS 파일 생성
-    print("\n[2/2] JS 파일 생성...")
-    js_code = generate_js_file(result)
-    print(f"  - 출력 파일: design/law_data.js")
-    print(f"  - 파일 크기: {len(js_code):,} bytes")
+    # 2. 출력 파일 생성
+    print(f"\n[2/2] 출력 파일 생성 ({args.format})...")
+    pretty_json = dump_json(result, minify=False)
+    report = [('pretty (baseline)', *measure_payload(pretty_json))]
+
+    if args.format == 'chunked':
+        output_dir = os.path.splitext(args.output)[0]
+        manifest_path, manifest_js, chunks = generate_chunked_files(
+            result, output_dir=output_dir, manifest_path=os.path.splitext(args.output)[0] + '.manifest.js'
+        )
+        manifest_json = manifest_js[manifest_js.index('= ') + 2:manifest_js.index(';\n')]
+        report.append((os.path.basename(manifest_path) + ' (initial)', *measure_payload(manifest_js, manifest_json)))
+        largest = max(chunks.items(), key=lambda item: len(item[1]), default=None)
+        if largest:
+            report.append(('largest chunk', *measure_payload(largest[1])))
+        total = ''.join(chunks.values())
+        print(f"  - 매니페스트: {manifest_path}")
+        print(f"  - 청크: {output_dir}/ ({len(chunks)}개, 합계 {len(total.encode('utf-8')):,} bytes)")
+    else:
+        output_path, js_code = generate_js_file(result, args.output, minify=args.format == 'minified',
+                                                hashed=args.hash)
+        json_text = dump_json(result, minify=args.format == 'minified')
+        report.append((os.path.basename(output_path), *measure_payload(js_code, json_text)))
+        print(f"  - 출력 파일: {output_path}")
+        print(f"  - 파일 크기: {len(js_code.encode('utf-8')):,} bytes")
+        if args.hash:
+            print(f"  - HTML의 <script src>를 {os.path.basename(output_path)}로 변경하세요")
+
+    print("\n  [크기 / 파싱 시간]")
+    print_size_report(report)
 
     print("\n" + "=" * 50)
     print("변환 완료!")
@@ -0,0 +1,261 @@
+"""
+FAQ 로컬 검색 인덱스
+
+[FaqNgramMatcher] 로컬 FAQ 매칭 (search_faq_local)
+- FAQ 질문 문자 n-gram을 서버 시작 시 1회 계산해 역색인(n-gram -> FAQ 번호 배열)으로 보관
+- 질문의 n-gram 역색인 목록을 합쳐 np.bincount 한 번으로 전체 FAQ 교집합 크기 계산
+- 자카드 유사도 top-k
+
+[FaqVectorIndex] 로컬 벡터 인덱스 (Dify Knowledge 원격 검색 대체)
+- FAQ 질문을 문자 n-gram TF-IDF 벡터(feature hashing, NumPy 행렬)로 미리 계산
+- 행렬은 디스크(.npz)에 캐시하고, FAQ 내용이 바뀌면 다시 생성
+- 질문 1건당 질문 n-gram 차원의 행만 곱해 전체 FAQ 코사인 유사도를 한 번에 계산 후 top-k
+- 코사인 점수에 어휘 일치 점수(질문 2-gram 포함 비율)를 섞은 hybrid 점수
+- 결과는 Dify Knowledge API의 records와 같은 형식
+"""
+import hashlib
+import os
+import zlib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from response_cache import NGRAM_SIZE, normalize_question, question_ngrams
+
+FAQ_INDEX_VERSION = 2
+
+def _char_ngrams(normalized: str, sizes: Sequence[int]) -> List[str]:
+    """공백을 제거한 문자 n-gram 목록 (중복 포함, TF 계산용)"""
+    compact = normalized.replace(' ', '')
+    grams = []
+    for n in sizes:
+        if len(compact) < n:
+            continue
+        grams.extend(compact[i:i + n] for i in range(len(compact) - n + 1))
+    return grams or ([compact] if compact else [])
+
+def _hash_counts(text: str, dim: int, sizes: Sequence[int]) -> Dict[int, int]:
+    """n-gram을 고정 차원으로 해싱한 {차원: 빈도} (crc32는 프로세스 간 동일하므로 디스크 캐시와 호환)"""
+    counts = {}
+    for gram in _char_ngrams(normalize_question(text), sizes):
+        idx = zlib.crc32(gram.encode('utf-8')) % dim
+        counts[idx] = counts.get(idx, 0) + 1
+    return counts
+
+def _faq_content(faq: Dict) -> str:
+    """Dify FAQ 문서와 같은 CSV 형식 본문 (extract_faq_id_from_content / build_context_prompt 호환)"""
+    return f'"faq_id":"{faq["faq_id"]}";"question":"{faq["question"]}";"answer_text":"{faq["answer_text"]}"'
+
+class FaqNgramMatcher:
+    """
+    FAQ 질문 문자 n-gram 자카드 매처
+
+    공백 단위 토큰은 조사(은/는/을)가 붙으면 일치하지 않으므로 공백을 제거한 문자 n-gram을 씁니다.
+
+    Args:
+        faqs: [{'faq_id', 'question'}] FAQ 목록
+        n: 문자 n-gram 길이
+    """
+
+    def __init__(self, faqs: List[Dict], n: int = NGRAM_SIZE):
+        self.n = n
+        self.faqs = []
+        postings = {}
+        sizes = []
+        for faq in faqs:
+            if not faq.get('faq_id') or not faq.get('question'):
+                continue
+            grams = question_ngrams(normalize_question(str(faq['question'])), n)
+            if not grams:
+                continue
+            idx = len(self.faqs)
+            self.faqs.append({'faq_id': str(faq['faq_id']), 'question': str(faq['question'])})
+            sizes.append(len(grams))
+            for gram in grams:
+                postings.setdefault(gram, []).append(idx)
+
+        self._postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+        self._sizes = np.array(sizes, dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self.faqs)
+
+    def scores(self, query: str) -> np.ndarray:
+        """전체 FAQ와의 자카드 유사도 (질문 n-gram 역색인 목록만 읽음)"""
+        grams = question_ngrams(normalize_question(query), self.n)
+        lists = [self._postings[gram] for gram in grams if gram in self._postings]
+        if not lists:
+            return np.zeros(len(self.faqs), dtype=np.float64)
+        overlap = np.bincount(np.concatenate(lists), minlength=len(self.faqs))
+        return overlap / (len(grams) + self._sizes - overlap)
+
+    def search(self, query: str, top_k: int = 1, min_score: float = 0.0) -> List[Dict]:
+        """
+        자카드 유사도 상위 FAQ
+
+        Returns:
+            list: [{'faq_id', 'question', 'score'}] (점수 내림차순)
+        """
+        if not self.faqs or top_k <= 0:
+            return []
+
+        scores = self.scores(query)
+        if top_k < len(scores):
+            top_idx = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            top_idx = np.arange(len(scores))
+        top_idx = top_idx[np.argsort(-scores[top_idx], kind='stable')]
+
+        return [
+            {'faq_id': self.faqs[i]['faq_id'], 'question': self.faqs[i]['question'], 'score': float(scores[i])}
+            for i in top_idx.tolist()
+            if scores[i] > 0 and scores[i] >= min_score
+        ]
+
+class FaqVectorIndex:
+    """
+    FAQ 질문 벡터 인덱스
+
+    Args:
+        faqs: [{'faq_id', 'question', 'answer_text'}] FAQ 목록
+        dim: 해싱 벡터 차원
+        ngram_sizes: 사용할 문자 n-gram 길이
+        lexical_weight: hybrid 점수에서 어휘 일치 점수 비중 (0~1)
+        cache_path: 행렬 캐시 파일 경로 (.npz, None이면 캐시하지 않음)
+    """
+
+    def __init__(self, faqs: List[Dict], dim: int = 1024, ngram_sizes: Sequence[int] = (2, 3),
+                 lexical_weight: float = 0.3, cache_path: Optional[str] = None):
+        self.dim = dim
+        self.ngram_sizes = tuple(ngram_sizes)
+        self.lexical_weight = lexical_weight
+        self.cache_path = cache_path
+
+        self.faqs = [
+            {
+                'faq_id': str(faq['faq_id']),
+                'question': str(faq.get('question') or ''),
+                'answer_text': str(faq.get('answer_text') or '')
+            }
+            for faq in faqs if faq.get('faq_id') and faq.get('question')
+        ]
+        self.fingerprint = self._fingerprint()
+        self.loaded_from_cache = bool(cache_path) and self._load(cache_path)
+        if not self.loaded_from_cache:
+            self._build()
+            if cache_path:
+                self._save(cache_path)
+
+        # 어휘 일치 점수용 질문 2-gram 집합 (계산이 가벼워 캐시하지 않음)
+        self._question_grams = [question_ngrams(normalize_question(faq['question'])) for faq in self.faqs]
+
+    def __len__(self) -> int:
+        return len(self.faqs)
+
+    def _fingerprint(self) -> str:
+        """FAQ 내용 + 인덱스 설정 해시 (캐시 유효성 검사용)"""
+        digest = hashlib.sha1(f'{FAQ_INDEX_VERSION}|{self.dim}|{self.ngram_sizes}'.encode('utf-8'))
+        for faq in self.faqs:
+            digest.update(f"\x00{faq['faq_id']}\x01{faq['question']}".encode('utf-8'))
+        return digest.hexdigest()
+
+    def _build(self):
+        """TF-IDF 행렬 생성 (sublinear TF, 행 단위 L2 정규화)"""
+        rows = [_hash_counts(faq['question'], self.dim, self.ngram_sizes) for faq in self.faqs]
+
+        doc_freq = np.zeros(self.dim, dtype=np.float32)
+        for counts in rows:
+            doc_freq[list(counts)] += 1
+        self.idf = (np.log((1 + len(rows)) / (1 + doc_freq)) + 1).astype(np.float32)
+
+        matrix = np.zeros((len(rows), self.dim), dtype=np.float32)
+        for i, counts in enumerate(rows):
+            if counts:
+                idx = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+                tf = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+                matrix[i, idx] = (1 + np.log(tf)) * self.idf[idx]
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms == 0, 1, norms)
+        # 차원(n-gram 해시) 우선 배치: 질문 벡터의 0이 아닌 차원 행만 읽어 점수 계산
+        self.term_matrix = np.ascontiguousarray(matrix.T)
+
+    def _load(self, path: str) -> bool:
+        """캐시 파일이 현재 FAQ 내용과 일치하면 행렬 로드"""
+        try:
+            with np.load(path, allow_pickle=False) as cached:
+                if str(cached['fingerprint']) != self.fingerprint:
+                    return False
+                self.term_matrix = cached['term_matrix']
+                self.idf = cached['idf']
+            return self.term_matrix.shape == (self.dim, len(self.faqs))
+        except (OSError, KeyError, ValueError):
+            return False
+
+    def _save(self, path: str):
+        """임시 파일에 쓴 뒤 교체 (동시에 시작한 다른 워커가 깨진 파일을 읽지 않도록)"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, term_matrix=self.term_matrix, idf=self.idf, fingerprint=np.array(self.fingerprint))
+        os.replace(tmp_path, path)
+
+    def embed(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """질문을 FAQ 행렬과 같은 공간의 정규화 희소 벡터 (차원 인덱스, 값)로 변환"""
+        counts = _hash_counts(text, self.dim, self.ngram_sizes)
+        idx = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        tf = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+        values = (1 + np.log(tf)) * self.idf[idx]
+        norm = np.linalg.norm(values)
+        return idx, (values / norm if norm > 0 else values)
+
+    def cosine_scores(self, query: str) -> np.ndarray:
+        """전체 FAQ와의 코사인 유사도 (질문 n-gram 수만큼의 행만 읽는 벡터화 계산)"""
+        idx, values = self.embed(query)
+        if not len(idx):
+            return np.zeros(len(self.faqs), dtype=np.float32)
+        return values @ self.term_matrix[idx]
+
+    def search(self, query: str, top_k: int = 3, min_score: float = 0.0) -> List[Dict]:
+        """
+        hybrid 점수 상위 FAQ 검색
+
+        코사인 상위 top_k * 4개 후보만 어휘 일치 점수를 계산해 재정렬합니다.
+
+        Returns:
+            list: Dify records 형식 [{'score', 'segment': {'content', 'document': {'name'}}, ...}]
+        """
+        if not self.faqs or top_k <= 0:
+            return []
+
+        cosine = self.cosine_scores(query)
+
+        candidates = min(len(self.faqs), top_k * 4)
+        if candidates < len(self.faqs):
+            candidate_idx = np.argpartition(-cosine, candidates - 1)[:candidates]
+        else:
+            candidate_idx = np.arange(len(self.faqs))
+
+        query_grams = question_ngrams(normalize_question(query))
+        scored = []
+        for i in candidate_idx.tolist():
+            lexical = len(query_grams & self._question_grams[i]) / len(query_grams) if query_grams else 0.0
+            score = (1 - self.lexical_weight) * float(cosine[i]) + self.lexical_weight * lexical
+            if score >= min_score:
+                scored.append((score, float(cosine[i]), lexical, i))
+        scored.sort(reverse=True)
+
+        records = []
+        for score, cosine_score, lexical, i in scored[:top_k]:
+            faq = self.faqs[i]
+            records.append({
+                'score': round(score, 4),
+                'segment': {
+                    'content': _faq_content(faq),
+                    'document': {'name': f"{faq['faq_id']}.md"}
+                },
+                'faq_id': faq['faq_id'],
+                'scores': {'cosine': round(cosine_score, 4), 'lexical': round(lexical, 4)}
+            })
+        return records
@@ -0,0 +1,73 @@
+"""
+FAQ 레코드 저장소 (서버 시작 시 1회 적재, 요청 처리 중에는 pandas 미사용)
+
+- faq_id -> 불변 FaqRecord (NamedTuple) 딕셔너리로 O(1) 조회
+- 비어 있는 셀(NaN/None)은 시작 시 빈 문자열로 정리
+- policy_anchor는 ';' 기준으로 미리 분리해 보관
+"""
+from types import MappingProxyType
+from typing import Dict, Iterable, Iterator, Mapping, NamedTuple, Optional, Tuple
+
+class FaqRecord(NamedTuple):
+    faq_id: str
+    question: str
+    answer_text: str
+    policy_anchor: str
+    policy_anchors: Tuple[str, ...]
+
+def _clean(value) -> str:
+    """엑셀/DB 셀 값을 문자열로 정리 (None, NaN -> '')"""
+    if value is None or value != value:  # NaN은 자기 자신과 같지 않음
+        return ''
+    return str(value).strip()
+
+def split_policy_anchor(policy_anchor: str) -> Tuple[str, ...]:
+    """'A;B;C' 형식 policy_anchor를 빈 항목 없이 분리"""
+    return tuple(anchor.strip() for anchor in policy_anchor.split(';') if anchor.strip())
+
+class FaqStore:
+    """
+    faq_id로 조회하는 불변 FAQ 레코드 저장소
+
+    Args:
+        rows: [{'faq_id', 'question', 'answer_text', 'policy_anchor'}] (DataFrame.to_dict('records') 또는 faqs 테이블 행)
+    """
+
+    def __init__(self, rows: Iterable[Dict]):
+        records = {}
+        for row in rows:
+            faq_id = _clean(row.get('faq_id'))
+            if not faq_id:
+                continue
+            policy_anchor = _clean(row.get('policy_anchor'))
+            records[faq_id] = FaqRecord(
+                faq_id=faq_id,
+                question=_clean(row.get('question')),
+                answer_text=_clean(row.get('answer_text')),
+                policy_anchor=policy_anchor,
+                policy_anchors=split_policy_anchor(policy_anchor)
+            )
+        self._records = MappingProxyType(records)
+        self._policy_map = MappingProxyType({faq_id: r.policy_anchor for faq_id, r in records.items()})
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __iter__(self) -> Iterator[FaqRecord]:
+        return iter(self._records.values())
+
+    def __contains__(self, faq_id) -> bool:
+        return faq_id in self._records
+
+    def get(self, faq_id) -> Optional[FaqRecord]:
+        """faq_id로 레코드 조회 (없으면 None)"""
+        return self._records.get(faq_id)
+
+    @property
+    def policy_map(self) -> Mapping[str, str]:
+        """faq_id -> policy_anchor 읽기 전용 매핑"""
+        return self._policy_map
+
+    def rows(self) -> list:
+        """인덱스 구축용 dict 목록"""
+        return [record._asdict() for record in self._records.values()]
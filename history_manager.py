@@ -0,0 +1,177 @@
+"""
+대화 기록 토큰 예산 관리
+
+- 토큰 수 계산 (tiktoken이 설치되어 있으면 사용, 없으면 문자 기반 근사치)
+- 토큰 예산 안에서 최근 대화만 유지하는 슬라이딩 윈도우
+- (선택) 윈도우 밖으로 밀려난 이전 대화를 요약해 세션별로 캐시하고 재사용
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding('o200k_base')  # gpt-4o 계열 토크나이저
+except Exception:
+    _encoding = None
+
+# Chat 포맷 오버헤드 (OpenAI 권장 근사치)
+TOKENS_PER_MESSAGE = 4
+TOKENS_PER_REPLY = 3
+
+SUMMARY_HEADER = '[이전 대화 요약]'
+
+def count_tokens(text: str) -> int:
+    """
+    텍스트 토큰 수 계산
+
+    tiktoken이 없으면 ASCII 4글자당 1토큰, 한글 등 비 ASCII 1글자당 1토큰으로 근사합니다.
+    """
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+def count_message_tokens(messages: List[Dict]) -> int:
+    """Chat messages 전체 프롬프트 토큰 수 (메시지/응답 포맷 오버헤드 포함)"""
+    return sum(TOKENS_PER_MESSAGE + count_tokens(m.get('content') or '') for m in messages) + TOKENS_PER_REPLY
+
+def _message_key(message: Dict) -> str:
+    """메시지 식별용 해시 (seq가 없는 메시지용, 같은 내용의 메시지는 구분하지 못함)"""
+    return hashlib.sha1(f"{message.get('role')}\x00{message.get('content')}".encode('utf-8')).hexdigest()
+
+def _message_marker(message: Dict):
+    """요약 위치 표시 (세션 저장소의 seq, 없으면 내용 해시)"""
+    seq = message.get('seq')
+    return seq if seq is not None else _message_key(message)
+
+class HistoryManager:
+    """
+    토큰 예산 기반 대화 기록 윈도우
+
+    Args:
+        token_budget: 시스템 프롬프트 + 요약 + 대화 기록의 최대 프롬프트 토큰 수
+        summarizer: 요약 함수 (이전 요약, 새로 밀려난 메시지 목록) -> 요약 텍스트.
+                    None이면 밀려난 대화는 버립니다.
+        summary_token_reserve: 요약용으로 예약할 토큰 수
+        max_cached_summaries: 세션별 요약 캐시 최대 개수 (LRU)
+    """
+
+    def __init__(self, token_budget: int = 3000,
+                 summarizer: Optional[Callable[[str, List[Dict]], str]] = None,
+                 summary_token_reserve: int = 400,
+                 max_cached_summaries: int = 1000):
+        self.token_budget = token_budget
+        self.summarizer = summarizer
+        self.summary_token_reserve = summary_token_reserve if summarizer else 0
+        self.max_cached_summaries = max_cached_summaries
+        self._lock = threading.Lock()
+        # session_id -> (요약 텍스트, 요약에 포함된 마지막 메시지 seq 또는 키)
+        self._summaries = OrderedDict()
+
+    def _get_summary(self, session_id: str) -> Tuple[str, Optional[Union[int, str]]]:
+        with self._lock:
+            cached = self._summaries.get(session_id)
+            if cached is None:
+                return '', None
+            self._summaries.move_to_end(session_id)
+            return cached
+
+    def _set_summary(self, session_id: str, summary: str, last_marker: Union[int, str]):
+        with self._lock:
+            self._summaries[session_id] = (summary, last_marker)
+            self._summaries.move_to_end(session_id)
+            while len(self._summaries) > self.max_cached_summaries:
+                self._summaries.popitem(last=False)
+
+    def _select_window(self, history: List[Dict], available: int) -> int:
+        """예산 안에 들어가는 최근 메시지 시작 인덱스 (최신 메시지 1개는 항상 포함)"""
+        start = len(history)
+        used = 0
+        for idx in range(len(history) - 1, -1, -1):
+            cost = TOKENS_PER_MESSAGE + count_tokens(history[idx].get('content') or '')
+            if used + cost > available and start < len(history):
+                break
+            used += cost
+            start = idx
+        return start
+
+    @staticmethod
+    def _covered_count(dropped: List[Dict], last_marker) -> int:
+        """윈도우 밖 메시지(dropped) 중 이미 요약에 포함된 앞쪽 메시지 수"""
+        if last_marker is None:
+            return 0
+        if isinstance(last_marker, int):
+            # seq는 증가만 하므로 요약한 마지막 메시지가 저장소에서 삭제됐어도 경계를 알 수 있음
+            covered = 0
+            for message in dropped:
+                seq = message.get('seq')
+                if seq is None or seq > last_marker:
+                    break
+                covered += 1
+            return covered
+        for idx in range(len(dropped) - 1, -1, -1):
+            if _message_key(dropped[idx]) == last_marker:
+                return idx + 1
+        return 0
+
+    def _summarize_dropped(self, session_id: str, history: List[Dict], start: int) -> Tuple[str, int]:
+        """
+        윈도우 밖 메시지 요약 (캐시된 요약 이후에 새로 밀려난 메시지만 요약)
+
+        Returns:
+            tuple: (요약 텍스트, 이번에 새로 요약한 메시지 수)
+        """
+        summary, last_marker = self._get_summary(session_id)
+
+        dropped = history[:start]
+        new_messages = dropped[self._covered_count(dropped, last_marker):]
+        if not new_messages:
+            return summary, 0
+
+        summary = self.summarizer(summary, new_messages)
+        self._set_summary(session_id, summary, _message_marker(new_messages[-1]))
+        return summary, len(new_messages)
+
+    def build_messages(self, system_prompt: str, history: List[Dict],
+                       session_id: Optional[str] = None) -> Tuple[List[Dict], Dict]:
+        """
+        시스템 프롬프트 + (요약) + 예산 안의 최근 대화로 messages 구성
+
+        Returns:
+            tuple: (messages, info) info에는 prompt_tokens(추정치)와 윈도우 정보 포함
+        """
+        system_message = {'role': 'system', 'content': system_prompt}
+        available = (self.token_budget - count_message_tokens([system_message])
+                     - self.summary_token_reserve)
+        start = self._select_window(history, available)
+
+        summary = ''
+        newly_summarized = 0
+        if start > 0 and self.summarizer and session_id:
+            try:
+                summary, newly_summarized = self._summarize_dropped(session_id, history, start)
+            except Exception:
+                # 요약 실패 시 밀려난 대화는 버리고 진행 (답변 생성은 계속)
+                summary = ''
+
+        messages = [system_message]
+        if summary:
+            messages.append({'role': 'system', 'content': f'{SUMMARY_HEADER}\n{summary}'})
+        # 세션 저장소의 seq 등은 API로 보내지 않음
+        messages.extend({'role': message['role'], 'content': message['content']} for message in history[start:])
+
+        info = {
+            'prompt_tokens': count_message_tokens(messages),
+            'token_budget': self.token_budget,
+            'history_messages': len(history),
+            'window_messages': len(history) - start,
+            'dropped_messages': start,
+            'summary_used': bool(summary),
+            'newly_summarized': newly_summarized,
+            'tokenizer': 'tiktoken' if _encoding is not None else 'estimate'
+        }
+        return messages, info
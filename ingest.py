@@ -0,0 +1,372 @@
+"""
+법령/FAQ 증분 적재 (to_sql 전체 교체 대신 바뀐 행만 반영)
+
+- 선언한 스키마(UNIQUE 제약, 인덱스, FTS 트리거)를 유지
+  (테이블이 없거나 to_sql로 만든 이전 형식이면 1회만 재생성)
+- law_id / faq_id 기준으로 행 내용 해시(content_hash)를 비교해
+  새 행은 INSERT, 바뀐 행은 UPDATE, 원본에서 사라진 행은 DELETE
+- 원본 순서(sheet_order/row_order)는 해시와 별도로 저장: 행이 옮겨지기만 했으면 위치 컬럼만 UPDATE
+  (upsert/삭제 후에는 rowid가 원본 순서가 아니므로 트리 정렬은 이 컬럼을 사용)
+- 전체 변경을 한 트랜잭션으로 처리 (실패 시 기존 데이터 유지)
+"""
+import datetime
+import hashlib
+import json
+import sqlite3
+import time
+from typing import Callable, Dict, Iterable, Iterator, NamedTuple, Optional, Sequence, Tuple
+
+import database
+
+UPSERT_BATCH_SIZE = 500
+
+# ========================================
+# 스키마
+# ========================================
+
+LAWS_TABLE_SQL = '''
+CREATE TABLE laws (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    law_id TEXT UNIQUE NOT NULL,
+    law_title TEXT NOT NULL,
+    sheet_name TEXT NOT NULL,              -- Sheet 이름 (1단계: 지침 그룹)
+    chapter_num TEXT,
+    chapter_title TEXT,
+    article_num TEXT,                      -- 2단계: 조번호
+    article_title TEXT,
+    paragraph_num REAL,                    -- 3단계: 항번호
+    paragraph_content TEXT,
+    clause_num REAL,
+    clause_content TEXT,
+    item_num TEXT,
+    item_content TEXT,
+    full_text TEXT NOT NULL,
+    first_effective_date DATE,
+    amendment_date DATE,
+    is_active BOOLEAN DEFAULT 1,
+    tag TEXT,                              -- 검색/FTS에서 사용하는 태그 (엑셀 tags 컬럼도 tag로 적재)
+    article_sort INTEGER,                  -- 정렬 키 (database.article_sort_key)
+    paragraph_sort INTEGER,                -- 정렬 키 (database.paragraph_sort_key)
+    sheet_order INTEGER,                   -- 원본 통합문서에서 Sheet 순서
+    row_order INTEGER,                     -- 원본 Sheet 안에서 행 순서 (같은 조/항 순서 안의 동순위 정렬)
+    content_hash TEXT NOT NULL             -- 증분 적재용 행 내용 해시
+)
+'''
+
+LAWS_INDEX_SQL = (
+    'CREATE INDEX IF NOT EXISTS idx_sheet_name ON laws(sheet_name)',
+    'CREATE INDEX IF NOT EXISTS idx_law_title ON laws(law_title)',
+    'CREATE INDEX IF NOT EXISTS idx_article_num ON laws(article_num)',
+    'CREATE INDEX IF NOT EXISTS idx_tags ON laws(tag)',
+)
+
+FAQS_TABLE_SQL = '''
+CREATE TABLE faqs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    faq_id TEXT UNIQUE NOT NULL,
+    question TEXT NOT NULL,
+    answer_text TEXT NOT NULL,
+    policy_anchor TEXT,
+    tag TEXT,
+    last_reviewed_at DATE,
+    source TEXT,
+    content_hash TEXT NOT NULL             -- 증분 적재용 행 내용 해시
+)
+'''
+
+FAQS_INDEX_SQL = (
+    'CREATE INDEX IF NOT EXISTS idx_faq_question ON faqs(question)',
+    'CREATE INDEX IF NOT EXISTS idx_policy_anchor ON faqs(policy_anchor)',
+)
+
+# 엑셀 헤더 → laws 컬럼
+LAW_COLUMN_MAP = {
+    '장번호': 'chapter_num',
+    '장제목': 'chapter_title',
+    '조번호': 'article_num',
+    '조제목': 'article_title',
+    '항번호': 'paragraph_num',
+    '항내용': 'paragraph_content',
+    '호번호': 'clause_num',
+    '호내용': 'clause_content',
+    '목번호': 'item_num',
+    '목내용': 'item_content',
+    '최초시행일': 'first_effective_date',
+    '개정일': 'amendment_date',
+    'tags': 'tag',
+}
+
+FAQ_COLUMN_MAP = {
+    'tags': 'tag',
+}
+
+def _law_sort_columns(row: Dict) -> Dict:
+    return {
+        'article_sort': database.article_sort_key(row.get('article_num')),
+        'paragraph_sort': database.paragraph_sort_key(row.get('paragraph_num')),
+    }
+
+class TableSpec(NamedTuple):
+    """증분 적재 대상 테이블 정의"""
+    table: str
+    key: str
+    columns: Tuple[str, ...]              # 원본에서 읽는 컬럼 (해시 대상)
+    column_map: Dict[str, str]            # 원본 헤더 → 컬럼명
+    required: Tuple[str, ...]             # NOT NULL 컬럼 (비어 있으면 행 건너뜀)
+    create_sql: str
+    index_sql: Tuple[str, ...]
+    derived: Optional[Callable[[Dict], Dict]] = None  # 원본 컬럼으로 계산하는 컬럼
+    positions: Tuple[str, ...] = ()       # 원본 위치 컬럼 (해시 제외, 호출부에서 normalize_row(**extra)로 전달)
+
+LAWS = TableSpec(
+    table='laws',
+    key='law_id',
+    columns=('law_id', 'law_title', 'sheet_name', 'chapter_num', 'chapter_title', 'article_num',
+             'article_title', 'paragraph_num', 'paragraph_content', 'clause_num', 'clause_content',
+             'item_num', 'item_content', 'full_text', 'first_effective_date', 'amendment_date',
+             'is_active', 'tag'),
+    column_map=LAW_COLUMN_MAP,
+    required=('law_id', 'law_title', 'sheet_name', 'full_text'),
+    create_sql=LAWS_TABLE_SQL,
+    index_sql=LAWS_INDEX_SQL,
+    derived=_law_sort_columns,
+    positions=('sheet_order', 'row_order'),
+)
+
+FAQS = TableSpec(
+    table='faqs',
+    key='faq_id',
+    columns=('faq_id', 'question', 'answer_text', 'policy_anchor', 'tag', 'last_reviewed_at', 'source'),
+    column_map=FAQ_COLUMN_MAP,
+    required=('faq_id', 'question', 'answer_text'),
+    create_sql=FAQS_TABLE_SQL,
+    index_sql=FAQS_INDEX_SQL,
+)
+
+# ========================================
+# 행 정규화 / 해시
+# ========================================
+
+def normalize_value(value):
+    """엑셀/pandas 셀 값을 SQLite 저장값으로 정리 (NaN/NaT → None, 날짜 → 'YYYY-MM-DD')"""
+    if value is None:
+        return None
+    if isinstance(value, float):
+        if value != value:  # NaN
+            return None
+        # pandas는 빈 셀이 섞인 정수 컬럼을 float로 읽음 → 읽는 방식과 관계없이 같은 값/해시가 되도록 정수로
+        return int(value) if value.is_integer() else value
+    if isinstance(value, datetime.datetime):
+        if value != value:  # pandas NaT
+            return None
+        return value.date().isoformat() if value.time() == datetime.time() else value.isoformat(sep=' ')
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    if hasattr(value, 'item'):  # numpy 스칼라
+        return normalize_value(value.item())
+    if isinstance(value, str):
+        return value if value.strip() else None
+    return value
+
+def normalize_row(spec: TableSpec, raw: Dict, **extra) -> Dict:
+    """원본 행(헤더 → 값)을 테이블 컬럼 dict로 변환 (정의되지 않은 컬럼은 무시)"""
+    row = dict.fromkeys(spec.columns)
+    for header, value in raw.items():
+        column = spec.column_map.get(str(header).strip(), str(header).strip())
+        if column in row:
+            row[column] = normalize_value(value)
+    row.update(extra)
+    if row.get(spec.key) is not None:
+        row[spec.key] = str(row[spec.key])
+    return row
+
+def iter_excel_rows(path: str, sheet_names: Optional[Sequence[str]] = None) -> Iterator[Tuple[str, Dict]]:
+    """
+    엑셀 파일을 스트리밍으로 읽어 (sheet_name, {헤더: 값}) 행을 하나씩 반환
+
+    openpyxl read_only 모드로 행 단위로 읽으므로 통합문서 크기와 관계없이 메모리 사용량이
+    일정합니다. 각 Sheet의 첫 행을 헤더로 사용하고, 값이 모두 비어 있는 행은 건너뜁니다.
+
+    Args:
+        sheet_names: 읽을 Sheet (None이면 전체, 통합문서 순서)
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for sheet_name in (sheet_names or workbook.sheetnames):
+            rows = workbook[sheet_name].iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                continue
+            header = [str(cell).strip() if cell is not None else '' for cell in header]
+            for values in rows:
+                if all(value is None or value == '' for value in values):
+                    continue
+                yield sheet_name, {name: value for name, value in zip(header, values) if name}
+    finally:
+        workbook.close()
+
+def excel_sheet_names(path: str) -> list:
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True)
+    try:
+        return list(workbook.sheetnames)
+    finally:
+        workbook.close()
+
+def row_hash(spec: TableSpec, row: Dict) -> str:
+    values = [row.get(column) for column in spec.columns]
+    return hashlib.sha1(json.dumps(values, ensure_ascii=False, default=str).encode('utf-8')).hexdigest()
+
+# ========================================
+# 스키마 확인 / 동기화
+# ========================================
+
+def _has_declared_schema(conn: sqlite3.Connection, spec: TableSpec) -> bool:
+    """content_hash 컬럼과 키 UNIQUE 제약이 있는 테이블인지 (to_sql로 만든 테이블은 False)"""
+    columns = {row[1] for row in conn.execute(f'PRAGMA table_info({spec.table})')}
+    if 'content_hash' not in columns or not set(spec.columns + spec.positions) <= columns:
+        return False
+    for index in conn.execute(f'PRAGMA index_list({spec.table})'):
+        if index[2]:  # unique
+            index_columns = [row[2] for row in conn.execute(f"PRAGMA index_info('{index[1]}')")]
+            if index_columns == [spec.key]:
+                return True
+    return False
+
+def ensure_table(conn: sqlite3.Connection, spec: TableSpec) -> bool:
+    """
+    선언한 스키마로 테이블/인덱스 준비
+
+    Returns:
+        bool: 테이블을 새로 만들었는지 (기존 행은 모두 다시 적재됨)
+    """
+    recreated = False
+    if not database.table_exists(conn, spec.table) or not _has_declared_schema(conn, spec):
+        conn.execute(f'DROP TABLE IF EXISTS {spec.table}')
+        conn.execute(spec.create_sql)
+        recreated = True
+    for sql in spec.index_sql:
+        conn.execute(sql)
+    if spec.table == 'laws':
+        database.create_laws_tree_indexes(conn)
+    return recreated
+
+def sync_table(conn: sqlite3.Connection, spec: TableSpec, rows: Iterable[Dict],
+               batch_size: int = UPSERT_BATCH_SIZE) -> Dict:
+    """
+    원본 행으로 테이블을 증분 동기화 (한 트랜잭션)
+
+    Args:
+        rows: normalize_row()로 정리한 행 (순회하면서 바로 처리하므로 제너레이터 가능)
+
+    Returns:
+        dict: {'table', 'inserted', 'updated', 'deleted', 'unchanged', 'moved', 'skipped', 'duplicates',
+               'recreated', 'elapsed'} ('moved'는 내용은 같고 원본 위치만 바뀐 행, unchanged에도 포함)
+    """
+    start = time.perf_counter()
+    columns = (spec.columns + (('article_sort', 'paragraph_sort') if spec.derived else ())
+               + spec.positions + ('content_hash',))
+    upsert_sql = (
+        f'INSERT INTO {spec.table} ({", ".join(columns)}) VALUES ({", ".join("?" * len(columns))}) '
+        f'ON CONFLICT({spec.key}) DO UPDATE SET '
+        + ', '.join(f'{column} = excluded.{column}' for column in columns if column != spec.key)
+    )
+    move_sql = (f'UPDATE {spec.table} SET {", ".join(f"{column} = ?" for column in spec.positions)} '
+                f'WHERE {spec.key} = ?')
+    counts = dict.fromkeys(('inserted', 'updated', 'deleted', 'unchanged', 'moved', 'skipped', 'duplicates'), 0)
+
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        recreated = ensure_table(conn, spec)
+        existing = {
+            row[0]: (row[1], tuple(row[2:]))
+            for row in conn.execute(f'SELECT {", ".join((spec.key, "content_hash") + spec.positions)} '
+                                    f'FROM {spec.table}')
+        }
+        seen = set()
+        batch = []
+        moves = []
+        for row in rows:
+            key = row.get(spec.key)
+            if any(row.get(column) is None for column in spec.required):
+                counts['skipped'] += 1
+                continue
+            if key in seen:
+                counts['duplicates'] += 1  # 같은 키가 다시 나오면 첫 행 유지
+                continue
+            seen.add(key)
+
+            digest = row_hash(spec, row)
+            previous, previous_positions = existing.get(key, (None, None))
+            positions = tuple(row.get(column) for column in spec.positions)
+            if previous == digest:
+                counts['unchanged'] += 1
+                if positions != previous_positions:
+                    # 내용이 같으면 위치 컬럼만 갱신 (FTS 트리거는 검색 컬럼이 바뀔 때만 실행)
+                    counts['moved'] += 1
+                    moves.append(positions + (key,))
+                continue
+            counts['inserted' if previous is None else 'updated'] += 1
+
+            values = [row.get(column) for column in spec.columns]
+            if spec.derived:
+                values.extend(spec.derived(row).values())
+            values.extend(positions)
+            values.append(digest)
+            batch.append(values)
+            if len(batch) >= batch_size:
+                conn.executemany(upsert_sql, batch)
+                batch.clear()
+        if batch:
+            conn.executemany(upsert_sql, batch)
+        if moves:
+            conn.executemany(move_sql, moves)
+
+        if existing and not seen:
+            # 헤더가 바뀌는 등으로 유효한 행이 하나도 없으면 전체 삭제 대신 중단
+            raise ValueError(f'{spec.table}: no valid rows in source (required: {", ".join(spec.required)})')
+
+        removed = [(key,) for key in existing if key not in seen]
+        conn.executemany(f'DELETE FROM {spec.table} WHERE {spec.key} = ?', removed)
+        counts['deleted'] = len(removed)
+
+        if spec.table == 'laws':
+            if recreated or not database.has_laws_fts(conn) or not database.has_laws_bigram(conn):
+                # 테이블 재생성 시 트리거가 함께 삭제되므로 FTS/bigram 인덱스와 트리거 재구축
+                database.build_laws_fts(conn)
+            elif (counts['inserted'] or counts['updated']) and database.laws_bigram_outgrown(conn):
+                # 위치 테이블보다 긴 행은 트리거가 끝까지 색인하지 못하므로 bigram만 재구축
+                database.build_laws_bigram(conn)
+        if recreated or counts['inserted'] or counts['updated'] or counts['deleted']:
+            conn.execute(f'ANALYZE {spec.table}')
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    return {
+        'table': spec.table,
+        **counts,
+        'recreated': recreated,
+        'elapsed': round(time.perf_counter() - start, 3)
+    }
+
+def has_changes(report: Dict) -> bool:
+    """내용 변경 여부 (위치만 바뀐 행은 제외)"""
+    return bool(report['recreated'] or report['inserted'] or report['updated'] or report['deleted'])
+
+def print_sync_report(report: Dict):
+    """sync_table() 결과 출력 (변환 스크립트용)"""
+    print(f"   - {report['table']}: 추가 {report['inserted']}개, 수정 {report['updated']}개, "
+          f"삭제 {report['deleted']}개, 변경 없음 {report['unchanged']}개 ({report['elapsed']:.3f}s)")
+    if report['recreated']:
+        print(f"     * 선언한 스키마로 {report['table']} 테이블을 새로 만들었습니다 (이전 형식 테이블 교체)")
+    if report['moved']:
+        print(f"     * 원본 위치만 바뀐 행: {report['moved']}개")
+    if report['skipped']:
+        print(f"     * 필수 값이 비어 건너뛴 행: {report['skipped']}개")
+    if report['duplicates']:
+        print(f"     * 중복 키로 건너뛴 행: {report['duplicates']}개")
@@ -0,0 +1,159 @@
+"""
+법령 트리 지연 로딩용 인메모리 인덱스 (지침 요약 → 조 페이지 → 항 페이지)
+
+- 마스터 트리와 함께 1회 생성, 요청 시에는 튜플 슬라이스만 수행 (DB 조회 없음)
+- 커서 기반 페이지네이션: 커서에 데이터 버전을 넣어, 데이터가 재적재되면 이전 커서를 거부
+- fields 파라미터로 필요한 필드만 반환
+"""
+import base64
+import re
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+SHEET_FIELDS = ('sheet_name', 'article_count', 'paragraph_count')
+ARTICLE_FIELDS = ('article_key', 'article_num', 'title', 'paragraph_count')
+PARAGRAPH_FIELDS = ('index', 'text')
+
+# '제35조', '제35조의2', '제35의2조' (조 키 전체가 이 형식일 때만 번호 별칭 등록)
+_ARTICLE_KEY_PATTERN = re.compile(r'제\s*(\d+)(?:\.0+)?\s*(?:의\s*(\d+)\s*)?조(?:\s*의\s*(\d+))?')
+_ARTICLE_NUM_PATTERN = re.compile(r'(\d+)(?:\s*(?:의|-)\s*(\d+))?')
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+class TreeQueryError(ValueError):
+    """잘못된 페이지 요청 (limit, fields, cursor 형식 오류)"""
+
+class StaleCursorError(TreeQueryError):
+    """이전 데이터 버전에서 발급된 커서"""
+
+def _encode_cursor(version: str, offset: int) -> str:
+    return base64.urlsafe_b64encode(f'{version}:{offset}'.encode('ascii')).decode('ascii').rstrip('=')
+
+def _decode_cursor(cursor: str, version: str) -> int:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        cursor_version, _, offset = base64.urlsafe_b64decode(padded).decode('ascii').rpartition(':')
+        offset = int(offset)
+    except (ValueError, UnicodeDecodeError):
+        raise TreeQueryError('invalid cursor')
+    if cursor_version != version:
+        raise StaleCursorError('cursor is from an older data version')
+    if offset < 0:
+        raise TreeQueryError('invalid cursor')
+    return offset
+
+def _article_alias(main: str, sub: Optional[str]) -> str:
+    """조 번호 별칭 ('35', 가지조문은 '35-2')"""
+    return f'{int(main)}-{int(sub)}' if sub else str(int(main))
+
+def parse_fields(fields: Optional[str], allowed: Sequence[str]) -> Tuple[str, ...]:
+    """'a,b' → ('a', 'b') (없으면 전체 필드, 허용되지 않은 필드는 오류)"""
+    if not fields:
+        return tuple(allowed)
+    selected = tuple(field.strip() for field in fields.split(',') if field.strip())
+    unknown = [field for field in selected if field not in allowed]
+    if unknown:
+        raise TreeQueryError(f"unknown fields: {', '.join(unknown)} (allowed: {', '.join(allowed)})")
+    return selected
+
+def parse_limit(limit) -> int:
+    if limit in (None, ''):
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        raise TreeQueryError('limit must be an integer')
+    if limit <= 0:
+        raise TreeQueryError('limit must be positive')
+    return min(limit, MAX_PAGE_SIZE)
+
+class LawTreeIndex:
+    """
+    마스터 트리({지침: {제N조: {title, paragraphs}}})의 페이지 조회 인덱스
+
+    Args:
+        tree: build_law_master_tree() 결과 (조는 이미 자연 정렬된 순서)
+        version: 데이터 버전 (마스터 트리 본문 해시, 커서 검증용)
+    """
+
+    def __init__(self, tree: Dict, version: str):
+        self.version = version
+
+        sheets = []
+        self._articles = {}
+        self._paragraphs = {}
+        self._article_keys = {}  # (지침, '35') → '제35조', (지침, '35-2') → '제35조의2' (조 번호로도 조회 가능)
+        for sheet_name, articles in tree.items():
+            article_items = []
+            paragraph_total = 0
+            for article_key, article in articles.items():
+                paragraphs = article.get('paragraphs') or []
+                match = _ARTICLE_KEY_PATTERN.fullmatch(article_key.strip())
+                if match:
+                    article_num = _article_alias(match.group(1), match.group(2) or match.group(3))
+                    self._article_keys[(sheet_name, article_num)] = article_key
+                else:
+                    article_num = article_key  # '부칙' 등 번호 형식이 아니면 키로만 조회
+
+                article_items.append({
+                    'article_key': article_key,
+                    'article_num': article_num,
+                    'title': article.get('title') or '',
+                    'paragraph_count': len(paragraphs)
+                })
+                self._paragraphs[(sheet_name, article_key)] = tuple(
+                    {'index': idx, 'text': text} for idx, text in enumerate(paragraphs)
+                )
+                paragraph_total += len(paragraphs)
+
+            self._articles[sheet_name] = tuple(article_items)
+            sheets.append({
+                'sheet_name': sheet_name,
+                'article_count': len(article_items),
+                'paragraph_count': paragraph_total
+            })
+        self._sheets = tuple(sheets)
+
+    def _page(self, items: Tuple[Dict, ...], limit, cursor: Optional[str], fields: Iterable[str]) -> Dict:
+        limit = parse_limit(limit)
+        offset = _decode_cursor(cursor, self.version) if cursor else 0
+        page = items[offset:offset + limit]
+        next_offset = offset + len(page)
+        return {
+            'items': [{field: item[field] for field in fields} for item in page],
+            'total': len(items),
+            'next_cursor': _encode_cursor(self.version, next_offset) if next_offset < len(items) else None,
+            'version': self.version
+        }
+
+    def has_sheet(self, sheet_name: str) -> bool:
+        return sheet_name in self._articles
+
+    def resolve_article(self, sheet_name: str, article: str) -> Optional[str]:
+        """'제35조' / '35', '제35조의2' / '35-2' / '35의2'를 조 키로 변환 (없으면 None)"""
+        if (sheet_name, article) in self._paragraphs:
+            return article
+        match = _ARTICLE_NUM_PATTERN.fullmatch(article.strip())
+        if not match:
+            return None
+        return self._article_keys.get((sheet_name, _article_alias(match.group(1), match.group(2))))
+
+    def sheets(self, limit=None, cursor: Optional[str] = None, fields: Optional[str] = None) -> Dict:
+        """지침 요약 페이지"""
+        return self._page(self._sheets, limit, cursor, parse_fields(fields, SHEET_FIELDS))
+
+    def articles(self, sheet_name: str, limit=None, cursor: Optional[str] = None,
+                 fields: Optional[str] = None) -> Optional[Dict]:
+        """지침의 조 페이지 (지침이 없으면 None)"""
+        if sheet_name not in self._articles:
+            return None
+        return self._page(self._articles[sheet_name], limit, cursor, parse_fields(fields, ARTICLE_FIELDS))
+
+    def paragraphs(self, sheet_name: str, article: str, limit=None, cursor: Optional[str] = None,
+                   fields: Optional[str] = None) -> Optional[Dict]:
+        """조의 항 페이지 (지침/조가 없으면 None)"""
+        article_key = self.resolve_article(sheet_name, article)
+        if article_key is None:
+            return None
+        return self._page(self._paragraphs[(sheet_name, article_key)], limit, cursor,
+                          parse_fields(fields, PARAGRAPH_FIELDS))
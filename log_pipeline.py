@@ -0,0 +1,201 @@
+"""
+비동기 로깅 파이프라인 (QueueHandler → 백그라운드 QueueListener)
+
+- 요청 스레드/이벤트 루프는 레코드를 큐에 넣기만 하고, 포맷/파일 쓰기/로테이션은 리스너 스레드 1개가 처리
+- BatchingQueue: 넣을 때 리스너를 깨우지 않고 flush_interval마다 모아서 처리
+  (레코드마다 리스너를 깨우면 CPU가 적은 서버에서 리스너가 요청 처리 중간에 끼어들어 GIL을 가져감)
+- 큐가 가득 차면 레코드를 버리고 건수만 집계 (디스크가 느려도 요청 처리를 막지 않음)
+- 요청 ID: 요청 시작 시 contextvar에 설정 → 같은 요청의 로그(검색/생성 작업 스레드 포함)에 request_id로 기록
+  (스레드 풀 작업은 request_trace.submit()/bind(), asyncio 태스크는 컨텍스트를 자동 복사)
+- JsonFormatter: 한 줄 JSON 레코드 (ts, level, logger, request_id, message, exc_info)
+- CachingFormatter: 여러 핸들러가 같은 레코드를 기록해도 포맷은 한 번만
+- 종료 시(atexit) 큐에 남은 레코드를 모두 기록한 뒤 리스너 정지
+"""
+import atexit
+import contextvars
+import json
+import logging
+import queue
+import threading
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Iterable, Iterator, Tuple
+
+_request_id = contextvars.ContextVar('request_id', default='-')
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+def set_request_id(request_id: str) -> contextvars.Token:
+    """현재 요청의 ID 설정 (요청이 끝나면 반환된 토큰으로 reset_request_id 호출)"""
+    return _request_id.set(request_id)
+
+def reset_request_id(token: contextvars.Token):
+    _request_id.reset(token)
+
+def current_request_id() -> str:
+    return _request_id.get()
+
+def iter_with_request_id(iterable: Iterable, request_id: str) -> Iterator:
+    """
+    스트리밍 응답 본문을 만드는 동안 request_id를 설정
+
+    본문 생성기는 뷰 함수가 반환된 뒤(요청 ID가 해제된 뒤) 실행되므로 ID를 다시 묶어 줍니다.
+    """
+    token = _request_id.set(request_id)
+    try:
+        yield from iterable
+    finally:
+        try:
+            _request_id.reset(token)
+        except ValueError:
+            pass  # 다른 컨텍스트에서 close()된 경우 (가비지 컬렉션 등)
+
+class RequestIdFilter(logging.Filter):
+    """레코드에 현재 요청 ID(request_id) 추가 (요청 밖에서는 '-')"""
+
+    def filter(self, record):
+        if not hasattr(record, 'request_id'):
+            record.request_id = _request_id.get()
+        return True
+
+class CachingFormatter(logging.Formatter):
+    """
+    레코드 1건을 한 번만 포맷 (파일/콘솔 핸들러가 같은 포맷터를 공유할 때)
+
+    RotatingFileHandler는 로테이션 크기 확인에서도 레코드를 포맷하므로,
+    캐시가 없으면 레코드마다 핸들러 수 + 1번 포맷합니다.
+    """
+
+    def format(self, record):
+        cached = record.__dict__.get('_formatted')
+        if cached is not None and cached[0] is self:
+            return cached[1]
+        text = self.format_record(record)
+        record._formatted = (self, text)
+        return text
+
+    def format_record(self, record):
+        return super().format(record)
+
+class JsonFormatter(CachingFormatter):
+    """한 줄 JSON 로그 레코드"""
+
+    def format_record(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'request_id': getattr(record, 'request_id', '-'),
+            'message': record.getMessage()
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc_info'] = record.exc_text
+        if record.stack_info:
+            entry['stack_info'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+_exception_formatter = logging.Formatter()
+
+class BatchingQueue:
+    """
+    QueueHandler/QueueListener용 큐 (queue.Queue의 필요한 부분만 구현)
+
+    put_nowait()는 deque에 추가만 하고(알림 없음), 리스너의 get()은 큐가 비면
+    flush_interval만큼 잠들었다가 쌓인 레코드를 연달아 꺼냅니다.
+    순간적으로 로그가 몰려 maxsize의 1/4을 넘으면 리스너를 바로 깨웁니다.
+
+    Args:
+        maxsize: 최대 레코드 수 (넘으면 queue.Full)
+        flush_interval: 리스너가 빈 큐에서 기다리는 시간(초), 로그가 파일에 나타나는 최대 지연
+    """
+
+    def __init__(self, maxsize: int = 10000, flush_interval: float = 0.05):
+        self.maxsize = maxsize
+        self.flush_interval = flush_interval
+        self._wake_size = max(1, maxsize // 4)
+        self._items = deque()
+        self._wakeup = threading.Event()
+
+    def put_nowait(self, item):
+        if item is None:
+            # QueueListener.stop()의 종료 표시는 항상 넣고 리스너를 바로 깨움
+            self._items.append(item)
+            self._wakeup.set()
+            return
+        size = len(self._items)
+        if size >= self.maxsize:
+            raise queue.Full
+        self._items.append(item)
+        if size >= self._wake_size:
+            self._wakeup.set()
+
+    def get(self, block: bool = True):
+        while True:
+            try:
+                return self._items.popleft()
+            except IndexError:
+                if not block:
+                    raise queue.Empty
+                self._wakeup.wait(self.flush_interval)
+                self._wakeup.clear()
+
+    def qsize(self) -> int:
+        return len(self._items)
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    레코드를 큐에 넣기만 하는 핸들러 (큐가 가득 차면 버리고 dropped 증가)
+
+    기본 QueueHandler.prepare()는 요청 스레드에서 포맷까지 하므로,
+    메시지 인자 병합과 예외 traceback 문자열화만 하고 나머지 포맷은 리스너 스레드에 맡깁니다.
+    """
+
+    def __init__(self, log_queue: BatchingQueue):
+        super().__init__(log_queue)
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def prepare(self, record):
+        # 이 핸들러만 붙은 로거에서 쓰므로 레코드를 복사하지 않고 그대로 수정 (다른 핸들러가 봐도 메시지는 같음)
+        # 인자는 나중에 바뀔 수 있는 객체일 수 있으므로 큐에 넣기 전에 문자열로 병합
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None  # traceback 프레임을 큐에 붙잡아 두지 않음
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+def start_queue_logging(loggers: Iterable[logging.Logger], handlers: Iterable[logging.Handler],
+                        maxsize: int = 10000,
+                        flush_interval: float = 0.05) -> Tuple[NonBlockingQueueHandler, QueueListener]:
+    """
+    loggers의 핸들러를 큐 핸들러 1개로 교체하고 handlers를 백그라운드 리스너에서 실행
+
+    로거별로 다른 파일에 기록하려면 handlers에 로거 이름 필터를 붙여 두세요
+    (리스너는 모든 레코드를 모든 핸들러에 전달하고, 핸들러 레벨/필터는 적용함).
+
+    Returns:
+        (큐 핸들러, 리스너)
+    """
+    queue_handler = NonBlockingQueueHandler(BatchingQueue(maxsize, flush_interval))
+    queue_handler.addFilter(RequestIdFilter())  # 요청 ID는 로그를 남긴 스레드의 컨텍스트에서 읽어야 함
+    for logger in loggers:
+        logger.handlers.clear()
+        logger.addHandler(queue_handler)
+
+    listener = QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return queue_handler, listener
@@ -0,0 +1,239 @@
+"""
+Prometheus 텍스트 형식(0.0.4) 메트릭 (외부 라이브러리/서비스 없이 /metrics로 노출)
+
+- Counter / Gauge / Histogram: 레이블별 값을 프로세스 메모리에 누적 (스레드 안전)
+- CallbackMetric / CallbackHistogram: 기존 통계 객체(응답 캐시, 세션 저장소, 단계별 히스토그램)를
+  스크레이프 시점에 읽어서 노출 (값을 이중으로 집계하지 않음)
+- 메트릭은 생성 시 기본 레지스트리(REGISTRY)에 등록되고 REGISTRY.render()가 전체 본문을 만듦
+- 값은 프로세스 단위이므로 여러 워커로 실행하면 워커별로 따로 집계됨
+"""
+import math
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+from request_trace import LATENCY_BUCKETS
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# 기본 지연시간 버킷 상한(초), 단계별 히스토그램(/api/trace/stats)과 같은 경계
+DEFAULT_BUCKETS = LATENCY_BUCKETS
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_value(value) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+def _format_labels(labels: Dict) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+def histogram_lines(name: str, labels: Dict, buckets: Sequence[float], counts: Sequence[int],
+                    total: float, count: int) -> List[str]:
+    """
+    히스토그램 샘플 줄 (_bucket 누적 건수, _sum, _count)
+
+    Args:
+        buckets: 버킷 상한 (+Inf 제외)
+        counts: 버킷별 건수 (누적 아님, 마지막 원소가 +Inf 버킷)
+    """
+    lines = []
+    cumulative = 0
+    for bound, bucket_count in zip(tuple(buckets) + (math.inf,), counts):
+        cumulative += bucket_count
+        lines.append(f'{name}_bucket{_format_labels({**labels, "le": _format_value(float(bound))})} {cumulative}')
+    lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(float(total))}')
+    lines.append(f'{name}_count{_format_labels(labels)} {count}')
+    return lines
+
+class Registry:
+    """메트릭 모음 (render() 호출 시 등록 순서대로 출력)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._collectors = []
+
+    def register(self, collector):
+        with self._lock:
+            if any(existing.name == collector.name for existing in self._collectors):
+                raise ValueError(f'metric already registered: {collector.name}')
+            self._collectors.append(collector)
+        return collector
+
+    def render(self) -> str:
+        with self._lock:
+            collectors = list(self._collectors)
+        lines = []
+        for collector in collectors:
+            lines.extend(collector.render())
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = Registry()
+
+class _Metric:
+    """레이블별 값을 가진 메트릭 공통"""
+
+    type = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: Registry = REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        if registry is not None:
+            registry.register(self)
+
+    def _key(self, labels: Dict) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames) or any(name not in labels for name in self.labelnames):
+            raise ValueError(f'{self.name} expects labels {self.labelnames}, got {tuple(labels)}')
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _header(self) -> List[str]:
+        return [f'# HELP {self.name} {_escape(self.documentation)}', f'# TYPE {self.name} {self.type}']
+
+    def _items(self):
+        with self._lock:
+            return sorted(self._values.items())
+
+class Counter(_Metric):
+    """증가만 하는 누적 값"""
+
+    type = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        if amount < 0:
+            raise ValueError('counter can only increase')
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for key, value in self._items():
+            lines.append(f'{self.name}{_format_labels(dict(zip(self.labelnames, key)))} {_format_value(value)}')
+        return lines
+
+class Gauge(Counter):
+    """증감하는 현재 값"""
+
+    type = 'gauge'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+class Histogram(_Metric):
+    """
+    지연시간 분포 (버킷별 건수 + 합계 + 건수)
+
+    Args:
+        buckets: 버킷 상한(초) 오름차순 (+Inf 버킷은 자동 추가)
+    """
+
+    type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, registry: Registry = REGISTRY):
+        self.buckets = tuple(buckets)
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """with 블록 실행 시간 기록 (예외가 나도 기록)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        with self._lock:
+            items = sorted((key, (list(state[0]), state[1], state[2])) for key, state in self._values.items())
+        for key, (counts, total, count) in items:
+            lines.extend(histogram_lines(self.name, dict(zip(self.labelnames, key)), self.buckets,
+                                         counts, total, count))
+        return lines
+
+class CallbackMetric:
+    """
+    스크레이프 시점에 collect()로 값을 읽는 counter/gauge
+
+    Args:
+        collect: () → [(레이블 dict, 값), ...]
+    """
+
+    def __init__(self, name: str, documentation: str, metric_type: str,
+                 collect: Callable[[], Iterable[Tuple[Dict, float]]], registry: Registry = REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.type = metric_type
+        self._collect = collect
+        if registry is not None:
+            registry.register(self)
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {_escape(self.documentation)}', f'# TYPE {self.name} {self.type}']
+        for labels, value in self._collect():
+            lines.append(f'{self.name}{_format_labels(labels)} {_format_value(value)}')
+        return lines
+
+class CallbackHistogram:
+    """
+    스크레이프 시점에 collect()로 읽는 히스토그램 (request_trace.StageHistograms 등)
+
+    Args:
+        collect: () → [(레이블 dict, 버킷별 건수, 합계, 건수), ...]
+    """
+
+    type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float],
+                 collect: Callable[[], Iterable[Tuple[Dict, Sequence[int], float, int]]],
+                 registry: Registry = REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self._collect = collect
+        if registry is not None:
+            registry.register(self)
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {_escape(self.documentation)}', f'# TYPE {self.name} {self.type}']
+        for labels, counts, total, count in self._collect():
+            lines.extend(histogram_lines(self.name, labels, self.buckets, counts, total, count))
+        return lines
@@ -0,0 +1,94 @@
+"""
+미리 직렬화·압축한 JSON 응답 본문 (요청마다 JSON 직렬화/압축하지 않음)
+
+- 생성 시 1회 JSON 직렬화 후 gzip, brotli 본문을 만들어 보관
+- 본문 SHA-256 해시로 버전 생성, ETag는 인코딩별로 다름 (강한 검증자는 content-coding마다 달라야 함)
+- Accept-Encoding 협상, If-None-Match 비교 헬퍼
+"""
+import gzip
+import hashlib
+import json
+from typing import Dict, Optional
+
+import brotli
+
+# 선호 순서 (앞쪽이 우선)
+ENCODINGS = ('br', 'gzip')
+
+# 인코딩별 ETag 접미사 (identity는 버전 그대로)
+ETAG_SUFFIXES = {'identity': '', 'gzip': '-gz', 'br': '-br'}
+
+def _parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+    """'gzip, br;q=0.9, *;q=0' → {'gzip': 1.0, 'br': 0.9, '*': 0.0}"""
+    accepted = {}
+    for part in (header or '').split(','):
+        token, _, params = part.strip().partition(';')
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[token] = q
+    return accepted
+
+class PrecompressedPayload:
+    """
+    JSON 응답 본문과 압축 변형을 보관하는 불변 객체
+
+    Args:
+        data: JSON 직렬화할 객체
+        gzip_level: gzip 압축 레벨 (1회만 압축하므로 최대값 사용)
+        brotli_quality: brotli 압축 품질
+    """
+
+    def __init__(self, data, gzip_level: int = 9, brotli_quality: int = 11):
+        body = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self.version = hashlib.sha256(body).hexdigest()[:16]
+        self.bodies = {
+            'identity': body,
+            'gzip': gzip.compress(body, gzip_level, mtime=0),
+            'br': brotli.compress(body, quality=brotli_quality)
+        }
+        self.etags = {encoding: f'"{self.version}{ETAG_SUFFIXES[encoding]}"' for encoding in self.bodies}
+
+    @property
+    def etag(self) -> str:
+        """압축하지 않은 본문의 ETag"""
+        return self.etags['identity']
+
+    def etag_for(self, encoding: str) -> str:
+        """select_encoding() 결과 인코딩으로 보낼 본문의 ETag"""
+        return self.etags[encoding]
+
+    def select_encoding(self, accept_encoding: Optional[str]) -> str:
+        """Accept-Encoding에 맞는 본문 인코딩 ('br', 'gzip', 'identity')"""
+        accepted = _parse_accept_encoding(accept_encoding)
+        for encoding in ENCODINGS:
+            if encoding in self.bodies and accepted.get(encoding, accepted.get('*', 0.0)) > 0:
+                return encoding
+        return 'identity'
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """
+        If-None-Match 헤더가 현재 본문의 ETag와 일치하는지 (약한 비교, '*' 허용)
+
+        인코딩별 ETag 중 어느 것이든 같은 버전이므로 일치로 봅니다
+        (304 응답에는 이번 요청의 인코딩에 맞는 ETag를 보냄).
+        """
+        if not if_none_match:
+            return False
+        etags = set(self.etags.values())
+        for tag in if_none_match.split(','):
+            tag = tag.strip()
+            if tag == '*' or tag.removeprefix('W/') in etags:
+                return True
+        return False
+
+    def sizes(self) -> Dict[str, int]:
+        """인코딩별 본문 크기 (bytes)"""
+        return {encoding: len(body) for encoding, body in self.bodies.items()}
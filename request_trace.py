@@ -0,0 +1,218 @@
+"""
+요청 단위 지연시간 추적 (span)
+
+- trace(): 요청 처리 전체를 감싸는 컨텍스트 (contextvars로 요청 스레드/asyncio 태스크별 분리)
+- span(name): 단계별 time.perf_counter() 측정, 안쪽 span은 바깥 span의 자식으로 기록
+- 스레드 풀로 넘기는 작업은 submit()/bind()로 현재 컨텍스트를 복사해 같은 trace에 기록
+  (asyncio 태스크와 starlette run_in_threadpool은 컨텍스트를 자동으로 복사)
+- 요청이 끝나면 span 이름별 히스토그램(StageHistograms)에 누적
+- 추적 중인 요청이 없으면 span()은 아무것도 하지 않음 (변환 스크립트 등에서 호출해도 비용 없음)
+"""
+import contextvars
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# 히스토그램 버킷 상한(초), 마지막 버킷은 +Inf
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_current_trace = contextvars.ContextVar('request_trace', default=None)
+_current_span = contextvars.ContextVar('request_span', default=None)
+
+class Span:
+    """측정 구간 1개 (end가 None이면 아직 진행 중)"""
+
+    __slots__ = ('name', 'start', 'end', 'attrs', 'children')
+
+    def __init__(self, name: str, attrs: Optional[Dict] = None):
+        self.name = name
+        self.start = time.perf_counter()
+        self.end = None
+        self.attrs = attrs or {}
+        self.children = []
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def to_dict(self, origin: float) -> Dict:
+        result = {
+            'name': self.name,
+            'start_ms': round((self.start - origin) * 1000, 1),
+            'duration_ms': round(self.duration * 1000, 1),
+            **self.attrs
+        }
+        if self.end is None:
+            result['running'] = True  # 시간 초과로 버린 검색 브랜치 등
+        if self.children:
+            result['children'] = [child.to_dict(origin) for child in self.children]
+        return result
+
+class Trace:
+    """요청 1건의 span 트리 (여러 스레드에서 자식 span을 추가할 수 있음)"""
+
+    def __init__(self, name: str):
+        self.root = Span(name)
+        self._lock = threading.Lock()
+
+    def _add(self, parent: Span, span: Span):
+        with self._lock:
+            parent.children.append(span)
+
+    def finish(self):
+        self.root.end = time.perf_counter()
+
+    def iter_spans(self) -> Iterator[Span]:
+        """완료된 span 전체 (루트 포함, 깊이 우선)"""
+        with self._lock:
+            stack = [self.root]
+            spans = []
+            while stack:
+                span = stack.pop()
+                if span.end is not None:
+                    spans.append(span)
+                stack.extend(reversed(span.children))
+        return iter(spans)
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return self.root.to_dict(self.root.start)
+
+class StageHistograms:
+    """
+    span 이름별 누적 지연시간 히스토그램 (프로세스 단위)
+
+    Args:
+        buckets: 버킷 상한(초) 오름차순, 마지막에 +Inf 버킷이 추가됨
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._stages = {}  # name → {'counts': [...], 'count', 'sum', 'max'}
+
+    def observe(self, name: str, seconds: float):
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            stage = self._stages.get(name)
+            if stage is None:
+                stage = self._stages[name] = {
+                    'counts': [0] * (len(self.buckets) + 1), 'count': 0, 'sum': 0.0, 'max': 0.0
+                }
+            stage['counts'][index] += 1
+            stage['count'] += 1
+            stage['sum'] += seconds
+            stage['max'] = max(stage['max'], seconds)
+
+    def observe_trace(self, trace: Trace):
+        for span in trace.iter_spans():
+            self.observe(span.name, span.duration)
+
+    def _quantile(self, counts: List[int], total: int, q: float) -> float:
+        """버킷 상한 기준 근사 분위수 (+Inf 버킷이면 마지막 유한 상한)"""
+        target = q * total
+        cumulative = 0
+        for index, count in enumerate(counts):
+            cumulative += count
+            if cumulative >= target:
+                return self.buckets[min(index, len(self.buckets) - 1)]
+        return self.buckets[-1]
+
+    def snapshot(self) -> Dict:
+        """단계별 {'count', 'avg', 'p50', 'p95', 'max', 'sum', 'buckets': {'le_<초>': 누적 건수}}"""
+        with self._lock:
+            stages = {name: dict(stage, counts=list(stage['counts'])) for name, stage in self._stages.items()}
+
+        result = {}
+        for name, stage in sorted(stages.items()):
+            cumulative = 0
+            buckets = {}
+            for bound, count in zip(self.buckets + (float('inf'),), stage['counts']):
+                cumulative += count
+                buckets[f'le_{bound:g}'] = cumulative
+            result[name] = {
+                'count': stage['count'],
+                'avg': round(stage['sum'] / stage['count'], 4),
+                'p50': self._quantile(stage['counts'], stage['count'], 0.5),
+                'p95': self._quantile(stage['counts'], stage['count'], 0.95),
+                'max': round(stage['max'], 4),
+                'sum': round(stage['sum'], 4),
+                'buckets': buckets
+            }
+        return result
+
+    def raw(self) -> List[Tuple[str, List[int], float, int]]:
+        """단계별 (이름, 버킷별 건수(누적 아님), 합계, 건수) — /metrics 노출용"""
+        with self._lock:
+            return sorted((name, list(stage['counts']), stage['sum'], stage['count'])
+                          for name, stage in self._stages.items())
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+
+@contextmanager
+def trace(name: str, histograms: Optional[StageHistograms] = None):
+    """
+    요청 처리 구간 추적 시작 (끝나면 histograms에 단계별 지연시간 누적)
+
+    Yields:
+        Trace: metadata.timings용 to_dict() 제공
+    """
+    current = Trace(name)
+    trace_token = _current_trace.set(current)
+    span_token = _current_span.set(current.root)
+    try:
+        yield current
+    finally:
+        current.finish()
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+        if histograms is not None:
+            histograms.observe_trace(current)
+
+@contextmanager
+def span(name: str, **attrs):
+    """현재 요청의 단계 측정 (추적 중이 아니면 None을 넘기고 아무것도 하지 않음)"""
+    current = _current_trace.get()
+    if current is None:
+        yield None
+        return
+
+    child = Span(name, attrs)
+    current._add(_current_span.get() or current.root, child)
+    token = _current_span.set(child)
+    try:
+        yield child
+    finally:
+        child.end = time.perf_counter()
+        _current_span.reset(token)
+
+def traced(name: str):
+    """함수 호출 전체를 span으로 측정하는 데코레이터"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+def submit(executor, func, *args, **kwargs):
+    """executor.submit()과 같지만 현재 요청의 trace 컨텍스트를 작업 스레드로 복사"""
+    return executor.submit(contextvars.copy_context().run, func, *args, **kwargs)
+
+def bind(func):
+    """executor.map() 등에 넘길 함수를 현재 trace 컨텍스트에 묶음 (호출마다 컨텍스트 복사)"""
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return context.copy().run(func, *args, **kwargs)
+    return wrapper
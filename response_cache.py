@@ -0,0 +1,271 @@
+"""
+채팅 응답 캐시 (반복 질문에 OpenAI/Dify 호출 없이 응답)
+
+- 정규화된 질문 텍스트로 정확 일치 조회
+- 문자 2-gram 자카드 유사도로 유사 질문(near-duplicate) 조회 (역색인 사용)
+  → 숫자(조/항 번호, 금액, 연도)가 하나라도 다르면 유사도와 관계없이 다른 질문으로 취급
+- 보조 키(예: FAQ ID + policy_anchor)로 조회
+- TTL 만료 + LRU 제거
+- 원본 데이터 파일(chatbot.db, faq_topic.xlsx)이 바뀌면 전체 무효화
+"""
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+NGRAM_SIZE = 2
+
+_ARTICLE_PATTERN = re.compile(r'제\s*(\d+)\s*조(?:\s*의\s*(\d+))?')
+_DIGITS_PATTERN = re.compile(r'\d+')
+
+def normalize_question(text: str) -> str:
+    """질문 정규화 (유니코드 NFKC, 소문자, 문장부호 제거, 공백 정리)"""
+    text = unicodedata.normalize('NFKC', text or '').lower()
+    text = re.sub(r'[^\w\s]', ' ', text)
+    return ' '.join(text.split())
+
+def question_ngrams(normalized: str, n: int = NGRAM_SIZE) -> Set[str]:
+    """공백을 제거한 문자 n-gram 집합 (조사가 붙은 한글도 부분 일치)"""
+    compact = normalized.replace(' ', '')
+    if len(compact) <= n:
+        return {compact} if compact else set()
+    return {compact[i:i + n] for i in range(len(compact) - n + 1)}
+
+def question_numbers(normalized: str) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """
+    유사 질문 판정에서 정확히 같아야 하는 부분: (제N조(의M) 토큰, 숫자열)
+
+    제35조의2와 제35조의3처럼 번호만 다른 질문은 2-gram 유사도가 높아도 답이 다릅니다.
+    """
+    articles = tuple(f'{main}-{sub}' if sub else main for main, sub in _ARTICLE_PATTERN.findall(normalized))
+    digits = tuple(str(int(run)) for run in _DIGITS_PATTERN.findall(normalized))
+    return articles, digits
+
+def file_fingerprint(paths: List[str]) -> Tuple:
+    """파일 목록의 (경로, 수정시각, 크기) 지문 (없는 파일은 None)"""
+    fingerprint = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            fingerprint.append((path, stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            fingerprint.append((path, None, None))
+    return tuple(fingerprint)
+
+class ResponseCache:
+    """
+    질문 기반 응답 캐시
+
+    Args:
+        max_entries: 최대 항목 수 (초과 시 LRU 제거)
+        ttl: 항목 유효 시간(초)
+        similarity_threshold: 유사 질문으로 인정할 최소 자카드 유사도 (1.0이면 정확 일치만),
+            유사도가 넘어도 조문 번호/숫자가 다르면 인정하지 않음
+        source_paths: 변경 시 캐시를 무효화할 원본 데이터 파일 경로
+        check_interval: 원본 파일 변경 확인 주기(초)
+    """
+
+    def __init__(self, max_entries: int = 500, ttl: float = 21600,
+                 similarity_threshold: float = 0.85, source_paths: Optional[List[str]] = None,
+                 check_interval: float = 5.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.source_paths = list(source_paths or [])
+        self.check_interval = check_interval
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # 정규화 질문 -> 항목 (앞쪽일수록 오래 사용하지 않음)
+        self._postings = {}             # n-gram -> 정규화 질문 집합 (유사 질문 후보 검색용)
+        self._alt_keys = {}             # 보조 키 -> 정규화 질문
+        self._fingerprint = file_fingerprint(self.source_paths)
+        self._last_check = time.monotonic()
+        self._counters = {
+            'hits_exact': 0,
+            'hits_similar': 0,
+            'hits_key': 0,
+            'misses': 0,
+            'stores': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'invalidations': 0
+        }
+
+    # ---------- 내부 함수 (호출 측에서 lock 보유) ----------
+
+    def _check_sources(self):
+        """원본 데이터 파일이 바뀌었으면 전체 무효화"""
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+        fingerprint = file_fingerprint(self.source_paths)
+        if fingerprint != self._fingerprint:
+            self._fingerprint = fingerprint
+            if self._entries:
+                self._clear()
+                self._counters['invalidations'] += 1
+
+    def _clear(self):
+        self._entries.clear()
+        self._postings.clear()
+        self._alt_keys.clear()
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        for gram in entry['ngrams']:
+            keys = self._postings.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._postings[gram]
+        for alt_key in entry['alt_keys']:
+            if self._alt_keys.get(alt_key) == key:
+                del self._alt_keys[alt_key]
+
+    def _live_entry(self, key: str) -> Optional[Dict]:
+        """만료되지 않은 항목 반환 (만료됐으면 제거 후 None)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry['stored_at'] > self.ttl:
+            self._remove(key)
+            self._counters['expirations'] += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _hit(self, entry: Dict, match: str, similarity: float) -> Dict:
+        self._counters[f'hits_{match}'] += 1
+        return {
+            'value': entry['value'],
+            'match': match,
+            'similarity': round(similarity, 4),
+            'cached_question': entry['question'],
+            'age': round(time.monotonic() - entry['stored_at'], 1)
+        }
+
+    # ---------- 공개 함수 ----------
+
+    def get(self, question: str, count_miss: bool = True) -> Optional[Dict]:
+        """
+        질문으로 캐시 조회 (정확 일치 → 유사 질문 순)
+
+        한 요청에서 get_by_key()까지 조회하는 호출 측은 count_miss=False로 조회하고
+        마지막 조회도 실패했을 때 record_miss()로 실패 1건만 집계합니다.
+
+        Returns:
+            dict: {'value', 'match': 'exact'|'similar', 'similarity', 'cached_question', 'age'} or None
+        """
+        normalized = normalize_question(question)
+        if not normalized:
+            return None
+
+        with self._lock:
+            self._check_sources()
+
+            entry = self._live_entry(normalized)
+            if entry is not None:
+                return self._hit(entry, 'exact', 1.0)
+
+            if self.similarity_threshold < 1.0:
+                grams = question_ngrams(normalized)
+                numbers = question_numbers(normalized)
+                overlaps = Counter()
+                for gram in grams:
+                    overlaps.update(self._postings.get(gram, ()))
+
+                for key, overlap in overlaps.most_common():
+                    candidate_size = len(self._entries[key]['ngrams'])
+                    similarity = overlap / (len(grams) + candidate_size - overlap)
+                    if similarity < self.similarity_threshold:
+                        continue
+                    if self._entries[key]['numbers'] != numbers:
+                        continue  # 조문 번호/숫자가 다르면 다른 질문
+                    entry = self._live_entry(key)
+                    if entry is not None:
+                        return self._hit(entry, 'similar', similarity)
+
+            if count_miss:
+                self._counters['misses'] += 1
+            return None
+
+    def get_by_key(self, alt_key: str, count_miss: bool = True) -> Optional[Dict]:
+        """보조 키(예: FAQ ID + policy_anchor)로 캐시 조회 (count_miss는 get()과 같음)"""
+        with self._lock:
+            self._check_sources()
+            key = self._alt_keys.get(alt_key)
+            entry = self._live_entry(key) if key is not None else None
+            if entry is None:
+                if count_miss:
+                    self._counters['misses'] += 1
+                return None
+            return self._hit(entry, 'key', 1.0)
+
+    def record_miss(self):
+        """count_miss=False로 조회한 요청의 최종 실패 1건 집계"""
+        with self._lock:
+            self._counters['misses'] += 1
+
+    def put(self, question: str, value: Dict, alt_key: Optional[str] = None):
+        """응답 저장 (같은 질문이 있으면 교체)"""
+        normalized = normalize_question(question)
+        if not normalized:
+            return
+
+        with self._lock:
+            self._check_sources()
+            if normalized in self._entries:
+                self._remove(normalized)
+
+            grams = question_ngrams(normalized)
+            alt_keys = [alt_key] if alt_key else []
+            self._entries[normalized] = {
+                'question': question,
+                'value': value,
+                'ngrams': grams,
+                'numbers': question_numbers(normalized),
+                'alt_keys': alt_keys,
+                'stored_at': time.monotonic()
+            }
+            for gram in grams:
+                self._postings.setdefault(gram, set()).add(normalized)
+            for key in alt_keys:
+                self._alt_keys[key] = normalized
+            self._counters['stores'] += 1
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self._counters['evictions'] += 1
+
+    def invalidate(self):
+        """전체 무효화 (데이터 재적재 시)"""
+        with self._lock:
+            self._clear()
+            self._fingerprint = file_fingerprint(self.source_paths)
+            self._counters['invalidations'] += 1
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self) -> Dict:
+        """항목 수, 적중/실패 카운터, 적중률"""
+        with self._lock:
+            counters = dict(self._counters)
+            entries = len(self._entries)
+
+        hits = counters['hits_exact'] + counters['hits_similar'] + counters['hits_key']
+        lookups = hits + counters['misses']
+        return {
+            'entries': entries,
+            'max_entries': self.max_entries,
+            'ttl': self.ttl,
+            'similarity_threshold': self.similarity_threshold,
+            'hits': hits,
+            'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+            **counters
+        }
@@ -0,0 +1,413 @@
+"""
+채팅 세션 저장소 (LRU + 유휴 TTL 만료, 세션별 메시지 개수 제한)
+
+- InMemorySessionStore: 프로세스 내 OrderedDict (단일 워커)
+- SQLiteSessionStore: SQLite 파일 기반 (여러 gunicorn 워커가 세션 공유)
+
+두 저장소 모두 같은 메서드를 제공하며 create_session_store()가
+환경 변수(SESSION_BACKEND 등)에 따라 선택합니다.
+메시지에는 세션 안에서 증가하는 번호(seq)가 붙어, 오래된 메시지가 삭제되어도
+HistoryManager가 어디까지 요약했는지 추적할 수 있습니다.
+"""
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List
+
+# 메시지 1개당 대략적인 고정 오버헤드 (dict, role 문자열 등)
+MESSAGE_OVERHEAD_BYTES = 64
+
+def estimate_message_bytes(message: Dict) -> int:
+    """메시지 메모리 사용량 추정 (UTF-8 본문 길이 + 고정 오버헤드)"""
+    return len((message.get('content') or '').encode('utf-8')) + MESSAGE_OVERHEAD_BYTES
+
+class SessionStore(ABC):
+    """
+    세션 저장소 공통 인터페이스
+
+    Args:
+        max_sessions: 최대 세션 수 (초과 시 가장 오래 사용하지 않은 세션부터 제거)
+        idle_ttl: 유휴 만료 시간(초), 마지막 접근 이후 이 시간이 지나면 제거
+        max_messages: 세션별 최대 메시지 수 (초과 시 오래된 메시지부터 제거)
+        max_bytes: 전체 메시지 메모리 상한 (초과 시 LRU 세션부터 제거, 0이면 제한 없음)
+    """
+
+    backend = 'base'
+
+    def __init__(self, max_sessions: int = 1000, idle_ttl: float = 3600,
+                 max_messages: int = 50, max_bytes: int = 0):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self._counter_lock = threading.Lock()
+        self._counters = {
+            'sessions_created': 0,
+            'evicted_ttl': 0,
+            'evicted_lru': 0,
+            'evicted_memory': 0,
+            'messages_trimmed': 0
+        }
+
+    def _count(self, name: str, amount: int = 1):
+        if amount:
+            with self._counter_lock:
+                self._counters[name] += amount
+
+    @abstractmethod
+    def ensure(self, session_id: str) -> bool:
+        """세션이 없으면 생성 (생성했으면 True)"""
+
+    @abstractmethod
+    def append_message(self, session_id: str, role: str, content: str):
+        """세션에 메시지 추가 (세션이 없으면 생성)"""
+
+    @abstractmethod
+    def get_messages(self, session_id: str) -> List[Dict]:
+        """세션 메시지 목록 복사본 반환 ({'role', 'content', 'seq'}, 없으면 빈 리스트)"""
+
+    @abstractmethod
+    def __contains__(self, session_id: str) -> bool:
+        """세션 존재 여부"""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """현재 세션 수"""
+
+    @abstractmethod
+    def stats(self) -> Dict:
+        """세션 수, 메모리 사용량, 만료/제거 카운터"""
+
+class InMemorySessionStore(SessionStore):
+    """프로세스 내 LRU 세션 저장소 (OrderedDict: 앞쪽일수록 오래 사용하지 않은 세션)"""
+
+    backend = 'memory'
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()
+        self._total_bytes = 0
+
+    def _touch(self, session_id: str) -> Dict:
+        """세션 조회 + LRU 갱신 (없으면 생성), 호출 측에서 lock 보유"""
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = {
+                'messages': [],
+                'created_at': datetime.now(),
+                'bytes': 0,
+                'next_seq': 1
+            }
+            self._sessions[session_id] = session
+            self._count('sessions_created')
+        else:
+            self._sessions.move_to_end(session_id)
+        session['last_access'] = time.monotonic()
+        return session
+
+    def _drop(self, session_id: str, counter: str):
+        session = self._sessions.pop(session_id)
+        self._total_bytes -= session['bytes']
+        self._count(counter)
+
+    def _evict(self):
+        """유휴 만료 → 세션 수 상한 → 메모리 상한 순으로 제거, 호출 측에서 lock 보유"""
+        if self.idle_ttl:
+            deadline = time.monotonic() - self.idle_ttl
+            # LRU 순서이므로 앞에서부터 만료된 세션만 확인하면 됨
+            while self._sessions:
+                oldest_id, oldest = next(iter(self._sessions.items()))
+                if oldest['last_access'] >= deadline:
+                    break
+                self._drop(oldest_id, 'evicted_ttl')
+
+        while len(self._sessions) > self.max_sessions:
+            self._drop(next(iter(self._sessions)), 'evicted_lru')
+
+        if self.max_bytes:
+            # 방금 사용한 세션(맨 뒤)은 남겨둠
+            while self._total_bytes > self.max_bytes and len(self._sessions) > 1:
+                self._drop(next(iter(self._sessions)), 'evicted_memory')
+
+    def ensure(self, session_id: str) -> bool:
+        with self._lock:
+            created = session_id not in self._sessions
+            self._touch(session_id)
+            self._evict()
+            return created
+
+    def append_message(self, session_id: str, role: str, content: str):
+        message = {'role': role, 'content': content}
+        size = estimate_message_bytes(message)
+
+        with self._lock:
+            session = self._touch(session_id)
+            message['seq'] = session['next_seq']
+            session['next_seq'] += 1
+            session['messages'].append(message)
+            session['bytes'] += size
+            self._total_bytes += size
+
+            trimmed = 0
+            while len(session['messages']) > self.max_messages:
+                removed = session['messages'].pop(0)
+                removed_size = estimate_message_bytes(removed)
+                session['bytes'] -= removed_size
+                self._total_bytes -= removed_size
+                trimmed += 1
+            self._count('messages_trimmed', trimmed)
+
+            self._evict()
+
+    def get_messages(self, session_id: str) -> List[Dict]:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return []
+            self._sessions.move_to_end(session_id)
+            session['last_access'] = time.monotonic()
+            return [dict(message) for message in session['messages']]
+
+    def __contains__(self, session_id: str) -> bool:
+        with self._lock:
+            return session_id in self._sessions
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            live_sessions = len(self._sessions)
+            total_messages = sum(len(s['messages']) for s in self._sessions.values())
+            total_bytes = self._total_bytes
+        with self._counter_lock:
+            counters = dict(self._counters)
+
+        return {
+            'backend': self.backend,
+            'live_sessions': live_sessions,
+            'total_messages': total_messages,
+            'total_bytes': total_bytes,
+            'max_sessions': self.max_sessions,
+            'idle_ttl': self.idle_ttl,
+            'max_messages': self.max_messages,
+            'max_bytes': self.max_bytes,
+            **counters
+        }
+
+class SQLiteSessionStore(SessionStore):
+    """
+    SQLite 파일 기반 세션 저장소 (여러 워커 프로세스가 같은 파일 공유)
+
+    last_access는 프로세스 간 비교를 위해 time.time()(UNIX 시간)을 사용합니다.
+    만료/제거 작업은 purge_interval마다 최대 1회만 실행합니다.
+    제거 카운터는 워커(프로세스)별 값입니다.
+    """
+
+    backend = 'sqlite'
+
+    def __init__(self, db_path: str, purge_interval: float = 30, **kwargs):
+        super().__init__(**kwargs)
+        self.db_path = db_path
+        self.purge_interval = purge_interval
+        self._local = threading.local()
+        self._purge_lock = threading.Lock()
+        self._last_purge = 0.0
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+
+        conn = self._conn()
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.executescript('''
+        CREATE TABLE IF NOT EXISTS chat_sessions (
+            session_id TEXT PRIMARY KEY,
+            created_at TEXT NOT NULL,
+            last_access REAL NOT NULL,
+            bytes INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS idx_chat_sessions_last_access ON chat_sessions(last_access);
+        CREATE TABLE IF NOT EXISTS chat_messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT NOT NULL REFERENCES chat_sessions(session_id) ON DELETE CASCADE,
+            role TEXT NOT NULL,
+            content TEXT NOT NULL,
+            bytes INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_chat_messages_session ON chat_messages(session_id, id);
+        ''')
+
+    def _conn(self) -> sqlite3.Connection:
+        """스레드별 쓰기 연결 (autocommit, 트랜잭션은 BEGIN IMMEDIATE로 명시)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA foreign_keys = ON')
+            conn.execute('PRAGMA synchronous = NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _touch(self, conn: sqlite3.Connection, session_id: str) -> bool:
+        """세션 last_access 갱신 (없으면 생성, 생성했으면 True), 트랜잭션 안에서 호출"""
+        now = time.time()
+        updated = conn.execute(
+            'UPDATE chat_sessions SET last_access = ? WHERE session_id = ?', (now, session_id)
+        ).rowcount
+        if updated:
+            return False
+        conn.execute(
+            'INSERT INTO chat_sessions (session_id, created_at, last_access) VALUES (?, ?, ?)',
+            (session_id, datetime.now().isoformat(), now)
+        )
+        self._count('sessions_created')
+        return True
+
+    def _delete_sessions(self, conn: sqlite3.Connection, session_ids: List[str], counter: str):
+        if session_ids:
+            conn.executemany('DELETE FROM chat_sessions WHERE session_id = ?', [(sid,) for sid in session_ids])
+            self._count(counter, len(session_ids))
+
+    def _purge(self, force: bool = False):
+        """유휴 만료 → 세션 수 상한 → 메모리 상한 순으로 제거"""
+        now = time.time()
+        with self._purge_lock:
+            if not force and now - self._last_purge < self.purge_interval:
+                return
+            self._last_purge = now
+
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if self.idle_ttl:
+                expired = [row[0] for row in conn.execute(
+                    'SELECT session_id FROM chat_sessions WHERE last_access < ?', (now - self.idle_ttl,)
+                )]
+                self._delete_sessions(conn, expired, 'evicted_ttl')
+
+            live = conn.execute('SELECT COUNT(*) FROM chat_sessions').fetchone()[0]
+            if live > self.max_sessions:
+                overflow = [row[0] for row in conn.execute(
+                    'SELECT session_id FROM chat_sessions ORDER BY last_access LIMIT ?',
+                    (live - self.max_sessions,)
+                )]
+                self._delete_sessions(conn, overflow, 'evicted_lru')
+
+            if self.max_bytes:
+                total_bytes = conn.execute('SELECT COALESCE(SUM(bytes), 0) FROM chat_sessions').fetchone()[0]
+                if total_bytes > self.max_bytes:
+                    victims = []
+                    for session_id, size in conn.execute(
+                        'SELECT session_id, bytes FROM chat_sessions ORDER BY last_access'
+                    ).fetchall()[:-1]:  # 가장 최근 세션은 남겨둠
+                        if total_bytes <= self.max_bytes:
+                            break
+                        victims.append(session_id)
+                        total_bytes -= size
+                    self._delete_sessions(conn, victims, 'evicted_memory')
+
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def ensure(self, session_id: str) -> bool:
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            created = self._touch(conn, session_id)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        self._purge(force=created and len(self) > self.max_sessions)
+        return created
+
+    def append_message(self, session_id: str, role: str, content: str):
+        size = estimate_message_bytes({'content': content})
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            self._touch(conn, session_id)
+            conn.execute(
+                'INSERT INTO chat_messages (session_id, role, content, bytes) VALUES (?, ?, ?, ?)',
+                (session_id, role, content, size)
+            )
+
+            # 세션별 메시지 개수 제한: 최근 max_messages개만 유지
+            trimmed = conn.execute('''
+                DELETE FROM chat_messages
+                WHERE session_id = ? AND id NOT IN (
+                    SELECT id FROM chat_messages WHERE session_id = ? ORDER BY id DESC LIMIT ?
+                )
+            ''', (session_id, session_id, self.max_messages)).rowcount
+            self._count('messages_trimmed', trimmed)
+
+            conn.execute('''
+                UPDATE chat_sessions
+                SET bytes = (SELECT COALESCE(SUM(bytes), 0) FROM chat_messages WHERE session_id = ?)
+                WHERE session_id = ?
+            ''', (session_id, session_id))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        self._purge()
+
+    def get_messages(self, session_id: str) -> List[Dict]:
+        conn = self._conn()
+        conn.execute('UPDATE chat_sessions SET last_access = ? WHERE session_id = ?', (time.time(), session_id))
+        rows = conn.execute(
+            'SELECT role, content, id FROM chat_messages WHERE session_id = ? ORDER BY id', (session_id,)
+        ).fetchall()
+        # AUTOINCREMENT id는 재사용되지 않으므로 세션 안에서 증가하는 seq로 사용
+        return [{'role': role, 'content': content, 'seq': seq} for role, content, seq in rows]
+
+    def __contains__(self, session_id: str) -> bool:
+        row = self._conn().execute('SELECT 1 FROM chat_sessions WHERE session_id = ?', (session_id,)).fetchone()
+        return row is not None
+
+    def __len__(self) -> int:
+        return self._conn().execute('SELECT COUNT(*) FROM chat_sessions').fetchone()[0]
+
+    def stats(self) -> Dict:
+        conn = self._conn()
+        live_sessions, total_bytes = conn.execute(
+            'SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM chat_sessions'
+        ).fetchone()
+        total_messages = conn.execute('SELECT COUNT(*) FROM chat_messages').fetchone()[0]
+        with self._counter_lock:
+            counters = dict(self._counters)
+
+        return {
+            'backend': self.backend,
+            'db_path': self.db_path,
+            'live_sessions': live_sessions,
+            'total_messages': total_messages,
+            'total_bytes': total_bytes,
+            'max_sessions': self.max_sessions,
+            'idle_ttl': self.idle_ttl,
+            'max_messages': self.max_messages,
+            'max_bytes': self.max_bytes,
+            **counters
+        }
+
+def create_session_store() -> SessionStore:
+    """환경 변수 설정에 따라 세션 저장소 생성"""
+    options = {
+        'max_sessions': int(os.getenv('SESSION_MAX_SESSIONS', '1000')),
+        'idle_ttl': float(os.getenv('SESSION_IDLE_TTL', '3600')),
+        'max_messages': int(os.getenv('SESSION_MAX_MESSAGES', '50')),
+        'max_bytes': int(os.getenv('SESSION_MAX_BYTES', str(64 * 1024 * 1024)))
+    }
+
+    backend = os.getenv('SESSION_BACKEND', 'memory').lower()
+    if backend == 'sqlite':
+        return SQLiteSessionStore(os.getenv('SESSION_DB_PATH', 'data/sessions.db'), **options)
+    return InMemorySessionStore(**options)
@@ -330,66 +330,143 @@ class ComplaintChatbot {
         // 타이핑 인디케이터 표시
         this.showTypingIndicator();
 
-        try {
-            // 백엔드 API 호출
-            const response = await fetch('/api/chat', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({
-                    message: message,
-                    session_id: this.sessionId
-                })
-            });
+        let botContent = null;
+        let botMessage = null;
 
-            const data = await response.json();
+        try {
+            // 백엔드 스트리밍 API 호출 (SSE)
+            const botResponse = {
+                suggested_answer: null,
+                related_laws: [],
+                metadata: {}
+            };
 
-            if (data.success) {
-                // 세션 ID 저장
-                if (data.session_id) {
-                    this.sessionId = data.session_id;
-                    localStorage.setItem('sessionId', this.sessionId);
+            await this.streamChat(message, {
+                onMetadata: (data) => {
+                    // 세션 ID 저장
+                    if (data.session_id) {
+                        this.sessionId = data.session_id;
+                        localStorage.setItem('sessionId', this.sessionId);
+                    }
+                    // 검색 결과(관련법령)는 답변보다 먼저 도착
+                    botResponse.related_laws = data.related_laws || [];
+                    botResponse.metadata = data.metadata || {};
+                },
+                onDelta: (data) => {
+                    if (!botMessage) {
+                        // 첫 토큰 도착 시 타이핑 인디케이터를 답변 말풍선으로 교체
+                        this.hideTypingIndicator();
+                        botMessage = {
+                            type: 'bot',
+                            content: '',
+                            timestamp: new Date()
+                        };
+                        botContent = this.addMessage(botMessage);
+                    }
+                    botMessage.content += data.content;
+                    if (botContent) {
+                        botContent.textContent = botMessage.content;
+                        this.scrollToBottom();
+                    }
+                },
+                onSuggestedAnswer: (data) => {
+                    botResponse.suggested_answer = data.suggested_answer || null;
+                },
+                onDone: (data) => {
+                    botResponse.metadata.generation = data.generation || {};
                 }
+            });
 
-                // 타이핑 인디케이터 제거
-                this.hideTypingIndicator();
+            if (!botMessage) {
+                throw new Error('빈 응답');
+            }
 
-                // AI 응답 추가
-                const botMessage = {
-                    type: 'bot',
-                    content: data.message,
-                    timestamp: new Date()
-                };
-                this.addMessage(botMessage);
+            // API 응답 저장 (suggested_answer, related_laws 포함)
+            this.lastBotResponse = botResponse;
 
-                // API 응답 저장 (suggested_answer, related_laws 포함)
-                this.lastBotResponse = {
-                    suggested_answer: data.suggested_answer || null,
-                    related_laws: data.related_laws || [],
-                    metadata: data.metadata || {}
-                };
-
-                // 답변생성 버튼 표시
-                setTimeout(() => {
-                    this.showGenerateAnswerBtn();
-                }, 500);
+            // 답변생성 버튼 표시
+            setTimeout(() => {
+                this.showGenerateAnswerBtn();
+            }, 500);
 
-            } else {
-                this.hideTypingIndicator();
-                this.simulateBotResponse(message);
-            }
         } catch (error) {
             console.error('Error:', error);
             this.hideTypingIndicator();
-            // 백엔드 연결 실패시 시뮬레이션 모드
-            this.simulateBotResponse(message);
+            if (botMessage && botContent) {
+                // 답변 출력 도중 중단된 경우 받은 내용은 유지
+                botMessage.content += '\n\n(답변 생성이 중단되었습니다. 다시 시도해주세요.)';
+                botContent.textContent = botMessage.content;
+            } else {
+                // 백엔드 연결 실패시 시뮬레이션 모드
+                this.simulateBotResponse(message);
+            }
         } finally {
             if (this.sendButton) {
                 this.sendButton.disabled = false;
             }
         }
     }
+
+    // /api/chat/stream 호출 후 SSE 이벤트를 핸들러로 전달
+    async streamChat(message, handlers) {
+        const response = await fetch('/api/chat/stream', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({
+                message: message,
+                session_id: this.sessionId
+            })
+        });
+
+        if (!response.ok || !response.body) {
+            throw new Error(`API 호출 실패: ${response.status}`);
+        }
+
+        const eventHandlers = {
+            metadata: handlers.onMetadata,
+            delta: handlers.onDelta,
+            suggested_answer: handlers.onSuggestedAnswer,
+            done: handlers.onDone
+        };
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder('utf-8');
+        let buffer = '';
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+
+            buffer += decoder.decode(value, { stream: true });
+
+            // 이벤트는 빈 줄(\n\n)로 구분
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const rawEvent = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+
+                let eventName = 'message';
+                let dataText = '';
+                rawEvent.split('\n').forEach(line => {
+                    if (line.startsWith('event:')) {
+                        eventName = line.slice(6).trim();
+                    } else if (line.startsWith('data:')) {
+                        dataText += line.slice(5).trim();
+                    }
+                });
+
+                const data = dataText ? JSON.parse(dataText) : {};
+                if (eventName === 'error') {
+                    throw new Error(data.error || '답변 생성 실패');
+                }
+                if (eventHandlers[eventName]) {
+                    eventHandlers[eventName](data);
+                }
+            }
+        }
+    }
     
     simulateBotResponse(userMessage) {
         const botResponse = this.generateBotResponse(userMessage);
@@ -437,6 +514,8 @@ class ComplaintChatbot {
         
         this.chatMessages.appendChild(messageElement);
         this.scrollToBottom();
+
+        return content;
     }
     
     scrollToBottom() {
@@ -889,7 +968,10 @@ class ComplaintChatbot {
     // [3단계] 마스터 트리 데이터 로드
     async loadMasterTree() {
         try {
-            const response = await fetch('/api/laws/master-tree');
+            // 버전이 붙은 URL은 브라우저가 장기 캐시 (데이터가 바뀌면 페이지의 버전도 바뀜)
+            const version = window.MASTER_TREE_VERSION;
+            const url = version ? `/api/laws/master-tree?v=${encodeURIComponent(version)}` : '/api/laws/master-tree';
+            const response = await fetch(url);
             const result = await response.json();
 
             if (result.success && result.data) {